@@ -0,0 +1,130 @@
+"""
+Headless triage: JSONL cases in, JSONL results out.
+
+Each input line is a JSON object of run_flow arguments, with optional
+"image_path" / "pdf_path" pointing at the x-ray and report files:
+
+    {"name": "A", "phone": "9998887776", "age": 34, "notes": "fever", "image_path": "xray.png"}
+
+Each output line is {"index", "ok", "result" | "error"}, written as soon as
+the case finishes. Input is read lazily and results are not kept, so
+memory stays flat however large the input is. Logs and progress go to
+stderr.
+
+    medical-triage cases.jsonl --workers 4 > results.jsonl
+    cat cases.jsonl | medical-triage --limit 100
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from itertools import islice
+
+from Utils.logger import log_to_stderr
+
+
+def _read_cases(lines):
+    """One case per non-blank line; an unparsable line becomes a ValueError case."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            case = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield ValueError(f"line {number}: invalid JSON ({exc.msg})")
+            continue
+        if not isinstance(case, dict):
+            yield ValueError(f"line {number}: expected a JSON object")
+            continue
+        yield case
+
+
+class _Progress:
+    """Periodic `n cases (ok/failed), rate` lines on stderr."""
+
+    def __init__(self, every: float, stream=None):
+        self.every = every
+        self.stream = stream or sys.stderr
+        self.ok = self.failed = 0
+        self.start = self.last = time.perf_counter()
+
+    def update(self, ok: bool):
+        if ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+        now = time.perf_counter()
+        if self.every and now - self.last >= self.every:
+            self.last = now
+            self.report("progress")
+
+    def report(self, label: str):
+        done = self.ok + self.failed
+        elapsed = time.perf_counter() - self.start
+        rate = done / elapsed if elapsed else 0.0
+        print(
+            f"[{label}] {done} cases ({self.ok} ok, {self.failed} failed) "
+            f"in {elapsed:.1f}s, {rate:.1f} cases/s",
+            file=self.stream, flush=True,
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="medical-triage",
+        description="Run JSONL patient cases through the agent pipeline and stream JSONL results.",
+    )
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of cases (default: stdin)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default: 1, in-process)")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many cases")
+    parser.add_argument("--chunk-size", type=int, default=8, help="cases sent to a worker at a time")
+    parser.add_argument("--unordered", action="store_true", help="write results as they finish, not in input order")
+    parser.add_argument("--upload-dir", default=None, help="where uploaded x-rays/PDFs are stored")
+    parser.add_argument("--progress-every", type=float, default=5.0,
+                        help="seconds between progress lines on stderr (0 disables)")
+    parser.add_argument("--verbose", action="store_true", help="keep per-stage INFO logs (on stderr)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.workers < 1:
+        print("--workers must be at least 1", file=sys.stderr)
+        return 2
+    # stdout carries the results only
+    log_to_stderr(None if args.verbose else logging.WARNING)
+
+    from Agents.coordinator import Orchestrator
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    progress = _Progress(args.progress_every)
+    try:
+        cases = _read_cases(source)
+        if args.limit is not None:
+            cases = islice(cases, args.limit)
+        results = Orchestrator.run_flow_many(
+            cases,
+            workers=args.workers,
+            ordered=not args.unordered,
+            chunk_size=args.chunk_size,
+            upload_dir=args.upload_dir,
+            quiet=not args.verbose,
+        )
+        for result in results:
+            sys.stdout.write(json.dumps(result, default=str) + "\n")
+            sys.stdout.flush()
+            progress.update(result["ok"])
+    except KeyboardInterrupt:
+        progress.report("interrupted")
+        return 130
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    progress.report("done")
+    return 0 if not progress.failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
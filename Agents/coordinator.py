@@ -1,67 +1,193 @@
 """Coordinator/Orchestrator agent that routes tasks and consolidates the final plan."""
 
+import logging
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from copy import deepcopy
 from datetime import datetime
+from functools import cached_property
+from itertools import islice
+from time import perf_counter
 from uuid import uuid4
 
-from Agents.ingestion import IngestionAgent
-from Agents.imaging import ImagingAgent
-from Agents.therapy import TherapyAgent
-from Agents.pharmacy_match import PharmacyAgent
-from Agents.doctor_escalation import DoctorEscalationAgent
-from Utils.logger import get_logger
-from Utils.data_loader import load_doctors
+from Utils.logger import get_logger, log_to_stderr
+from Utils.data_loader import load_doctors, load_pincode_map
 from Utils.lookups import get_coords_for_pincode
-from Utils.constants import SEVERITY_MILD
+from Utils.constants import SEVERITY_MILD, ORDER_QTY_PER_ITEM
+from Utils.inventory_store import InvalidOrderError, ReservationNotFoundError, inventory_store_by_id
+from Utils.snapshot import current_snapshot
+from Utils.stage_graph import Stage, StageGraph
+from Utils.metrics import REGISTRY
 
 logger = get_logger(__name__)
 
+STAGE_SECONDS = REGISTRY.histogram(
+    "flow_stage_seconds", "Time spent in each pipeline stage", ("stage",)
+)
+STAGE_RUNS = REGISTRY.counter(
+    "flow_stage_runs_total", "Pipeline stage executions by status (ok, skipped, error)", ("stage", "status")
+)
+FLOW_SECONDS = REGISTRY.histogram("flow_seconds", "End-to-end run_flow latency")
+FLOW_OUTCOMES = REGISTRY.counter(
+    "flow_outcomes_total",
+    "Completed flows by notable outcome (imaging_skipped, escalation_needed, no_pharmacy_found)",
+    ("outcome",),
+)
+
+
+def _record_stage(stage: str, status: str, seconds: float):
+    STAGE_RUNS.labels(stage=stage, status=status).inc()
+    if status != "skipped":
+        STAGE_SECONDS.labels(stage=stage).observe(seconds)
+
+
+# Imaging stage outputs when no x-ray was uploaded
+NO_IMAGING = {
+    "img_result": {"condition_probs": None, "severity_hint": "not_assessed"},
+    "condition_probs": {},
+    "condition": "symptom_based",
+    "severity": SEVERITY_MILD,
+}
+
+
+def _order_number(order: dict, key: str, default):
+    """A non-negative amount from a client-supplied order (e.g. delivery_fee)"""
+    value = order.get(key)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value < float("inf"):
+        raise InvalidOrderError(f"{key} must be a non-negative number")
+    return value
+
+
+def _order_ids(order_preview) -> tuple:
+    """(reservation_id, store_id) of a held order; None for a plain preview"""
+    if not isinstance(order_preview, dict):
+        raise InvalidOrderError("order_preview must be an object")
+    ids = (order_preview.get("reservation_id"), order_preview.get("store_id"))
+    if not all(value is None or isinstance(value, str) for value in ids):
+        raise InvalidOrderError("reservation_id and store_id must be strings")
+    return ids
+
+
 class Orchestrator:
     """Central orchestrator that coordinates all agents and consolidates the final plan."""
 
     DEFAULT_LAT = 19.12
     DEFAULT_LON = 72.84
+    # "split" lets a basket be delivered from several pharmacies instead of
+    # dropping SKUs the nearest single pharmacy doesn't stock
+    FULFILMENT_MODE = "split"
 
-    #initializing the agents
-    def __init__(self):
-        self.ingestion = IngestionAgent()
-        self.imaging = ImagingAgent()
-        self.therapy = TherapyAgent()
-        self.pharmacy = PharmacyAgent()
-        self.doctors = load_doctors()
-        self.doctor_escalation = DoctorEscalationAgent(self.doctors)
+    # Agents (and the modules/datasets behind them) are built on first use,
+    # so a flow that never reaches e.g. pharmacy matching never loads it.
+    # Assigning an attribute replaces the agent, as before.
+    @cached_property
+    def ingestion(self):
+        from Agents.ingestion import IngestionAgent
+        return IngestionAgent()
 
-    #function to get the timestamp
-    def _timestamp(self) -> str:
-        return datetime.utcnow().isoformat() + "Z"
+    @cached_property
+    def imaging(self):
+        from Agents.imaging import ImagingAgent
+        return ImagingAgent()
 
-    #function to add a timeline entry
-    def _timeline_entry(self, step: str) -> dict:
-        return {"step": step, "at": self._timestamp()}
+    @cached_property
+    def therapy(self):
+        from Agents.therapy import TherapyAgent
+        return TherapyAgent()
 
-    #function to combine the notes from the ingestion agent
-    def _combine_notes(self, notes: str, pdf_text: str) -> str:
-        return " ".join(filter(None, [notes, pdf_text])).strip()
+    @cached_property
+    def pharmacy(self):
+        from Agents.pharmacy_match import PharmacyAgent
+        return PharmacyAgent()
 
-    #function to build the order preview
-    def _build_order_preview(self, pharmacy_match: dict) -> dict | None:
-        if "pharmacy_id" not in pharmacy_match:
-            return None
+    @cached_property
+    def doctor_escalation(self):
+        from Agents.doctor_escalation import DoctorEscalationAgent
+        return DoctorEscalationAgent(self.doctors)
+
+    @property
+    def doctors(self):
+        return load_doctors()
+
+    @property
+    def inventory_store(self):
+        return self.pharmacy.store
+
+    #function to build the agents and the data they use before the first request
+    def warm_up(self) -> "Orchestrator":
+        """
+        Construct every agent and load the datasets and indexes a flow
+        reads, so the first request doesn't pay for them. Returns self.
+        """
+        from Utils.formulary import get_formulary
+        from Utils.interaction_index import get_interaction_index
+
+        snapshot = current_snapshot()
+        for agent in ("ingestion", "imaging", "therapy", "doctor_escalation", "pipeline"):
+            getattr(self, agent)
+        self.inventory_store  # pharmacy agent, its network and the live store
+        get_formulary(snapshot)
+        get_interaction_index(snapshot)
+        load_pincode_map()
+        return self
+
+    #function to combine the notes from the ingestion agent
+    def _combine_notes(self, notes: str, pdf_pages=None):
+        # yields the notes then each PDF page, so the report is never joined into one string
+        if notes:
+            yield notes
+        for page in pdf_pages or ():
+            if page:
+                yield " "
+                yield page
 
-        items = []
+    #function to build the order preview lines for one pharmacy
+    def _preview_lines(self, items: list) -> tuple[list, float]:
+        lines = []
         subtotal = 0.0
-        for item in pharmacy_match.get("items", []):
-            qty = item.get("qty", 0)
+        for item in items:
+            # item["qty"] is what the pharmacy has available, not what we buy
+            qty = min(ORDER_QTY_PER_ITEM, item.get("qty", 0))
             price = float(item.get("price") or 0)
             line_total = qty * price
             subtotal += line_total
-            items.append({
+            lines.append({
                 "sku": item["sku"],
                 "drug_name": item.get("drug_name"),
                 "qty": qty,
                 "unit_price": price,
                 "subtotal": line_total,
             })
+        return lines, subtotal
+
+    #function to build the order preview
+    def _build_order_preview(self, pharmacy_match: dict) -> dict | None:
+        if "shipments" in pharmacy_match:
+            shipments = []
+            for ship in pharmacy_match["shipments"]:
+                lines, ship_subtotal = self._preview_lines(ship.get("items", []))
+                shipments.append({
+                    "pharmacy_id": ship["pharmacy_id"],
+                    "items": lines,
+                    "eta_min": ship.get("eta_min"),
+                    "delivery_fee": ship.get("delivery_fee", 0),
+                    "subtotal": ship_subtotal,
+                })
+            return {
+                "shipments": shipments,
+                "items": [line for ship in shipments for line in ship["items"]],
+                "eta_min": pharmacy_match.get("eta_min"),
+                "delivery_fee": pharmacy_match.get("delivery_fee", 0),
+                "subtotal": sum(ship["subtotal"] for ship in shipments),
+            }
+
+        if "pharmacy_id" not in pharmacy_match:
+            return None
+
+        items, subtotal = self._preview_lines(pharmacy_match.get("items", []))
 
         return {
             "pharmacy_id": pharmacy_match["pharmacy_id"],
@@ -71,131 +197,473 @@ class Orchestrator:
             "subtotal": subtotal,
         }
 
+    #function to check a client's order preview and price it from the inventory
+    def _priced_order(self, order_preview: dict, store) -> dict:
+        """
+        The preview's pharmacies, SKUs, quantities and delivery fees, with
+        drug names, prices and subtotals read from `store`'s inventory, not
+        taken from the preview. Raises InvalidOrderError for a malformed
+        preview or an item its pharmacy doesn't list.
+        """
+        if not isinstance(order_preview, dict):
+            raise InvalidOrderError("order_preview must be an object")
+        split = "shipments" in order_preview
+        shipments = order_preview["shipments"] if split else [order_preview]
+        if not isinstance(shipments, list) or not shipments:
+            raise InvalidOrderError("shipments must be a non-empty list")
+
+        priced = []
+        for ship in shipments:
+            ph_id = ship.get("pharmacy_id") if isinstance(ship, dict) else None
+            if not isinstance(ph_id, str) or not ph_id:
+                raise InvalidOrderError("pharmacy_id is required")
+            items = ship.get("items")
+            if not isinstance(items, list) or not items:
+                raise InvalidOrderError(f"The order from {ph_id} has no items")
+            listed = store.index.skus_for(ph_id)
+            lines = []
+            for item in items:
+                sku = item.get("sku") if isinstance(item, dict) else None
+                posting = listed.get(sku) if isinstance(sku, str) else None
+                if posting is None:
+                    raise InvalidOrderError(f"{ph_id} does not list {sku!r}")
+                qty = item.get("qty")
+                if isinstance(qty, bool) or not isinstance(qty, int) or qty <= 0:
+                    raise InvalidOrderError(f"{sku}: qty must be a positive whole number")
+                price = float(posting.price)
+                lines.append({
+                    "sku": sku,
+                    "drug_name": posting.drug_name,
+                    "qty": qty,
+                    "unit_price": price,
+                    "subtotal": qty * price,
+                })
+            priced.append({
+                "pharmacy_id": ph_id,
+                "items": lines,
+                "eta_min": _order_number(ship, "eta_min", None),
+                "delivery_fee": _order_number(ship, "delivery_fee", 0),
+                "subtotal": sum(line["subtotal"] for line in lines),
+            })
+        if not split:
+            return priced[0]
+        return {
+            "shipments": priced,
+            "items": [line for ship in priced for line in ship["items"]],
+            "eta_min": _order_number(order_preview, "eta_min", None),
+            "delivery_fee": sum(ship["delivery_fee"] for ship in priced),
+            "subtotal": sum(ship["subtotal"] for ship in priced),
+        }
+
+    #function to list the (pharmacy_id, sku, qty) lines of an order
+    def _stock_lines(self, order: dict) -> list:
+        shipments = order.get("shipments") or [order]
+        return [
+            (ship["pharmacy_id"], item["sku"], item["qty"])
+            for ship in shipments
+            for item in ship["items"]
+        ]
+
+    #function to hold stock for an order preview until it is finalized
+    def hold_order(self, order_preview: dict | None, hold_seconds: float | None = None) -> dict | None:
+        """
+        Reserve the preview's stock; raises OutOfStockError if it is gone.
+        The hold is released automatically if not finalized in time. The
+        returned token names the store holding the stock (store_id), so it
+        is finalized there even if inventory.csv is reloaded meanwhile.
+        """
+        if not order_preview:
+            return None
+        store = self.inventory_store
+        held = self._priced_order(order_preview, store)
+        held["reservation_id"] = store.reserve(self._stock_lines(held), hold_seconds=hold_seconds)
+        held["store_id"] = store.store_id
+        return held
+
     #function to finalize the order
     def finalize_order(self, order_preview: dict | None) -> dict | None:
+        """
+        Place the order, atomically decrementing live stock, at the prices
+        in the inventory. Raises OutOfStockError if the items were sold in
+        the meantime, InvalidOrderError for a malformed preview.
+        """
         if not order_preview:
             return None
-        order = deepcopy(order_preview)
+        reservation_id, store_id = _order_ids(order_preview)
+        # A hold is committed on the store it was made in, not the current one
+        store = inventory_store_by_id(store_id) or self.inventory_store
+        order = self._priced_order(order_preview, store)
+        try:
+            store.commit(reservation_id, self._stock_lines(order))
+        except ReservationNotFoundError:
+            # No hold, or it expired (or its store is gone): reserve and sell in one step
+            store = self.inventory_store
+            order = self._priced_order(order_preview, store)
+            store.commit(store.reserve(self._stock_lines(order)))
+
         order["order_id"] = f"ORDER-{uuid4().hex[:6].upper()}"
         order["placed_at"] = datetime.utcnow().isoformat() + "Z"
-        order["total_cost"] = round(
-            order_preview["subtotal"] + order_preview.get("delivery_fee", 0), 2
-        )
+        order["total_cost"] = round(order["subtotal"] + order["delivery_fee"], 2)
         return order
 
-    #main function that orchestrates the flow of the pipeline
-    def run_flow(
-        self,
-        image_file=None,
-        name=None,
-        phone=None,
-        age=None,
-        notes=None,
-        allergies=None,
-        pdf_file=None,
-        user_lat: float | None = None,
-        user_lon: float | None = None,
-        pincode: str | None = None,
-    ):
+    #function to declare the pipeline stages and the values each one reads and writes
+    @cached_property
+    def pipeline(self) -> StageGraph:
         """
-        Execute the master pipeline through all agents.
-
-        Returns:
-            Consolidated plan with ingestion, diagnosis, therapy, pharmacy,
-            and escalation
+        The flow as a stage graph: independent stages (location lookup and
+        ingestion; doctor escalation and pharmacy matching) run in parallel,
+        and imaging is skipped when there is no x-ray. New stages are added
+        here, not in run_flow.
         """
+        return StageGraph([
+            Stage(
+                "location", self._locate,
+                inputs=("snapshot",), optional=("pincode", "user_lat", "user_lon"),
+                outputs=("location",),
+            ),
+            Stage(
+                "ingestion", self._ingest,
+                inputs=("request",), outputs=("ingestion_output", "xray_path", "xray_sha256"),
+                step="ingestion_completed",
+            ),
+            Stage(
+                "imaging", self._analyze_imaging,
+                inputs=("xray_path",), optional=("xray_sha256",), outputs=("imaging",),
+                step="imaging_completed", skipped_step="imaging_skipped",
+                defaults={"imaging": NO_IMAGING},
+            ),
+            Stage(
+                "therapy", self._recommend_therapy,
+                inputs=("ingestion_output", "imaging", "snapshot"), optional=("current_medications",),
+                outputs=("therapy",), step="therapy_completed",
+            ),
+            Stage(
+                "doctor_escalation", self._assess_escalation,
+                inputs=("therapy", "imaging", "snapshot"), outputs=("doctor_assessment",),
+                step="doctor_escalation_evaluated",
+            ),
+            Stage(
+                "pharmacy_match", self._match_pharmacy,
+                inputs=("therapy", "location", "snapshot"), outputs=("pharmacy_match",),
+                step="pharmacy_match_completed",
+            ),
+            Stage(
+                "order_preview", lambda pharmacy_match: {"order_preview": self._build_order_preview(pharmacy_match)},
+                inputs=("pharmacy_match",), outputs=("order_preview",),
+                step="order_preview_ready",
+            ),
+        ], on_stage=_record_stage)
 
-        coords = get_coords_for_pincode(pincode)
+    #function to resolve the delivery location (pincode first, then coordinates, then default)
+    def _locate(self, snapshot, pincode=None, user_lat=None, user_lon=None) -> dict:
+        coords = get_coords_for_pincode(pincode, snapshot=snapshot)
         if coords:
             user_lat, user_lon = coords
         if user_lat is None or user_lon is None:
             user_lat = self.DEFAULT_LAT
             user_lon = self.DEFAULT_LON
+        return {"location": (user_lat, user_lon)}
+
+    #function to call the ingestion agent
+    def _ingest(self, request) -> dict:
+        ingestion_output = self.ingestion.process(**request)
+        return {
+            "ingestion_output": ingestion_output,
+            "xray_path": ingestion_output["xray_path"],
+            "xray_sha256": ingestion_output.get("xray_sha256"),
+        }
 
-        #calling ingestion agent
-        ingestion_output = self.ingestion.process(
-            image_file=image_file,
-            name=name,
-            phone=phone,
-            age=age,
-            notes=notes,
-            allergies=allergies,
-            pdf_file=pdf_file,
+    #function to call the imaging agent on the uploaded x-ray
+    def _analyze_imaging(self, xray_path, xray_sha256=None) -> dict:
+        img_result = self.imaging.analyze(xray_path, content_hash=xray_sha256)
+        condition_probs = img_result.get("condition_probs", {}) or {}
+        condition = (
+            max(condition_probs, key=condition_probs.get)
+            if condition_probs
+            else "unknown"
         )
-        data = ingestion_output
-
-        timeline = [self._timeline_entry("ingestion_completed")]
-        
-        #calling imaging agent
-        condition_probs = {}
-        if data["xray_path"]:
-            img_result = self.imaging.analyze(data["xray_path"])
-            condition_probs = img_result.get("condition_probs", {}) or {}
-            condition = (
-                max(condition_probs, key=condition_probs.get)
-                if condition_probs
-                else "unknown"
-            )
-            severity = img_result["severity_hint"]
-            timeline.append(self._timeline_entry("imaging_completed"))
-        else:
-            img_result = {"condition_probs": None, "severity_hint": "not_assessed"}
-            condition = "symptom_based"
-            severity = SEVERITY_MILD
-            timeline.append(self._timeline_entry("imaging_skipped"))
-
-        #calling therapy agent
-        notes_for_therapy = self._combine_notes(data.get("notes"), data.get("pdf_text"))
-        therapy = self.therapy.recommend(
+        return {"imaging": {
+            "img_result": img_result,
+            "condition_probs": condition_probs,
+            "condition": condition,
+            "severity": img_result["severity_hint"],
+        }}
+
+    #function to call the therapy agent
+    def _recommend_therapy(self, ingestion_output, imaging, snapshot, current_medications=None) -> dict:
+        notes_for_therapy = self._combine_notes(ingestion_output.get("notes"), ingestion_output.get("pdf_pages"))
+        return {"therapy": self.therapy.recommend(
             notes=notes_for_therapy,
-            age=data["patient"]["age"],
-            allergies=data["patient"]["allergies"],
-            severity_hint=severity,
-            condition_probs=condition_probs,
-        )
-        timeline.append(self._timeline_entry("therapy_completed"))
+            age=ingestion_output["patient"]["age"],
+            allergies=ingestion_output["patient"]["allergies"],
+            severity_hint=imaging["severity"],
+            condition_probs=imaging["condition_probs"],
+            snapshot=snapshot,
+            current_medications=current_medications,
+        )}
 
-        #calling doctor escalation agent
+    #function to call the doctor escalation agent
+    def _assess_escalation(self, therapy, imaging, snapshot) -> dict:
         red_flags = therapy.get("red_flags", [])
-        doctor_assessment = self.doctor_escalation.assess(
-            red_flags, severity, condition_probs
-        )
-        timeline.append(self._timeline_entry("doctor_escalation_evaluated"))
-
+        return {"doctor_assessment": self.doctor_escalation.assess(
+            red_flags, imaging["severity"], imaging["condition_probs"], doctors=snapshot.doctors
+        )}
 
-        #calling pharmacy agent
+    #function to call the pharmacy agent for the recommended OTC medicines
+    def _match_pharmacy(self, therapy, location, snapshot) -> dict:
         skus = [m["sku"] for m in therapy["otc_options"]]
-        if skus:
-            pharmacy_match = self.pharmacy.find_matches(
-                skus, user_lat=user_lat, user_lon=user_lon
-            )
-        else:
-            pharmacy_match = {"message": "No OTC medicines selected"}
-        timeline.append(self._timeline_entry("pharmacy_match_completed"))
-
-        #building medicine order preview
-        order_preview = self._build_order_preview(pharmacy_match)
-        if order_preview:
-            timeline.append(self._timeline_entry("order_preview_ready"))
-
-        #returning the final response from all the agents
+        if not skus:
+            return {"pharmacy_match": {"message": "No OTC medicines selected"}}
+        user_lat, user_lon = location
+        return {"pharmacy_match": self.pharmacy.find_matches(
+            skus, user_lat=user_lat, user_lon=user_lon,
+            fulfilment=self.FULFILMENT_MODE, snapshot=snapshot,
+        )}
+
+    #function to collect the inputs of one pipeline run
+    def _initial_values(self, image_file, name, phone, age, notes, allergies, pdf_file,
+                        user_lat, user_lon, pincode, current_medications) -> dict:
+        return {
+            "request": {
+                "image_file": image_file,
+                "name": name,
+                "phone": phone,
+                "age": age,
+                "notes": notes,
+                "allergies": allergies,
+                "pdf_file": pdf_file,
+            },
+            # Every stage of this run reads the same data snapshot
+            "snapshot": current_snapshot(),
+            "pincode": pincode,
+            "user_lat": user_lat,
+            "user_lon": user_lon,
+            "current_medications": current_medications,
+        }
+
+    #function to count the notable outcomes of a finished flow
+    def _record_outcomes(self, values: dict, seconds: float):
+        FLOW_SECONDS.observe(seconds)
+        FLOW_OUTCOMES.inc(outcome="completed")
+        if values["imaging"] is NO_IMAGING:
+            FLOW_OUTCOMES.inc(outcome="imaging_skipped")
+        if values["doctor_assessment"].get("doctor_escalation_needed"):
+            FLOW_OUTCOMES.inc(outcome="escalation_needed")
+        match = values["pharmacy_match"]
+        if values["therapy"]["otc_options"] and "pharmacy_id" not in match and "shipments" not in match:
+            FLOW_OUTCOMES.inc(outcome="no_pharmacy_found")
+
+    #function to assemble the final response from all the agents
+    def _final_payload(self, values: dict, timeline: list) -> dict:
+        ingestion_output = values["ingestion_output"]
+        imaging = values["imaging"]
+        doctor_assessment = values["doctor_assessment"]
         return {
             "ingestion_output": ingestion_output,
-            "patient": data["patient"],
+            "patient": ingestion_output["patient"],
             "diagnosis": {
-                "condition": condition,
-                "severity": severity,
-                "confidence_source": "xray" if data["xray_path"] else "symptoms",
+                "condition": imaging["condition"],
+                "severity": imaging["severity"],
+                # An x-ray the imaging backend could not decode gives no probabilities
+                "confidence_source": "xray" if imaging["condition_probs"] else "symptoms",
             },
-            "therapy_plan": therapy,
-            "pharmacy_match": pharmacy_match,
+            "therapy_plan": values["therapy"],
+            "pharmacy_match": values["pharmacy_match"],
             "doctor_escalation_needed": doctor_assessment["doctor_escalation_needed"],
             "escalation_suggestions": doctor_assessment["escalation_suggestions"],
             "doctor_assessment": doctor_assessment,
             "timeline": timeline,
-            "order_preview": order_preview,
+            "order_preview": values.get("order_preview"),
             "disclaimer": (
                 "This is not medical advice. Consult a doctor for diagnosis, "
                 "emergencies, or worsening symptoms."
             ),
         }
+
+    #main function that orchestrates the flow of the pipeline
+    def run_flow(
+        self,
+        image_file=None,
+        name=None,
+        phone=None,
+        age=None,
+        notes=None,
+        allergies=None,
+        pdf_file=None,
+        user_lat: float | None = None,
+        user_lon: float | None = None,
+        pincode: str | None = None,
+        current_medications=None,
+    ):
+        """
+        Execute the master pipeline through all agents.
+
+        Returns:
+            Consolidated plan with ingestion, diagnosis, therapy, pharmacy,
+            and escalation
+        """
+        start = perf_counter()
+        run = self.pipeline.run(self._initial_values(
+            image_file, name, phone, age, notes, allergies, pdf_file,
+            user_lat, user_lon, pincode, current_medications,
+        ))
+        self._record_outcomes(run.values, perf_counter() - start)
+        return self._final_payload(run.values, run.timeline)
+
+    #async version of run_flow for use inside an event loop
+    async def run_flow_async(
+        self,
+        image_file=None,
+        name=None,
+        phone=None,
+        age=None,
+        notes=None,
+        allergies=None,
+        pdf_file=None,
+        user_lat: float | None = None,
+        user_lon: float | None = None,
+        pincode: str | None = None,
+        current_medications=None,
+        executor=None,
+    ):
+        """
+        Same pipeline and payload as run_flow. The blocking agents run on
+        `executor` (default: the loop's thread pool), so one loop can serve
+        many flows at once.
+        """
+        start = perf_counter()
+        run = await self.pipeline.run_async(self._initial_values(
+            image_file, name, phone, age, notes, allergies, pdf_file,
+            user_lat, user_lon, pincode, current_medications,
+        ), executor=executor)
+        self._record_outcomes(run.values, perf_counter() - start)
+        return self._final_payload(run.values, run.timeline)
+
+    #function to triage many cases on a pool of worker processes
+    @classmethod
+    def run_flow_many(
+        cls,
+        cases,
+        workers: int | None = None,
+        ordered: bool = True,
+        chunk_size: int = 8,
+        max_in_flight: int | None = None,
+        upload_dir: str | None = None,
+        quiet: bool = True,
+    ):
+        """
+        Run run_flow over an iterable of cases (run_flow keyword arguments;
+        "image_path" / "pdf_path" are opened by the worker) and yield one
+        {"index", "ok", "result" | "error"} dict per case, in input order or,
+        with ordered=False, as chunks finish. A failing case (or one given
+        as an Exception, e.g. an unreadable input line) is reported instead
+        of aborting the batch.
+
+        Each worker process builds one Orchestrator, so datasets and indexes
+        load once per worker. Cases are sent `chunk_size` at a time and at
+        most `max_in_flight` chunks (default 2 per worker) are queued or
+        awaiting their turn in the output, so memory stays bounded however
+        long `cases` is. workers=1 runs inline in this process.
+        """
+        workers = workers or os.cpu_count() or 1
+        numbered = enumerate(cases)
+        if workers == 1:
+            orchestrator = _build_worker_orchestrator(cls, upload_dir)
+            for index, case in numbered:
+                yield {"index": index, **_run_case(orchestrator, case)}
+            return
+
+        max_in_flight = max_in_flight or 2 * workers
+        # "spawn": forking a process whose stage threads may hold locks
+        # (logging, snapshot loading) can leave a worker deadlocked
+        pool = ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_flow_worker,
+            initargs=(cls, upload_dir, quiet),
+        )
+        in_flight = {}
+        buffered = {}
+        submitted = next_index = 0
+        exhausted = False
+        try:
+            while True:
+                # Ordered output also counts finished chunks still waiting
+                # on an earlier slow one, so the buffer stays bounded too
+                while not exhausted and len(in_flight) < max_in_flight and (
+                    not ordered or submitted - next_index < max_in_flight * chunk_size
+                ):
+                    chunk = list(islice(numbered, chunk_size))
+                    if not chunk:
+                        exhausted = True
+                        break
+                    in_flight[pool.submit(_run_flow_chunk, chunk)] = chunk
+                    submitted += len(chunk)
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception as exc:
+                        # The worker itself died (e.g. killed); its cases fail
+                        results = [{"index": index, "ok": False, "error": _describe(exc)} for index, _ in chunk]
+                    if ordered:
+                        buffered.update((result["index"], result) for result in results)
+                    else:
+                        yield from results
+                while next_index in buffered:
+                    yield buffered.pop(next_index)
+                    next_index += 1
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+# Per-process Orchestrator used by run_flow_many workers
+_worker_orchestrator = None
+
+
+def _build_worker_orchestrator(cls, upload_dir):
+    orchestrator = cls()
+    if upload_dir:
+        from Agents.ingestion import IngestionAgent
+        orchestrator.ingestion = IngestionAgent(upload_dir=upload_dir)
+    return orchestrator
+
+
+def _init_flow_worker(cls, upload_dir, quiet):
+    global _worker_orchestrator
+    # Workers share the parent's stdout, which may be carrying results;
+    # per-stage INFO logs from every worker would also flood the console
+    log_to_stderr(logging.WARNING if quiet else None)
+    _worker_orchestrator = _build_worker_orchestrator(cls, upload_dir)
+
+
+def _describe(exc: BaseException) -> str:
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _run_case(orchestrator, case: dict) -> dict:
+    if isinstance(case, Exception):
+        # The case could not even be read (e.g. a malformed input line)
+        return {"ok": False, "error": _describe(case)}
+    opened = []
+    try:
+        kwargs = dict(case)
+        for path_key, file_key in (("image_path", "image_file"), ("pdf_path", "pdf_file")):
+            path = kwargs.pop(path_key, None)
+            if path:
+                upload = open(path, "rb")
+                opened.append(upload)
+                kwargs[file_key] = upload
+        return {"ok": True, "result": orchestrator.run_flow(**kwargs)}
+    except Exception as exc:
+        return {"ok": False, "error": _describe(exc)}
+    finally:
+        for upload in opened:
+            upload.close()
+
+
+def _run_flow_chunk(chunk: list) -> list:
+    return [{"index": index, **_run_case(_worker_orchestrator, case)} for index, case in chunk]
@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from Utils.constants import SEVERITY_SEVERE
 from Utils.logger import get_logger
@@ -13,7 +13,14 @@ class DoctorEscalationAgent:
         self.doctors = doctors
         self.confidence_threshold = confidence_threshold
 
-    def assess(self, red_flags: List[str], severity: str, condition_probs: Dict[str, float]):
+    def assess(
+        self,
+        red_flags: List[str],
+        severity: str,
+        condition_probs: Dict[str, float],
+        doctors: Optional[List[Dict[str, str]]] = None,
+    ):
+        doctors = self.doctors if doctors is None else doctors
         max_confidence = max(condition_probs.values()) if condition_probs else 0.0
         severity_warning = severity == SEVERITY_SEVERE
         red_flag_issue = any(
@@ -32,7 +39,7 @@ class DoctorEscalationAgent:
                     "tele_slots": doc.get("tele_slots", []),
                     "reason": "Severe findings or red flags detected",
                 }
-                for doc in self.doctors
+                for doc in doctors
             ]
 
         logger.info(
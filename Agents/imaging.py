@@ -1,24 +1,104 @@
+import hashlib
+import io
+import multiprocessing
+import os
 import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from Utils.constants import IMAGING_BACKEND, IMAGING_BATCH_SIZE, IMAGING_CACHE_SIZE, UPLOAD_CHUNK_BYTES
 from Utils.logger import get_logger
+from Utils.metrics import REGISTRY
+from Utils.result_cache import ResultCache
 
 logger = get_logger(__name__)
 
-class ImagingAgent:
+CACHE_LOOKUPS = REGISTRY.counter(
+    "imaging_cache_lookups_total", "Imaging result cache lookups by result (hit, miss)", ("result",)
+)
+
+INFERENCE_SECONDS = REGISTRY.histogram(
+    "imaging_inference_seconds", "Imaging classification latency (decode + inference) by backend", ("backend",)
+)
+
+# Filename words the demo classifier reacts to; they are part of the cache key
+HINT_WORDS = ("pneumonia", "covid", "normal", "severe", "moderate")
+
+# severity_hint of an x-ray the backend could not decode (no probabilities)
+UNREADABLE = "unreadable"
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def shared_imaging_cache() -> ResultCache:
+    """Process-wide cache used by every ImagingAgent not given its own."""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = ResultCache(IMAGING_CACHE_SIZE)
+    return _shared_cache
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _decode_chunk(paths, size):
+    """
+    Read, hash and decode one chunk of x-rays (runs in analyze_batch
+    workers). Returns (sha256s, uint8 (n, size, size) images, errors), with
+    None for the hash/error of files that could not be read/were fine.
+    """
+    import numpy as np
+    from Utils.xray_model import decode_image
+
+    hashes, errors = [], []
+    images = np.zeros((len(paths), size, size), dtype=np.uint8)
+    for i, path in enumerate(paths):
+        sha256 = error = None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            sha256 = hashlib.sha256(data).hexdigest()
+            images[i] = decode_image(io.BytesIO(data), size)
+        except (OSError, ValueError) as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        hashes.append(sha256)
+        errors.append(error)
+    return hashes, images, errors
+
+
+def _severity(pneumonia_prob):
+    if pneumonia_prob > 0.65:
+        return "severe"
+    if pneumonia_prob > 0.35:
+        return "moderate"
+    return "mild"
+
+
+class HeuristicBackend:
+    """
+    Lightweight mock classifier (Phase-2)
+    Uses filename hints for demo predictability, falls back to random
+    seeded from the content hash.
+    """
+    name = "heuristic"
 
     def __init__(self):
         self.labels = ["pneumonia","normal","covid_suspect"]
 
-    def analyze(self, xray_path):
-        """
-        Lightweight mock classifier (Phase-2)
-        Uses filename hints for demo predictability, falls back to random.
-        """
-
-        if not xray_path:
-            return {"condition_probs": None, "severity_hint": "no-image"}   # safe fallback
+    def key_parts(self, filename_lower):
+        return [w for w in HINT_WORDS if w in filename_lower]
 
+    def classify(self, xray_path, content_hash):
         filename_lower = xray_path.lower()
-
         # DEMO CHEAT CODE: Check filename for keywords
         if "pneumonia" in filename_lower:
             probs = {"pneumonia": 0.85, "normal": 0.10, "covid_suspect": 0.05}
@@ -30,19 +110,217 @@ class ImagingAgent:
             probs = {"pneumonia": 0.05, "normal": 0.90, "covid_suspect": 0.05}
             sev = "mild"
         else:
-            # Fallback: random stub predictions for unknown filenames
-            vals = [random.random() for _ in range(3)]
+            # Fallback: random stub predictions for unknown filenames,
+            # reproducible per image when its content hash is known
+            rng = random.Random(int(content_hash[:16], 16)) if content_hash else random
+            vals = [rng.random() for _ in range(3)]
             total = sum(vals)
             probs = {lbl: round(v/total, 2) for lbl, v in zip(self.labels, vals)}
-            
-            pneu = probs["pneumonia"]
-            if pneu > 0.65: sev = "severe"
-            elif pneu > 0.35: sev = "moderate"
-            else: sev = "mild"
-
-        logger.info("Imaging output %s severity=%s", probs, sev)
+            sev = _severity(probs["pneumonia"])
 
         return {
             "condition_probs": probs,
-            "severity_hint": sev
+            "severity_hint": sev,
+            "backend": self.name,
+        }
+
+
+class NumpyBackend:
+    """
+    Utils.xray_model: decoded pixels -> NumPy features -> MLP, on the CPU.
+    The answer depends on the pixels only, not the filename.
+    """
+
+    def __init__(self, model_dir=None):
+        from Utils.xray_model import get_xray_model
+        import PIL  # noqa: F401  fail now, not on the first x-ray
+        self.model = get_xray_model(model_dir)
+        self.name = f"numpy-{self.model.version}"
+
+    def key_parts(self, filename_lower):
+        return [self.name]
+
+    def load(self, xray_path):
+        from Utils.xray_model import load_image
+        return load_image(xray_path, self.model.input_size)
+
+    def classify_images(self, images):
+        """Results for a stacked (N, S, S) batch, in order."""
+        return [
+            {
+                "condition_probs": {label: round(float(p), 2) for label, p in zip(self.model.labels, row)},
+                "severity_hint": _severity(float(row[self.model.labels.index("pneumonia")])),
+                "backend": self.name,
+            }
+            for row in self.model.predict(images)
+        ]
+
+    def classify(self, xray_path, content_hash):
+        return self.classify_images(self.load(xray_path)[None])[0]
+
+
+BACKENDS = {"heuristic": HeuristicBackend, "numpy": NumpyBackend}
+
+
+class ImagingAgent:
+
+    def __init__(self, cache=None, backend=None):
+        self.labels = ["pneumonia","normal","covid_suspect"]
+        # Pass ResultCache(disk_dir=...) to persist results across restarts
+        self.cache = cache or shared_imaging_cache()
+        self.fallback = HeuristicBackend()
+        self.backend = self._make_backend(backend or IMAGING_BACKEND)
+
+    def _make_backend(self, backend):
+        """A backend instance, or its name in BACKENDS"""
+        if not isinstance(backend, str):
+            return backend
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown imaging backend: {backend} (expected one of {', '.join(BACKENDS)})")
+        try:
+            return BACKENDS[backend]()
+        except (OSError, ImportError) as exc:
+            logger.warning("Imaging backend %s unavailable (%s); using filename heuristics", backend, exc)
+            return self.fallback
+
+    def _content_hash(self, xray_path, content_hash):
+        if content_hash:
+            return content_hash
+        try:
+            return file_sha256(xray_path)
+        except OSError:
+            return None  # e.g. a bare filename in a demo; not cacheable
+
+    def analyze(self, xray_path, content_hash=None):
+        """
+        Classify the x-ray with the configured backend (IMAGING_BACKEND).
+
+        Results are cached by the x-ray's SHA-256 (pass `content_hash` when
+        it is already known, e.g. from ingestion) plus the backend's key
+        parts (the filename hints for the heuristic backend), and the
+        heuristic's random fallback is seeded from the hash, so a
+        re-uploaded x-ray gets the same answer whether or not it was cached.
+        Every result names the backend that produced it. An image the
+        backend can't decode gets no probabilities and severity_hint
+        "unreadable" (not cached), never another backend's guess.
+        """
+
+        if not xray_path:
+            return {"condition_probs": None, "severity_hint": "no-image"}   # safe fallback
+
+        filename_lower = xray_path.lower()
+        content_hash = self._content_hash(xray_path, content_hash)
+        key = None
+        if content_hash:
+            key = "-".join([content_hash] + self.backend.key_parts(filename_lower))
+            cached = self.cache.get(key)
+            if cached is not None:
+                CACHE_LOOKUPS.inc(result="hit")
+                logger.info("Imaging output (cached) %s severity=%s",
+                            cached["condition_probs"], cached["severity_hint"])
+                return cached
+            CACHE_LOOKUPS.inc(result="miss")
+
+        result = self._classify(xray_path, content_hash)
+        if key and result["severity_hint"] != UNREADABLE:
+            self.cache.put(key, result)
+        return result
+
+    def _unreadable(self, xray_path, error):
+        logger.warning("Imaging backend %s could not classify %s: %s", self.backend.name, xray_path, error)
+        return {
+            "condition_probs": None,
+            "severity_hint": UNREADABLE,
+            "backend": self.backend.name,
+            "error": "The x-ray could not be decoded",
         }
+
+    def _classify(self, xray_path, content_hash):
+        """Backend result, or the unreadable result when it could not read the image."""
+        start = time.perf_counter()
+        try:
+            result = self.backend.classify(xray_path, content_hash)
+        except (OSError, ValueError) as exc:
+            return self._unreadable(xray_path, exc)
+        INFERENCE_SECONDS.labels(backend=self.backend.name).observe(time.perf_counter() - start)
+        logger.info("Imaging output %s severity=%s", result["condition_probs"], result["severity_hint"])
+        return result
+
+    def analyze_batch(self, paths, workers=None, batch_size=IMAGING_BATCH_SIZE, max_in_flight=None):
+        """
+        Classify many x-rays, yielding (path, result) as each batch finishes,
+        so not necessarily in input order. Results match analyze() and share
+        its cache.
+
+        With a batched backend (numpy), worker processes read, hash and
+        decode `batch_size` paths at a time while this process runs
+        inference on finished chunks as one fixed-size (batch_size, S, S)
+        tensor (the last one zero-padded). At most `max_in_flight` chunks
+        (default 2 per worker) are submitted and not yet consumed, so memory
+        stays bounded however long `paths` is. workers=1 decodes inline.
+        Other backends simply call analyze() per path.
+        """
+        if not hasattr(self.backend, "classify_images"):
+            for path in paths:
+                yield path, self.analyze(path)
+            return
+
+        size = self.backend.model.input_size
+        remaining = iter(paths)
+        chunks = iter(lambda: list(islice(remaining, batch_size)), [])
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            for chunk in chunks:
+                yield from self._infer_chunk(chunk, *_decode_chunk(chunk, size), batch_size)
+            return
+
+        max_in_flight = max_in_flight or 2 * workers
+        # "spawn", as in Orchestrator.run_flow_many: never fork a threaded process
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        in_flight = {}
+        try:
+            while True:
+                while len(in_flight) < max_in_flight:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    in_flight[pool.submit(_decode_chunk, chunk, size)] = chunk
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    try:
+                        decoded = future.result()
+                    except Exception as exc:
+                        # The worker itself died; its images are unreadable
+                        error = f"{type(exc).__name__}: {exc}"
+                        decoded = ([None] * len(chunk), None, [error] * len(chunk))
+                    yield from self._infer_chunk(chunk, *decoded, batch_size)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _infer_chunk(self, paths, hashes, images, errors, batch_size):
+        """(path, result) for one decoded chunk: cache hits, one batched inference, unreadable images."""
+        import numpy as np
+
+        results = [None] * len(paths)
+        keys = [None] * len(paths)
+        todo = []
+        for i, (path, sha256, error) in enumerate(zip(paths, hashes, errors)):
+            if error is not None:
+                results[i] = self._unreadable(path, error)
+                continue
+            keys[i] = "-".join([sha256] + self.backend.key_parts(path.lower()))
+            results[i] = self.cache.get(keys[i])
+            CACHE_LOOKUPS.inc(result="miss" if results[i] is None else "hit")
+            if results[i] is None:
+                todo.append(i)
+
+        if todo:
+            batch = np.zeros((max(batch_size, len(todo)),) + images.shape[1:], dtype=np.float32)
+            batch[:len(todo)] = images[todo] / np.float32(255.0)
+            for i, result in zip(todo, self.backend.classify_images(batch)):
+                self.cache.put(keys[i], result)
+                results[i] = result
+        return zip(paths, results)
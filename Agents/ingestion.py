@@ -1,24 +1,35 @@
 import os
-import uuid
 import re
 from pathlib import Path
 """Ingestion Agent: Handles file validation, PII masking, and file saving."""
 
-from Utils.constants import UPLOADS_DIR
+from Utils.constants import UPLOADS_DIR, MAX_IMAGE_BYTES, MAX_PDF_BYTES, PDF_PREVIEW_CHARS
 from Utils.logger import get_logger
+from Utils.pdf_text import extract_pdf_pages
+from Utils.uploads import save_upload_stream
 
 logger = get_logger(__name__)
 
+# Ten digits, optionally split by spaces or dashes (what mask_phone accepts)
+PHONE_IN_TEXT = re.compile(r"(?<!\d)\d(?:[ -]?\d){9}(?!\d)")
+
+
+class InvalidInput(ValueError):
+    """Patient input that fails validation (missing or malformed fields)."""
+
+
 class IngestionAgent:
 
-    def __init__(self, upload_dir=UPLOADS_DIR):
+    def __init__(self, upload_dir=UPLOADS_DIR, max_image_bytes=MAX_IMAGE_BYTES, max_pdf_bytes=MAX_PDF_BYTES):
         self.upload_dir = upload_dir
+        self.max_image_bytes = max_image_bytes
+        self.max_pdf_bytes = max_pdf_bytes
         self.images_dir = os.path.join(upload_dir, "images")
         self.pdfs_dir = os.path.join(upload_dir, "pdfs")
         os.makedirs(self.images_dir, exist_ok=True)
         os.makedirs(self.pdfs_dir, exist_ok=True)
 
-    def _save_upload(self, upload_file, target_dir):
+    def _save_upload(self, upload_file, target_dir, allowed, max_bytes, label):
         """
         Save an uploaded file under a unique, *non-identifying* name.
 
@@ -35,10 +46,15 @@ class IngestionAgent:
           condition keywords.
         - If any are present, keep only that keyword as a prefix.
         - Otherwise, use a generic 'xray' prefix.
-        - Always append a short random suffix so filenames are unique.
+        - Append the content's SHA-256, so re-uploading the same file
+          reuses the stored copy instead of writing another one.
+
+        The file is streamed to disk in chunks; its type comes from its
+        magic bytes (the extension is whatever the content is), and the
+        size cap and SHA-256 are handled in the same pass.
+        Returns a SavedUpload (path, kind, size, sha256).
         """
-        suffix = Path(upload_file.name).suffix or ""
-        stem = Path(upload_file.name).stem.lower()
+        stem = Path(getattr(upload_file, "name", None) or "").stem.lower()
 
         keywords = ["pneumonia", "covid", "normal"]
         keyword_prefix = None
@@ -48,11 +64,7 @@ class IngestionAgent:
                 break
 
         base_prefix = keyword_prefix or "xray"
-        unique_name = f"{base_prefix}_{uuid.uuid4().hex[:6]}{suffix}"
-        save_path = os.path.join(target_dir, unique_name)
-        with open(save_path, "wb") as f:
-            f.write(upload_file.read())
-        return save_path.replace("\\", "/")
+        return save_upload_stream(upload_file, target_dir, base_prefix, allowed, max_bytes, label)
 
     def _normalize_allergies(self, allergies):
         if not allergies:
@@ -61,7 +73,7 @@ class IngestionAgent:
             return [str(a).strip() for a in allergies if str(a).strip()]
         if isinstance(allergies, str):
             return [a.strip() for a in allergies.split(",") if a.strip()]
-        raise ValueError("Allergies must be a string or list of strings")
+        raise InvalidInput("Allergies must be a string or list of strings")
 
     def _log_notes_snippet(self, notes):
         snippet = (notes or "").strip().replace("\n", " ")
@@ -72,7 +84,7 @@ class IngestionAgent:
     # PII Masking
     def mask_name(self, name):
         if not name:
-            raise Exception("Name is required")
+            raise InvalidInput("Name is required")
 
         if len(name) < 3:
             return "*" * len(name)
@@ -82,15 +94,25 @@ class IngestionAgent:
 
     def mask_phone(self, phone):
         if not phone:
-            raise Exception("Phone number is required")
+            raise InvalidInput("Phone number is required")
 
         digits = re.sub(r"\D", "", phone)
 
         if len(digits) != 10:
-            raise Exception("Phone number must be 10 digits")
+            raise InvalidInput("Phone number must be 10 digits")
 
         return "#" * 8 + digits[-2:]
 
+    def mask_text(self, text, name=None):
+        """ Free text with the patient's name (each word) and any phone numbers masked """
+        if not text:
+            return text
+        for part in (name or "").split():
+            text = re.sub(
+                rf"\b{re.escape(part)}\b", lambda m: self.mask_name(m.group()), text, flags=re.IGNORECASE
+            )
+        return PHONE_IN_TEXT.sub(lambda m: self.mask_phone(m.group()), text)
+
     # Mock Allergy Detection
     def extract_allergies(self, notes):
         # allergy to any medicines
@@ -100,47 +122,62 @@ class IngestionAgent:
         lowercased_notes = notes.lower()
         return [a for a in allergies_db if a in lowercased_notes]
 
-    def extract_pdf_text(self, pdf_path):
-        """Mock OCR - returns dummy extracted text"""
+    def extract_pdf_pages(self, pdf_path, sha256=None):
+        """Text of each page (text layer only, no OCR), cached by content hash"""
+        if not pdf_path:
+            return []
+        return extract_pdf_pages(pdf_path, sha256)
+
+    def extract_pdf_text(self, pdf_path, sha256=None):
+        """All extracted text as one string"""
         if not pdf_path:
             return None
-        # In real system, use pytesseract/pdfplumber here
-        return "Mock extracted text: Patient complains of persistent cough and fever for 3 days. Temperature 101F."
+        return "\n".join(self.extract_pdf_pages(pdf_path, sha256))
 
     # MAIN PROCESS METHOD
     def process(self, image_file=None, name=None, phone=None, age=None, notes=None, pdf_file=None, allergies=None):
         """ Returns details of patient with xray and health problem (notes) """
         # At least one clinical input required
         if not (image_file or notes or pdf_file):
-            raise Exception("At least one clinical input (Image, PDF, or Symptoms) is required")
+            raise InvalidInput("At least one clinical input (Image, PDF, or Symptoms) is required")
 
         xray_path = None
+        xray_sha256 = None
         pdf_path = None
+        pdf_sha256 = None
+        pdf_pages = []
         pdf_text = None
 
-        # Handle optional image
+        # Handle optional image (PNG/JPEG, checked from the content)
         if image_file:
-            allowed_ext = (".png", ".jpg", ".jpeg")
-            if not image_file.name.lower().endswith(allowed_ext):
-                raise Exception("Invalid image file type")
-
-            # Save image
-            xray_path = self._save_upload(image_file, self.images_dir)
-            logger.info("Stored X-Ray at: %s", xray_path)
+            saved = self._save_upload(
+                image_file, self.images_dir, ("png", "jpeg"), self.max_image_bytes, "image"
+            )
+            xray_path, xray_sha256 = saved.path, saved.sha256
+            logger.info(
+                "%s X-Ray at: %s (%d bytes)", "Reused" if saved.reused else "Stored", xray_path, saved.size
+            )
 
         # Handle optional PDF
         if pdf_file:
-            if not pdf_file.name.lower().endswith(".pdf"):
-                raise Exception("Invalid PDF file type")
-            
-            # Save PDF
-            pdf_path = self._save_upload(pdf_file, self.pdfs_dir)
-            pdf_text = self.extract_pdf_text(pdf_path)
-            logger.info("Stored PDF at: %s with text: %s", pdf_path, pdf_text)
+            saved = self._save_upload(pdf_file, self.pdfs_dir, ("pdf",), self.max_pdf_bytes, "PDF")
+            pdf_path, pdf_sha256 = saved.path, saved.sha256
+            # Reports carry patient identifiers: only masked text leaves here
+            pdf_pages = [self.mask_text(page, name) for page in self.extract_pdf_pages(pdf_path, pdf_sha256)]
+            # The full text only travels as pages; callers get a short preview
+            pdf_text = " ".join(" ".join(pdf_pages)[:PDF_PREVIEW_CHARS].split())
+            logger.info(
+                "Stored PDF at: %s (%d pages, %d characters of text)",
+                pdf_path, len(pdf_pages), sum(map(len, pdf_pages)),
+            )
 
         # Mask sensitive data internally (not included in output)
         masked_name = self.mask_name(name)
         masked_phone = self.mask_phone(phone)
+        if age is None:
+            raise InvalidInput("Age is required")
+        if isinstance(age, bool) or not isinstance(age, int) or age < 0:
+            raise InvalidInput("Age must be a non-negative whole number")
 
         logger.info("Masked Name: %s", masked_name)
         logger.info("Masked Phone: %s", masked_phone)
@@ -162,6 +199,9 @@ class IngestionAgent:
                 "allergies": allergies_list
             },
             "xray_path": xray_path,
+            "xray_sha256": xray_sha256,
+            "pdf_sha256": pdf_sha256,
             "notes": notes or "",
-            "pdf_text": pdf_text
+            "pdf_text": pdf_text,
+            "pdf_pages": pdf_pages
         }
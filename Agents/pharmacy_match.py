@@ -1,55 +1,313 @@
+from functools import cached_property
+
+import numpy as np
+
 from Utils.logger import get_logger
-from Utils.data_loader import load_pharmacies, load_inventory
+from Utils.data_loader import load_inventory
+from Utils.geo import GeoGrid, haversine_km
+from Utils.inventory_store import get_inventory_store
+from Utils.set_cover import cheapest_cover
+from Utils.snapshot import current_snapshot
+from Utils.constants import PHARMACY_MAX_DISTANCE_KM
 
 logger = get_logger(__name__)
 
+
+class PharmacyNetwork:
+    """ Pharmacy locations + spatial index, derived once per pharmacies.json version """
+
+    def __init__(self, pharmacies):
+        self.pharmacies = pharmacies
+        # Built once so each request only scores pharmacies near the user
+        self.geo_index = GeoGrid((ph["lat"], ph["lon"]) for ph in pharmacies)
+        self.lats = np.array([ph["lat"] for ph in pharmacies], dtype=float)
+        self.lons = np.array([ph["lon"] for ph in pharmacies], dtype=float)
+        # A pharmacy delivers within its own radius, capped by the global limit
+        self.reach_km = np.minimum(
+            np.array(
+                [ph.get("delivery_km", PHARMACY_MAX_DISTANCE_KM) for ph in pharmacies],
+                dtype=float,
+            ),
+            PHARMACY_MAX_DISTANCE_KM,
+        )
+        self.search_km = float(self.reach_km.max()) if len(self.reach_km) else 0.0
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        return cls(snapshot.pharmacies)
+
+    def deliverable(self, user_lat, user_lon):
+        """
+        Pharmacies whose delivery radius covers the user, as a list of
+        (pharmacy index, distance in km) in pharmacies.json order.
+        """
+        idxs = np.array(
+            self.geo_index.query(user_lat, user_lon, self.search_km), dtype=int
+        )
+        if not len(idxs):
+            return []
+        dists = haversine_km(user_lat, user_lon, self.lats[idxs], self.lons[idxs])
+        covered = dists <= self.reach_km[idxs]
+        return list(zip(idxs[covered].tolist(), dists[covered].tolist()))
+
+    @cached_property
+    def index_of(self):
+        """ pharmacy id -> position in pharmacies.json """
+        return {ph["id"]: idx for idx, ph in enumerate(self.pharmacies)}
+
+    def deliverable_many(self, coords):
+        """
+        deliverable() for many (lat, lon) pairs as {coord: (indices, distances)}
+        arrays; one vectorized haversine over each location's own candidates.
+        """
+        candidates = [np.array(self.geo_index.query(lat, lon, self.search_km), dtype=int) for lat, lon in coords]
+        sizes = [len(idxs) for idxs in candidates]
+        if not sum(sizes):
+            return {coord: (np.zeros(0, dtype=int), np.zeros(0)) for coord in coords}
+        flat = np.concatenate(candidates)
+        lat_rep = np.repeat(np.array([lat for lat, _ in coords], dtype=float), sizes)
+        lon_rep = np.repeat(np.array([lon for _, lon in coords], dtype=float), sizes)
+        dists = haversine_km(lat_rep, lon_rep, self.lats[flat], self.lons[flat])
+        covered = dists <= self.reach_km[flat]
+
+        deliverable_at = {}
+        bounds = np.cumsum([0] + sizes)
+        for coord, lo, hi in zip(coords, bounds[:-1], bounds[1:]):
+            keep = covered[lo:hi]
+            deliverable_at[coord] = (flat[lo:hi][keep], dists[lo:hi][keep])
+        return deliverable_at
+
+
+class _SkuPostings:
+    """
+    Static postings of each SKU as arrays (pharmacy position in
+    pharmacies.json, inventory row), built on first use per network +
+    inventory index. Position -1 marks a pharmacy missing from the network.
+    """
+
+    def __init__(self, network, index):
+        self.network = network
+        self.index = index
+        self._by_sku = {}
+
+    def get(self, sku):
+        arrays = self._by_sku.get(sku)
+        if arrays is None:
+            postings = self.index.postings(sku)
+            arrays = self._by_sku.setdefault(sku, (
+                np.array([self.network.index_of.get(p.pharmacy_id, -1) for p in postings], dtype=int),
+                np.array([p.row for p in postings], dtype=int),
+                postings,
+            ))
+        return arrays
+
+    def live_at(self, store, skus, reachable):
+        """
+        In-stock postings of `skus` at pharmacies where reachable[position]:
+        (positions, rows, [(posting, live qty)]). Live quantities are read
+        only for those postings.
+        """
+        ph, rows, lines = [], [], []
+        for sku in dict.fromkeys(skus):
+            sku_ph, sku_rows, postings = self.get(sku)
+            keep = np.flatnonzero(reachable[sku_ph])
+            qtys = [store.available(postings[i].pharmacy_id, sku) for i in keep.tolist()]
+            keep = keep[np.array(qtys, dtype=int) > 0] if qtys else keep
+            ph.append(sku_ph[keep])
+            rows.append(sku_rows[keep])
+            lines.extend((postings[i], qty) for i, qty in zip(keep.tolist(), (q for q in qtys if q > 0)))
+        return np.concatenate(ph), np.concatenate(rows), lines
+
+
 class PharmacyAgent:
 
-    def __init__(self):
-        self.inventory = load_inventory()
-        self.pharmacies = load_pharmacies()
+    def __init__(self, store=None):
+        # Pinned live inventory (tests/tools); by default each request uses
+        # the store of the data snapshot it runs against
+        self._store = store
+        self._postings = None
+
+    def _resources(self, snapshot=None):
+        """ (network, store) for one request, both from the same snapshot """
+        snapshot = snapshot or current_snapshot()
+        network = snapshot.derive("pharmacy_network", ("pharmacies",), PharmacyNetwork.from_snapshot)
+        return network, self._store or get_inventory_store(snapshot)
+
+    @property
+    def store(self):
+        return self._resources()[1]
 
-    def _distance(self, lat1, lon1, lat2, lon2):
-        """ Dummy Manhattan distance for POC """
-        return abs(lat1-lat2) + abs(lon1-lon2)
+    @property
+    def inventory_index(self):
+        return self.store.index
+
+    @property
+    def inventory(self):
+        return load_inventory()
+
+    @property
+    def pharmacies(self):
+        return self._resources()[0].pharmacies
 
     def _estimate_eta_fee(self, distance):
-        """ Convert distance → ETA + delivery fee (POC Rules) """
-        if distance <= 0.03:   return 20, 15
-        if distance <= 0.07:   return 40, 25
+        """ Convert distance (km) → ETA + delivery fee (POC Rules) """
+        if distance <= 3:   return 20, 15
+        if distance <= 7:   return 40, 25
         return 60, 40
 
-    def find_matches(self, medicine_skus, user_lat=19.12, user_lon=72.84):
+    def find_matches(self, medicine_skus, user_lat=19.12, user_lon=72.84, fulfilment="single", snapshot=None):
         """
-        1. Filter inventory where sku in medicine list and qty > 0
-        2. Match with pharmacies.json
-        3. Compute nearest & delivery feasibility
+        1. Keep pharmacies whose delivery radius covers the user
+        2. Look up in-stock postings for the requested SKUs at those pharmacies
+        3. Rank by great-circle distance
         4. Return JSON for best match
+
+        fulfilment="split" instead covers as much of the basket as possible
+        across the fewest pharmacies at the lowest total cost (see _plan_split).
+        """
+        network, store = self._resources(snapshot)
+        return self._match(
+            network,
+            store,
+            medicine_skus,
+            fulfilment,
+            lambda: network.deliverable(user_lat, user_lon),
+            lambda ph_ids: store.match(medicine_skus, pharmacy_ids=ph_ids),
+        )
+
+    def find_matches_batch(self, requests, fulfilment="single", chunk_size=512, snapshot=None):
+        """
+        Answer many (medicine_skus, user_lat, user_lon) requests together.
+
+        Per chunk of requests, distances from every distinct user location to
+        its candidate pharmacies come from one vectorized haversine call.
+        Each request then masks the SKU posting arrays (_SkuPostings) by its
+        deliverable pharmacies, reads live stock only for those postings and
+        builds items only for the pharmacies it returns. Results are in
+        request order and identical to calling find_matches.
         """
+        network, store = self._resources(snapshot)
+        requests = list(requests)
+        results = []
+        for start in range(0, len(requests), chunk_size):
+            chunk = requests[start:start + chunk_size]
+            results.extend(self._match_chunk(network, store, chunk, fulfilment))
+        return results
+
+    def _sku_postings(self, network, store):
+        """ _SkuPostings for this network + inventory, rebuilt when either changes """
+        cached = self._postings
+        if cached is None or cached.network is not network or cached.index is not store.index:
+            cached = self._postings = _SkuPostings(network, store.index)
+        return cached
 
+    def _match_chunk(self, network, store, chunk, fulfilment):
+        deliverable_at = network.deliverable_many(
+            list(dict.fromkeys((lat, lon) for _, lat, lon in chunk))
+        )
+        postings = self._sku_postings(network, store)
+        return [
+            self._match_arrays(network, store, skus, fulfilment, deliverable_at[(lat, lon)], postings)
+            for skus, lat, lon in chunk
+        ]
+
+    def _match_arrays(self, network, store, medicine_skus, fulfilment, deliverable, postings):
+        """ _match for one batch request, selecting pharmacies with array ops """
         if not medicine_skus:
             return {"message": "No medicines requested"}
 
-        # Step 1: Inventory filter
-        stock = self.inventory[self.inventory["sku"].isin(medicine_skus)]
-        stock = stock[stock["qty"] > 0]
+        if not store.stocks_any(medicine_skus):
+            return {"message":"Requested medicines not available anywhere"}
+
+        idxs, dists = deliverable
+        if not len(idxs):
+            return {"message":"No pharmacy delivers to this location"}
+
+        # The extra last slot is position -1, a pharmacy outside the network
+        reachable = np.zeros(len(network.pharmacies) + 1, dtype=bool)
+        reachable[idxs] = True
+        ph, rows, lines = postings.live_at(store, medicine_skus, reachable)
+        counts = np.bincount(ph, minlength=len(network.pharmacies))
+        stocked = counts[idxs] > 0
+        if not stocked.any():
+            return {"message":"No pharmacy stocks required meds nearby"}
+
+        def items_at(positions):
+            # Items per pharmacy in inventory row order, as InventoryIndex.match builds them
+            order = np.lexsort((rows, ph))
+            wanted = np.isin(ph[order], positions)
+            items = {}
+            for i in order[wanted].tolist():
+                p, qty = lines[i]
+                items.setdefault(network.pharmacies[ph[i]]["id"], []).append(
+                    {"sku": p.sku, "drug_name": p.drug_name, "qty": qty, "price": p.price}
+                )
+            return items
+
+        cand_idxs, cand_dists = idxs[stocked], dists[stocked]
+        if fulfilment == "split":
+            stock = items_at(cand_idxs)
+            return self._plan_split(
+                network, medicine_skus, list(zip(cand_idxs.tolist(), cand_dists.tolist())), stock
+            )
+
+        # Same ranking as _match: nearest (to the metre) -> most items -> lowest fee,
+        # first in pharmacies.json order on ties; only near-nearest ones can win
+        near = np.flatnonzero(cand_dists <= cand_dists.min() + 0.001)
+        best = min(
+            near.tolist(),
+            key=lambda i: (
+                round(float(cand_dists[i]), 3),
+                -int(counts[cand_idxs[i]]),
+                self._estimate_eta_fee(float(cand_dists[i]))[1],
+                i,
+            ),
+        )
+        best_idx, best_dist = int(cand_idxs[best]), float(cand_dists[best])
+        eta, fee = self._estimate_eta_fee(best_dist)
+        ph_id = network.pharmacies[best_idx]["id"]
+        return {
+            "pharmacy_id": ph_id,
+            "items": items_at([best_idx])[ph_id],
+            "eta_min": eta,
+            "delivery_fee": fee,
+        }
+
+    def _match(self, network, store, medicine_skus, fulfilment, deliverable_fn, stock_fn):
+        """
+        Shared ranking for find_matches / find_matches_batch.
+
+        deliverable_fn() -> [(pharmacy index, distance km)] covering the user
+        stock_fn(pharmacy_ids) -> pharmacy_id -> in-stock items
+        """
+        if not medicine_skus:
+            return {"message": "No medicines requested"}
 
-        if stock.empty:
+        if not store.stocks_any(medicine_skus):
             return {"message":"Requested medicines not available anywhere"}
 
+        # Step 1: Delivery feasibility (spatial index + vectorized haversine)
+        deliverable = deliverable_fn()
+        if not deliverable:
+            return {"message":"No pharmacy delivers to this location"}
+
+        # Step 2: Inventory postings at deliverable pharmacies only
+        ph_ids = {network.pharmacies[i]["id"] for i, _ in deliverable}
+        stock = stock_fn(ph_ids)
+
+        if fulfilment == "split":
+            return self._plan_split(network, medicine_skus, deliverable, stock)
+
         results=[]
 
-        # Step 2: Join with pharmacy geo data
-        for ph in self.pharmacies:
-            ph_id = ph["id"]
-            subset = stock[stock["pharmacy_id"] == ph_id]
+        for idx, dist in deliverable:
+            ph_id = network.pharmacies[idx]["id"]
+            items = stock.get(ph_id)
 
-            if subset.empty:
+            if not items:
                 continue
 
-            dist = self._distance(user_lat, user_lon, ph["lat"], ph["lon"])
             eta, fee = self._estimate_eta_fee(dist)
-            items = subset[["sku","drug_name","qty","price"]].to_dict(orient="records")
 
             results.append({
                 "pharmacy_id": ph_id,
@@ -74,3 +332,59 @@ class PharmacyAgent:
             "eta_min": best["eta_min"],
             "delivery_fee": best["delivery_fee"]
         }
+
+    def _plan_split(self, network, medicine_skus, deliverable, stock):
+        """
+        Split-fulfilment basket: fewest pharmacies first, then lowest
+        item prices + delivery fees. A single-store plan keeps the regular
+        find_matches shape; multi-store plans return one entry per shipment.
+        SKUs no deliverable pharmacy stocks are listed in unfulfilled_skus.
+        """
+        stores = [
+            (network.pharmacies[idx]["id"], dist, stock[network.pharmacies[idx]["id"]])
+            for idx, dist in deliverable
+            if network.pharmacies[idx]["id"] in stock
+        ]
+        if not stores:
+            return {"message":"No pharmacy stocks required meds nearby"}
+
+        wanted = list(dict.fromkeys(medicine_skus))
+        offered = {item["sku"] for _, _, items in stores for item in items}
+        coverable = [sku for sku in wanted if sku in offered]
+        unfulfilled = [sku for sku in wanted if sku not in offered]
+        bit_of = {sku: i for i, sku in enumerate(coverable)}
+
+        # Python ints: a basket may have more SKUs than an int64 has bits
+        masks = [0] * len(stores)
+        prices = np.zeros((len(stores), len(coverable)))
+        fees = np.zeros(len(stores))
+        for s, (_, dist, items) in enumerate(stores):
+            fees[s] = self._estimate_eta_fee(dist)[1]
+            for item in items:
+                masks[s] |= 1 << bit_of[item["sku"]]
+                prices[s, bit_of[item["sku"]]] = float(item["price"] or 0)
+
+        shipments = []
+        for s, part in sorted(cheapest_cover(masks, fees, prices), key=lambda p: stores[p[0]][1]):
+            ph_id, dist, items = stores[s]
+            eta, fee = self._estimate_eta_fee(dist)
+            shipments.append({
+                "pharmacy_id": ph_id,
+                "items": [i for i in items if part >> bit_of[i["sku"]] & 1],
+                "eta_min": eta,
+                "delivery_fee": fee,
+            })
+
+        if len(shipments) == 1:
+            plan = dict(shipments[0])
+        else:
+            plan = {
+                "shipments": shipments,
+                "items": [item for ship in shipments for item in ship["items"]],
+                "eta_min": max(ship["eta_min"] for ship in shipments),
+                "delivery_fee": sum(ship["delivery_fee"] for ship in shipments),
+            }
+        if unfulfilled:
+            plan["unfulfilled_skus"] = unfulfilled
+        logger.info("Split basket: %d shipment(s), unfulfilled=%s", len(shipments), unfulfilled)
+        return plan
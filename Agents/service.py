@@ -0,0 +1,468 @@
+"""
+JSON-over-HTTP service around the Orchestrator (stdlib only).
+
+    POST /run_flow         run_flow arguments as JSON, or multipart/form-data
+                           with the same fields plus image_file / pdf_file
+                           (streamed to temporary files, never buffered whole);
+                           400 for a malformed request, 422 for invalid
+                           patient input, 500 for anything else
+    POST /finalize_order   {"order_preview": {...}} from a run_flow response;
+                           priced from the inventory, 409 if the stock is
+                           gone, 422 for an invalid order
+    GET  /healthz          pool status
+    GET  /metrics          Prometheus text (Utils.metrics)
+
+Requests are handled on threads, but each one borrows a warm Orchestrator
+from a fixed-size pool, so at most `pool_size` flows run at once; a request
+that can't get one within `acquire_timeout` seconds gets a 503.
+
+    python -m Agents.service --port 8080 --pool-size 4
+"""
+
+import argparse
+import email.message
+import email.policy
+import inspect
+import json
+import math
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+from Agents.coordinator import Orchestrator
+from Agents.ingestion import InvalidInput
+from Utils.constants import MAX_IMAGE_BYTES, MAX_PDF_BYTES, UPLOAD_CHUNK_BYTES
+from Utils.inventory_store import InvalidOrderError, OutOfStockError
+from Utils.logger import get_logger
+from Utils.metrics import REGISTRY, render_prometheus
+from Utils.upload_gc import start_upload_gc
+from Utils.uploads import UploadRejected
+
+logger = get_logger(__name__)
+
+MAX_BODY_BYTES = 25 * 1024 * 1024  # JSON bodies, read into memory
+# Multipart bodies stream their files to temporary files: both uploads at
+# their caps plus the form fields
+MAX_UPLOAD_BODY_BYTES = MAX_IMAGE_BYTES + MAX_PDF_BYTES + 1024 * 1024
+MAX_FIELD_BYTES = 64 * 1024
+MAX_PART_HEADER_BYTES = 16 * 1024
+FILE_FIELDS = ("image_file", "pdf_file")
+RUN_FLOW_FIELDS = tuple(inspect.signature(Orchestrator.run_flow).parameters)[1:]
+# run_flow arguments that are numbers (multipart fields arrive as text) and
+# those that must be text; both JSON and form input are checked against them
+NUMERIC_FIELDS = {"age": int, "user_lat": float, "user_lon": float}
+TEXT_FIELDS = ("name", "phone", "notes", "pincode")
+LIST_FIELDS = ("allergies", "current_medications")  # a list or comma-separated text
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_seconds", "HTTP service request latency", ("endpoint",)
+)
+REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP service requests by endpoint and status code", ("endpoint", "status")
+)
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class OrchestratorPool:
+    """Fixed set of warm Orchestrators handed out one request at a time."""
+
+    def __init__(self, size: int = 4, factory: Callable = Orchestrator, warm: bool = True):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self._idle: "queue.Queue" = queue.Queue()
+        for _ in range(size):
+            orchestrator = factory()
+            if warm:
+                orchestrator.warm_up()
+            self._idle.put(orchestrator)
+
+    @property
+    def available(self) -> int:
+        return self._idle.qsize()
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        try:
+            orchestrator = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolTimeoutError(f"No orchestrator free within {timeout}s") from None
+        try:
+            yield orchestrator
+        finally:
+            self._idle.put(orchestrator)
+
+
+class BadRequest(Exception):
+    pass
+
+
+class PayloadTooLarge(BadRequest):
+    pass
+
+
+class UploadedFile:
+    """
+    A multipart file part, spooled to a temporary file (kept in memory up
+    to one upload chunk). `name` is the client's filename, as IngestionAgent
+    expects from an upload widget.
+    """
+
+    def __init__(self, filename: str):
+        self.name = filename
+        self._file = tempfile.SpooledTemporaryFile(max_size=UPLOAD_CHUNK_BYTES)
+
+    def write(self, data: bytes):
+        self._file.write(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence)
+
+    def close(self):
+        self._file.close()
+
+
+class _BodyReader:
+    """At most `length` bytes of `stream`; a body that ends early is a BadRequest."""
+
+    def __init__(self, stream, length: int):
+        self._stream = stream
+        self.remaining = length
+
+    def read(self, size: int) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        data = self._stream.read(min(size, self.remaining))
+        if not data:
+            raise BadRequest("Request body ended before Content-Length")
+        self.remaining -= len(data)
+        return data
+
+
+def _copy_until(reader: _BodyReader, buffer: bytes, marker: bytes, sink, limit, chunk_size: int) -> bytes:
+    """
+    Pass everything before the next `marker` to sink (None: drop it) and
+    return what follows the marker. Reads a chunk at a time, holding back
+    only a possible partial marker; more than `limit` bytes is a BadRequest.
+    """
+    copied = 0
+    while True:
+        found = buffer.find(marker)
+        cut = found if found >= 0 else max(len(buffer) - len(marker) + 1, 0)
+        copied += cut
+        if limit is not None and copied > limit:
+            raise BadRequest(f"Multipart part larger than {limit} bytes")
+        if sink is not None and cut:
+            sink(buffer[:cut])
+        if found >= 0:
+            return buffer[found + len(marker):]
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            raise BadRequest("Malformed multipart body")
+        buffer = buffer[cut:] + chunk
+
+
+def _fill(reader: _BodyReader, buffer: bytes, size: int, chunk_size: int) -> bytes:
+    while len(buffer) < size:
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            raise BadRequest("Malformed multipart body")
+        buffer += chunk
+    return buffer
+
+
+def _boundary(content_type: str) -> bytes:
+    header = email.message.Message()
+    header["Content-Type"] = content_type
+    boundary = header.get_param("boundary")
+    if not isinstance(boundary, str) or not 0 < len(boundary) <= 70:
+        raise BadRequest("Missing or invalid multipart boundary")
+    return boundary.encode("latin-1")
+
+
+def parse_multipart(content_type: str, stream, length: int, chunk_size: int = UPLOAD_CHUNK_BYTES) -> Dict[str, object]:
+    """
+    Form fields as str and files as UploadedFile objects, parsed from
+    `length` bytes of `stream` as they arrive: file contents go straight
+    to temporary files, so memory use is about one chunk whatever the
+    upload size (IngestionAgent then streams them on to storage). Close
+    the files when done; on an error they are closed here.
+    """
+    delimiter = b"\r\n--" + _boundary(content_type)
+    reader = _BodyReader(stream, length)
+    fields: Dict[str, object] = {}
+    try:
+        # The preamble has no leading CRLF of its own
+        buffer = _copy_until(reader, b"\r\n", delimiter, None, None, chunk_size)
+        while True:
+            buffer = _fill(reader, buffer, 2, chunk_size)
+            if buffer.startswith(b"--"):
+                break  # closing delimiter; the epilogue is ignored
+            headers = []
+            buffer = _copy_until(reader, buffer, b"\r\n\r\n", headers.append, MAX_PART_HEADER_BYTES, chunk_size)
+            # What follows the delimiter up to its CRLF is transport padding
+            header_bytes = b"".join(headers).partition(b"\r\n")[2]
+            part = BytesParser(policy=email.policy.HTTP).parsebytes(header_bytes + b"\r\n\r\n")
+            name = part.get_param("name", header="content-disposition")
+            filename = part.get_filename()
+            if not name:
+                buffer = _copy_until(reader, buffer, delimiter, None, None, chunk_size)
+            elif filename is not None:
+                upload = fields[name] = UploadedFile(filename)
+                buffer = _copy_until(reader, buffer, delimiter, upload.write, None, chunk_size)
+                upload.seek(0)
+            else:
+                value = []
+                buffer = _copy_until(reader, buffer, delimiter, value.append, MAX_FIELD_BYTES, chunk_size)
+                fields[name] = b"".join(value).decode(part.get_content_charset() or "utf-8", errors="replace")
+        while reader.read(chunk_size):
+            pass  # drain the epilogue so the connection can be reused
+    except BaseException:
+        _close_files(fields)
+        raise
+    return fields
+
+
+def _close_files(fields: Dict[str, object]):
+    for value in fields.values():
+        if isinstance(value, UploadedFile):
+            value.close()
+
+
+def encode_multipart(fields: Dict[str, object], files: Dict[str, Tuple[str, bytes]]) -> Tuple[str, bytes]:
+    """(Content-Type, body) for a multipart/form-data request; files map field -> (filename, bytes)."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+        )
+    for name, (filename, data) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n".encode("utf-8") + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return f"multipart/form-data; boundary={boundary}", b"".join(parts)
+
+
+def _number(name: str, value) -> float:
+    kind = NUMERIC_FIELDS[name]
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise InvalidInput(f"{name} must be a number")
+    try:
+        number = float(value)
+    except ValueError:
+        raise InvalidInput(f"{name} must be a number") from None
+    if not math.isfinite(number) or (kind is int and not number.is_integer()):
+        raise InvalidInput(f"{name} must be a {'whole ' if kind is int else ''}number")
+    return kind(number)
+
+
+def _coerce_args(fields: Dict[str, object]) -> Dict[str, object]:
+    """run_flow kwargs from JSON or form fields; InvalidInput for a value of the wrong type"""
+    kwargs = {}
+    for name, value in fields.items():
+        if name in NUMERIC_FIELDS and value is not None:
+            if isinstance(value, str) and not value.strip():
+                continue
+            value = _number(name, value)
+        elif name in TEXT_FIELDS and value is not None and not isinstance(value, str):
+            raise InvalidInput(f"{name} must be a string")
+        elif name in LIST_FIELDS and value is not None and not isinstance(value, (str, list)):
+            raise InvalidInput(f"{name} must be a string or a list of strings")
+        kwargs[name] = value
+    return kwargs
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "TriageHTTPServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self._status = status
+
+    def _send_json(self, status: int, payload):
+        self._send(status, json.dumps(payload, default=str).encode("utf-8"))
+
+    def _content_length(self, limit: int) -> int:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True  # no way to find where the body ends
+            raise BadRequest("Invalid Content-Length")
+        if length > limit:
+            raise PayloadTooLarge(f"Request body larger than {limit} bytes")
+        return length
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(self._content_length(self.server.max_body_bytes))
+
+    def _json_body(self, body: bytes) -> dict:
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError as exc:
+            raise BadRequest(f"Invalid JSON: {exc.msg}") from None
+        if not isinstance(payload, dict):
+            raise BadRequest("Expected a JSON object")
+        return payload
+
+    def _run_flow(self):
+        content_type = self.headers.get("Content-Type", "")
+        fields = {}
+        if content_type.startswith("multipart/form-data"):
+            length = self._content_length(self.server.max_upload_bytes)
+            try:
+                fields = parse_multipart(content_type, self.rfile, length)
+            except BadRequest:
+                self.close_connection = True  # the rest of the body was not read
+                raise
+        try:
+            if content_type.startswith("multipart/form-data"):
+                args = fields
+            else:
+                args = self._json_body(self._read_body())
+                if any(name in args for name in FILE_FIELDS):
+                    raise BadRequest("Send image_file / pdf_file as multipart/form-data uploads")
+            unknown = sorted(set(args) - set(RUN_FLOW_FIELDS))
+            if unknown:
+                raise BadRequest(f"Unknown fields: {', '.join(unknown)}")
+            try:
+                kwargs = _coerce_args(args)
+                with self.server.pool.acquire(self.server.acquire_timeout) as orchestrator:
+                    result = orchestrator.run_flow(**kwargs)
+            except (InvalidInput, UploadRejected) as exc:
+                # Anything else is a server fault: a 500 from _dispatch
+                logger.warning("run_flow rejected the request: %s", exc)
+                return self._send_json(422, {"error": str(exc)})
+        finally:
+            _close_files(fields)
+        self._send_json(200, result)
+
+    def _finalize_order(self):
+        preview = self._json_body(self._read_body()).get("order_preview")
+        if not isinstance(preview, dict) or not preview:
+            raise BadRequest("order_preview is required")
+        with self.server.pool.acquire(self.server.acquire_timeout) as orchestrator:
+            try:
+                order = orchestrator.finalize_order(preview)
+            except OutOfStockError as exc:
+                return self._send_json(409, {"error": str(exc)})
+            except InvalidOrderError as exc:
+                return self._send_json(422, {"error": str(exc)})
+        self._send_json(200, order)
+
+    def _dispatch(self, routes: Dict[str, Callable]):
+        path = self.path.split("?")[0]
+        handler = routes.get(path)
+        self._status = 500
+        start = time.perf_counter()
+        try:
+            if handler is None:
+                self._send_json(404, {"error": f"No such endpoint: {path}"})
+            else:
+                handler()
+        except PayloadTooLarge as exc:
+            self.close_connection = True  # the unread body can't be skipped safely
+            self._send_json(413, {"error": str(exc)})
+        except BadRequest as exc:
+            self._send_json(400, {"error": str(exc)})
+        except PoolTimeoutError as exc:
+            self._send_json(503, {"error": str(exc)})
+        except Exception:
+            logger.exception("Unhandled error on %s", path)
+            self._send_json(500, {"error": "Internal server error"})
+        finally:
+            endpoint = path if handler is not None else "unknown"
+            REQUEST_SECONDS.labels(endpoint=endpoint).observe(time.perf_counter() - start)
+            REQUESTS.labels(endpoint=endpoint, status=self._status).inc()
+
+    def do_GET(self):
+        self._dispatch({
+            "/healthz": lambda: self._send_json(200, {
+                "status": "ok", "pool_size": self.server.pool.size, "available": self.server.pool.available,
+            }),
+            "/metrics": lambda: self._send(
+                200, render_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+            ),
+        })
+
+    def do_POST(self):
+        self._dispatch({"/run_flow": self._run_flow, "/finalize_order": self._finalize_order})
+
+
+class TriageHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        pool: OrchestratorPool,
+        acquire_timeout: float = 30.0,
+        max_body_bytes: int = MAX_BODY_BYTES,
+        max_upload_bytes: int = MAX_UPLOAD_BODY_BYTES,
+    ):
+        super().__init__(address, _Handler)
+        self.pool = pool
+        self.acquire_timeout = acquire_timeout
+        self.max_body_bytes = max_body_bytes
+        self.max_upload_bytes = max_upload_bytes
+
+
+def start_service(
+    port: int = 8080, host: str = "127.0.0.1", pool_size: int = 4, acquire_timeout: float = 30.0
+) -> TriageHTTPServer:
+    """Warm the pool and serve from a daemon thread; call .shutdown() on the result to stop."""
+    server = TriageHTTPServer((host, port), OrchestratorPool(pool_size), acquire_timeout)
+    threading.Thread(target=server.serve_forever, name="triage-service", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="medical-triage-service", description="HTTP API around the triage pipeline."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool-size", type=int, default=4, help="warm orchestrators (max concurrent flows)")
+    parser.add_argument("--acquire-timeout", type=float, default=30.0,
+                        help="seconds a request waits for a free orchestrator before a 503")
+    args = parser.parse_args(argv)
+
+    server = TriageHTTPServer(
+        (args.host, args.port), OrchestratorPool(args.pool_size), args.acquire_timeout
+    )
+    start_upload_gc()
+    logger.info("Serving on http://%s:%d with %d warm orchestrators", args.host, args.port, args.pool_size)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,66 @@
 """Therapy Agent: Recommends OTC options based on symptoms and conditions."""
 
+import gc
+from contextlib import contextmanager
+from itertools import chain
+from operator import itemgetter
+
 from Utils.logger import get_logger
-from Utils.data_loader import load_medicines, load_interactions
+from Utils.formulary import get_formulary
+from Utils.interaction_index import get_interaction_index
+from Utils.lookups import get_sku_to_drug_name_map
+from Utils.snapshot import current_snapshot
 
 logger = get_logger(__name__)
 
+@contextmanager
+def _collector_paused():
+    """
+    Pause the cyclic garbage collector while a batch builds its results:
+    they are many small acyclic dicts and lists, so the collections their
+    allocations trigger free nothing and cost more than building them.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _own_copy(result):
+    """A copy of a shared result down to its lists and options (they hold only strings)."""
+    return {
+        "otc_options": [{**option, "warnings": list(option["warnings"])} for option in result["otc_options"]],
+        "red_flags": list(result["red_flags"]),
+    }
+
+
+def _group_rows(keys, radices):
+    """
+    np.unique(keys, axis=0, return_index=True, return_inverse=True)[1:] for
+    small non-negative integer columns (column j < radices[j]). Rows are
+    folded into one int64 when the radices allow it, which sorts far faster
+    than whole rows.
+    """
+    import math
+    import numpy as np
+
+    if sum(math.log2(max(r, 2)) for r in radices) > 62:
+        _, first, group_of = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        return first, group_of.ravel()
+    folded = np.zeros(len(keys), dtype=np.int64)
+    for column, radix in zip(keys.T, radices):
+        folded = folded * radix + column
+    _, first, group_of = np.unique(folded, return_index=True, return_inverse=True)
+    return first, group_of
+
+
 class TherapyAgent:
     """Recommends OTC medications with age/allergy checks and interaction screening."""
 
     def __init__(self):
-        self.meds = load_medicines()
-        self.interactions = load_interactions()
-        
         self.dosage_map = {
             "Paracetamol": {"dose": "500 mg", "freq": "q6h"},
             "Ibuprofen": {"dose": "400 mg", "freq": "q8h"},
@@ -28,105 +77,319 @@ class TherapyAgent:
             "normal": []
         }
 
-    def recommend(self, notes:str, age:int, allergies:list, severity_hint:str, condition_probs:dict=None):
+    @property
+    def meds(self):
+        return current_snapshot().medicines
 
-        red_flags = []
-        otc_list = []
+    @property
+    def interactions(self):
+        return current_snapshot().interactions
 
-        if severity_hint == "severe":
-            red_flags.append("High severity detected — Medical consultation needed")
-            red_flags.append("SpO2 likely < 92% — Immediate medical attention required")
+    def recommend(self, notes:str, age:int, allergies:list, severity_hint:str, condition_probs:dict=None, snapshot=None, current_medications=None):
+        # One data snapshot for the whole call, even if Data/ is reloaded meanwhile
+        snapshot = snapshot or current_snapshot()
 
-        top_condition = None
-        top_prob = 0.0
-        if condition_probs:
-            top_condition = max(condition_probs, key=condition_probs.get)
-            top_prob = condition_probs.get(top_condition, 0.0)
+        red_flags = self._severity_flags(severity_hint)
+        otc_list = []
 
-        if not notes:
+        note_chunks = self._note_chunks(notes, condition_probs)
+        if note_chunks is None:
             return {"otc_options":[], "red_flags":["No symptoms provided"]}
 
-        notes_lower = notes.lower()
-        if top_condition and top_prob >= 0.5:
-            keywords = self.condition_keywords.get(top_condition, [])
-            if keywords:
-                notes_lower = " ".join([notes_lower] + keywords)
-
-        matched = []
-        for _, row in self.meds.iterrows():
-            # match tokens in indication field
-            tokens = row['indication'].lower().replace("&"," ").split()
-            if any(t in notes_lower for t in tokens):
-                matched.append(row)
+        # match tokens in indication field (one pass over the notes)
+        matched = get_formulary(snapshot).match(note_chunks)
 
         if not matched:
             return {"otc_options":[], "red_flags":["No OTC matched for symptoms"]}
 
-        for row in matched:
-            if age < row['age_min']:
-                red_flags.append(f"{row['drug_name']} not suitable for age < {row['age_min']}")
-                logger.info("Rejected %s (SKU: %s) - age restriction", row['drug_name'], row['sku'])
+        for med in matched:
+            if age < med.age_min:
+                red_flags.append(self._age_flag(med))
+                logger.info("Rejected %s (SKU: %s) - age restriction", med.drug_name, med.sku)
                 continue
 
-            warn=[]
-            contra_raw = row.get('contra_allergy_keywords')
+            contra_raw = med.contra_allergy_keywords
             contra_lower = (
                 contra_raw.lower()
                 if isinstance(contra_raw, str)
                 else ""
             )
             if allergies and any(a.lower() in contra_lower for a in allergies):
-                red_flags.append(f"Avoid {row['drug_name']} — patient allergic")
-                logger.info("Rejected %s (SKU: %s) - allergy contraindication", row['drug_name'], row['sku'])
+                red_flags.append(self._allergy_flag(med))
+                logger.info("Rejected %s (SKU: %s) - allergy contraindication", med.drug_name, med.sku)
                 continue
 
-            if contra_lower and contra_lower != "none":
-                warn.append(f"contains {contra_raw}")
-
-            d = self.dosage_map.get(row['drug_name'],{"dose":"as directed","freq":"as needed"})
+            option = self._otc_option(med, contra_lower)
 
             # Log recommended medicine details
-            logger.info("Recommending: %s (SKU: %s) - %s %s", row['drug_name'], row['sku'], d['dose'], d['freq'])
+            logger.info("Recommending: %s (SKU: %s) - %s %s", med.drug_name, med.sku, option['dose'], option['freq'])
 
-            otc_list.append({
-                "sku": row['sku'],
-                "dose": d['dose'],
-                "freq": d['freq'],
-                "warnings": warn
-            })
+            otc_list.append(option)
 
-        # drug interaction warnings
-        if len(otc_list)>1:
-            red_flags += self._check_interactions(otc_list)
+        # drug interaction warnings (between the options and with what the patient already takes)
+        current = self._normalize_medications(current_medications)
+        if len(otc_list)>1 or (otc_list and current):
+            red_flags += self._check_interactions(otc_list, snapshot, current)
 
         logger.info("TherapyAgent: %d OTC options, %d red flags", len(otc_list), len(red_flags))
         
         return {"otc_options": otc_list, "red_flags": red_flags}
 
 
-    def _check_interactions(self, otc_list):
+    def recommend_batch(self, patients, snapshot=None, chunk_size=8192):
+        """
+        recommend() for many patients at once, e.g. for audits over historical
+        cases. Each patient is a dict of recommend()'s keyword arguments; the
+        result list matches calling recommend() on each of them in turn.
+
+        Per chunk of `chunk_size` patients, every input is read into columns
+        once; indication match, age eligibility and allergy contraindications
+        are (patients x medicines) matrices, and patients are grouped by their
+        per-medicine outcomes (one np.unique over folded outcome rows). Each group is
+        evaluated once; every patient gets their own copy of its result.
+        """
+        snapshot = snapshot or current_snapshot()
+        formulary = get_formulary(snapshot)
+        # Shared across chunks: allergy -> medicines mask, medications -> normalized,
+        # per-medicine outcomes -> result
+        memo = {}
+        patients = list(patients)
+        results = []
+        with _collector_paused():
+            for start in range(0, len(patients), chunk_size):
+                chunk = patients[start:start + chunk_size]
+                results += self._recommend_chunk(chunk, formulary, memo, snapshot)
+        logger.info("TherapyAgent: batch of %d patients evaluated", len(results))
+        return results
+
+    def _recommend_chunk(self, chunk, formulary, memo, snapshot):
+        import numpy as np
+
+        n = len(chunk)
+
+        def column(field):
+            return [p.get(field) for p in chunk]
+
+        # Text to match: one per distinct (notes, confident condition)
+        notes = column("notes")
+        conditions = self._top_conditions(column("condition_probs"))
+        note_ids = {note: i for i, note in enumerate(dict.fromkeys(notes))}
+        condition_ids = {condition: i for i, condition in enumerate(dict.fromkeys(conditions))}
+        pair = (
+            np.fromiter(map(note_ids.__getitem__, notes), dtype=np.intp, count=n) * len(condition_ids)
+            + np.fromiter(map(condition_ids.__getitem__, conditions), dtype=np.intp, count=n)
+        )
+        has_notes = np.fromiter(map(bool, notes), dtype=bool, count=n)
+        _, first_of_pair, text_idx = np.unique(pair, return_index=True, return_inverse=True)
+        texts = [
+            self._matching_text(notes[i], self.condition_keywords.get(conditions[i], []) if conditions[i] else [])
+            if notes[i] else ""
+            for i in first_of_pair.tolist()
+        ]
+        hits = formulary.match_matrix(texts)[text_idx.ravel()]
+        hits[~has_notes] = False
+
+        ages = np.fromiter(map(itemgetter("age"), chunk), dtype=float, count=n)
+        too_young = ages[:, None] < formulary.age_min[None, :]
+
+        # (patients x distinct allergies) @ (allergies x medicines)
+        allergy_lists = [allergies or () for allergies in column("allergies")]
+        allergy_ids = {}
+        flat = list(chain.from_iterable(allergy_lists))
+        id_of = {a: allergy_ids.setdefault(a.lower(), len(allergy_ids)) for a in dict.fromkeys(flat)}
+        allergy_idx = list(map(id_of.__getitem__, flat))
+        patient_idx = np.repeat(np.arange(n), np.fromiter(map(len, allergy_lists), dtype=np.intp, count=n))
+        has_allergy = np.zeros((n, len(allergy_ids)), dtype=np.float32)
+        has_allergy[patient_idx, allergy_idx] = 1
+        masks = np.zeros((len(allergy_ids), len(formulary.medicines)), dtype=np.float32)
+        for allergy, allergy_id in allergy_ids.items():
+            if ("allergy", allergy) not in memo:
+                memo[("allergy", allergy)] = formulary.allergy_mask(allergy)
+            masks[allergy_id] = memo[("allergy", allergy)]
+        allergic = (has_allergy @ masks) > 0
+
+        # Outcome per (patient, medicine), in recommend()'s check order:
+        # 0 = not matched, 1 = recommend, 2 = too young, 3 = allergic
+        outcome = np.where(hits, np.where(too_young, 2, np.where(allergic, 3, 1)), 0).astype(np.int8)
+
+        medications = column("current_medications")
+        medication_ids = {(): 0}
+        current_of = [()]
+        medication_idx = [
+            self._medication_id(m, medication_ids, current_of, memo) if m else 0 for m in medications
+        ]
+
+        # One row per patient: outcomes, no notes, severe, current medications
+        keys = np.column_stack([
+            outcome,
+            ~has_notes,
+            np.array(column("severity_hint"), dtype=object) == "severe",
+            medication_idx,
+        ]).astype(np.int64)
+        radices = [4] * outcome.shape[1] + [2, 2, len(current_of)]
+        first, group_of = _group_rows(keys, radices)
+
+        group_results = []
+        for i in first.tolist():
+            severity_hint = chunk[i].get("severity_hint")
+            current = current_of[medication_idx[i]]
+            # Group ids are per chunk; this key also finds groups seen in earlier chunks
+            key = (bool(has_notes[i]), outcome[i].tobytes(), severity_hint == "severe", current)
+            result = memo.get(key)
+            if result is None:
+                rows = np.flatnonzero(outcome[i])
+                if not has_notes[i]:
+                    result = {"otc_options":[], "red_flags":["No symptoms provided"]}
+                elif not len(rows):
+                    result = {"otc_options":[], "red_flags":["No OTC matched for symptoms"]}
+                else:
+                    matched = list(zip(rows.tolist(), outcome[i, rows].tolist()))
+                    result = self._evaluate_matched(formulary, matched, severity_hint, list(current), snapshot)
+                memo[key] = result
+            group_results.append(result)
+        # Each patient gets their own dict and lists, as from recommend()
+        return [_own_copy(group_results[g]) for g in group_of.tolist()]
+
+    def _top_conditions(self, condition_probs):
+        """
+        _top_condition for many patients: probabilities are flattened into
+        one array and reduced per patient instead of a max() per patient.
+        """
+        import numpy as np
+
+        probs = [cp or {} for cp in condition_probs]
+        sizes = np.fromiter(map(len, probs), dtype=np.intp, count=len(probs))
+        if not sizes.any():
+            return [None] * len(probs)
+        labels = list(chain.from_iterable(probs))
+        values = np.fromiter(chain.from_iterable(map(dict.values, probs)), dtype=float, count=len(labels))
+        has_probs = sizes > 0
+        starts = (np.cumsum(sizes) - sizes)[has_probs]
+        top = np.maximum.reduceat(values, starts)
+        # max() keeps the first of equal values
+        positions = np.where(values == np.repeat(top, sizes[has_probs]), np.arange(len(values)), len(values))
+        first = np.minimum.reduceat(positions, starts)
+        conditions = np.full(len(probs), None, dtype=object)
+        conditions[has_probs] = [labels[j] if value >= 0.5 else None for j, value in zip(first.tolist(), top.tolist())]
+        return conditions.tolist()
+
+    def _medication_id(self, medications, medication_ids, current_of, memo):
+        """Id of the normalized current-medications tuple, for grouping patients."""
+        raw = medications if isinstance(medications, str) else tuple(medications)
+        current = memo.get(("medications", raw))
+        if current is None:
+            current = memo[("medications", raw)] = tuple(self._normalize_medications(medications))
+        if current not in medication_ids:
+            medication_ids[current] = len(current_of)
+            current_of.append(current)
+        return medication_ids[current]
+
+    def _evaluate_matched(self, formulary, matched, severity_hint, current, snapshot):
+        red_flags = self._severity_flags(severity_hint)
+        otc_list = []
+        for row, code in matched:
+            med = formulary.medicines[row]
+            if code == 2:
+                red_flags.append(self._age_flag(med))
+            elif code == 3:
+                red_flags.append(self._allergy_flag(med))
+            else:
+                otc_list.append(self._otc_option(med, formulary.contra_lower[row]))
+
+        if len(otc_list)>1 or (otc_list and current):
+            red_flags += self._check_interactions(otc_list, snapshot, current)
+        return {"otc_options": otc_list, "red_flags": red_flags}
+
+    def _severity_flags(self, severity_hint):
+        if severity_hint == "severe":
+            return [
+                "High severity detected — Medical consultation needed",
+                "SpO2 likely < 92% — Immediate medical attention required",
+            ]
+        return []
+
+    def _top_condition(self, condition_probs):
+        """The confidently (>= 0.5) detected condition, or None."""
+        if condition_probs:
+            top_condition = max(condition_probs, key=condition_probs.get)
+            if condition_probs.get(top_condition, 0.0) >= 0.5:
+                return top_condition
+        return None
+
+    def _condition_keywords(self, condition_probs):
+        """Keywords of a confidently (>= 0.5) detected condition."""
+        top_condition = self._top_condition(condition_probs)
+        return self.condition_keywords.get(top_condition, []) if top_condition else []
+
+    def _matching_text(self, notes, keywords):
+        """Lowercased notes, plus the given condition keywords."""
+        return " ".join([notes.lower()] + keywords) if keywords else notes.lower()
+
+    def _notes_for_matching(self, notes, condition_probs):
+        """Lowercased notes, plus the keywords of a confidently detected condition."""
+        return self._matching_text(notes, self._condition_keywords(condition_probs))
+
+    def _note_chunks(self, notes, condition_probs):
+        """
+        Lowercased text to match, as an iterable of chunks, or None if there
+        is none. `notes` is a string or chunks of text (e.g. the notes then
+        each PDF page), which are lowercased one at a time, never joined.
+        """
+        if notes is None or isinstance(notes, str):
+            return [self._notes_for_matching(notes, condition_probs)] if notes else None
+        chunks = (chunk for chunk in notes if chunk)
+        first = next(chunks, None)
+        if first is None:
+            return None
+        keywords = self._condition_keywords(condition_probs)
+        tail = [" " + " ".join(keywords)] if keywords else []
+        return chain((chunk.lower() for chunk in chain([first], chunks)), tail)
+
+    def _age_flag(self, med):
+        return f"{med.drug_name} not suitable for age < {med.age_min}"
+
+    def _allergy_flag(self, med):
+        return f"Avoid {med.drug_name} — patient allergic"
+
+    def _otc_option(self, med, contra_lower):
+        warn=[]
+        if contra_lower and contra_lower != "none":
+            warn.append(f"contains {med.contra_allergy_keywords}")
+        d = self.dosage_map.get(med.drug_name,{"dose":"as directed","freq":"as needed"})
+        return {
+            "sku": med.sku,
+            "dose": d['dose'],
+            "freq": d['freq'],
+            "warnings": warn
+        }
+
+    def _normalize_medications(self, medications):
+        """Accept a list or a comma-separated string of drug names/SKUs."""
+        if not medications:
+            return []
+        if isinstance(medications, str):
+            medications = medications.split(",")
+        return [str(m).strip() for m in medications if str(m).strip()]
+
+    def _check_interactions(self, otc_list, snapshot=None, current_medications=()):
+        snapshot = snapshot or current_snapshot()
+        sku_to_name = get_sku_to_drug_name_map(snapshot)
+        index = get_interaction_index(snapshot)
         warnings=[]
-        # Extract SKUs for logging purposes
+        # Drug names for the interaction check (SKUs kept for logging)
         skus = [m['sku'] for m in otc_list]
-        
-        for i in range(len(otc_list)):
-            for j in range(i+1, len(otc_list)):
-                sku_a, sku_b = skus[i], skus[j]
-                
-                # Get drug names from original data for interaction check
-                drug_a = self.meds[self.meds['sku'] == sku_a].iloc[0]['drug_name']
-                drug_b = self.meds[self.meds['sku'] == sku_b].iloc[0]['drug_name']
-                
-                match=self.interactions[((self.interactions.drug_a==drug_a)&(self.interactions.drug_b==drug_b))|
-                                       ((self.interactions.drug_a==drug_b)&(self.interactions.drug_b==drug_a))]
-                
-                if not match.empty:
-                    level = match.iloc[0]["level"]
-                    note = match.iloc[0]['note']
-                    logger.info("Interaction detected (%s): %s (%s) + %s (%s) - %s", level, drug_a, sku_a, drug_b, sku_b, note)
-                    
-                    # Show High and Moderate interactions to customers (Low is too minor to surface)
-                    if level in ["High", "Moderate"]:
-                        warnings.append(f"Drug interaction ({level}): {drug_a} & {drug_b} — {note}")
-        
+        names = [sku_to_name[sku] for sku in skus]
+        sku_of = dict(zip(names, skus))
+        current = [sku_to_name.get(m.upper(), m) for m in current_medications]
+
+        for drug_a, drug_b, hit in index.screen(names, current):
+            logger.info(
+                "Interaction detected (%s): %s (%s) + %s (%s) - %s",
+                hit.level, drug_a, sku_of[drug_a], drug_b, sku_of.get(drug_b, "current"), hit.note,
+            )
+
+            # Show High and Moderate interactions to customers (Low is too minor to surface)
+            if hit.level in ["High", "Moderate"]:
+                warnings.append(f"Drug interaction ({hit.level}): {drug_a} & {drug_b} — {hit.note}")
+
         return warnings
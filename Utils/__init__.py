@@ -1,16 +1,32 @@
-"""Shared utilities for the Multi-Agent Medical Assistant POC."""
-
-from .logger import get_logger
-from .data_loader import load_medicines, load_pharmacies, load_doctors, load_interactions
-from .lookups import get_sku_to_drug_name_map, get_pharmacy_id_to_name_map
-
-__all__ = [
-    'get_logger',
-    'load_medicines',
-    'load_pharmacies',
-    'load_doctors',
-    'load_interactions',
-    'get_sku_to_drug_name_map',
-    'get_pharmacy_id_to_name_map',
-]
+"""Shared utilities for the Multi-Agent Medical Assistant POC.
 
+Names below are resolved on first access (PEP 562) so that `import Utils`
+does not pull in pandas or parse any data file.
+"""
+
+from importlib import import_module
+
+# public name -> submodule that defines it
+_EXPORTS = {
+    'get_logger': 'logger',
+    'load_medicines': 'data_loader',
+    'load_pharmacies': 'data_loader',
+    'load_doctors': 'data_loader',
+    'load_interactions': 'data_loader',
+    'get_sku_to_drug_name_map': 'lookups',
+    'get_pharmacy_id_to_name_map': 'lookups',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
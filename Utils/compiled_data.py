@@ -0,0 +1,179 @@
+"""Columnar binary snapshot of Data/ for fast, memory-mapped startup.
+
+`python -m Utils.compiled_data` compiles every source file under Data/ into
+Data/compiled/: one .npy file per column plus a manifest recording each
+source file's mtime and size. Numeric columns are stored as-is; text
+columns are dictionary-encoded (int32 codes + unique values) and come back
+as pandas categoricals. Loading memory-maps the arrays, so a large inventory
+loads in milliseconds and its pages are shared through the OS page cache.
+
+`load_compiled()` returns None when the snapshot is missing or stale, and
+callers fall back to parsing the source file.
+"""
+
+import json
+import os
+import shutil
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .constants import (
+    COMPILED_DIR,
+    MEDICINES_FILE,
+    INTERACTIONS_FILE,
+    INVENTORY_FILE,
+    PHARMACIES_FILE,
+    ZIPCODES_FILE,
+    DOCTORS_FILE,
+)
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+# dataset name -> (source file, "frame" for DataFrames / "records" for lists of dicts)
+SOURCES = {
+    "medicines": (MEDICINES_FILE, "frame"),
+    "interactions": (INTERACTIONS_FILE, "frame"),
+    "inventory": (INVENTORY_FILE, "frame"),
+    "pharmacies": (PHARMACIES_FILE, "records"),
+    "zipcodes": (ZIPCODES_FILE, "frame"),
+    "doctors": (DOCTORS_FILE, "records"),
+}
+
+
+def _source_stamp(path: str) -> Dict[str, int]:
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _write_frame(df: pd.DataFrame, out_dir: str, json_columns=()) -> list:
+    os.makedirs(out_dir, exist_ok=True)
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        stem = os.path.join(out_dir, f"{i:03d}")
+        if name in json_columns:
+            series = series.map(lambda v: json.dumps(v) if isinstance(v, (list, dict)) else v)
+        if name not in json_columns and series.dtype.kind in "biuf":
+            np.save(f"{stem}.npy", series.to_numpy())
+            kind = "num"
+        else:
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            np.save(f"{stem}.npy", codes.astype(np.int32))
+            np.save(f"{stem}.cats.npy", np.array([str(u) for u in uniques], dtype=str))
+            kind = "json" if name in json_columns else "cat"
+        columns.append({"name": str(name), "kind": kind})
+    return columns
+
+
+def compile_data(out_dir: str = COMPILED_DIR) -> Dict[str, Any]:
+    """Compile every source dataset into `out_dir` and return the manifest."""
+    from .data_loader import SOURCE_PARSERS
+
+    staging = f"{out_dir}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    manifest: Dict[str, Any] = {"format": FORMAT_VERSION, "datasets": {}}
+
+    for name, (source, kind) in SOURCES.items():
+        stamp = _source_stamp(source)
+        value = SOURCE_PARSERS[name](source)
+        if kind == "records":
+            df = pd.DataFrame.from_records(value)
+            json_columns = [c for c in df.columns if df[c].map(lambda v: isinstance(v, (list, dict))).any()]
+        else:
+            df, json_columns = value, []
+        columns = _write_frame(df, os.path.join(staging, name), json_columns)
+        manifest["datasets"][name] = {
+            "source": source,
+            "kind": kind,
+            "rows": len(df),
+            "columns": columns,
+            **stamp,
+        }
+        logger.info("Compiled %s: %d rows, %d columns", name, len(df), len(columns))
+
+    with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+
+    # Swap the whole directory so readers never see a half-written snapshot
+    backup = f"{out_dir}.old"
+    shutil.rmtree(backup, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, backup)
+    os.replace(staging, out_dir)
+    shutil.rmtree(backup, ignore_errors=True)
+    return manifest
+
+
+def _read_manifest(compiled_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(compiled_dir, MANIFEST_FILE), encoding="utf-8") as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def _read_frame(meta: Dict[str, Any], dataset_dir: str) -> pd.DataFrame:
+    data = {}
+    for i, col in enumerate(meta["columns"]):
+        stem = os.path.join(dataset_dir, f"{i:03d}")
+        values = np.load(f"{stem}.npy", mmap_mode="r")
+        if col["kind"] == "num":
+            data[col["name"]] = values
+        else:
+            categories = np.load(f"{stem}.cats.npy").astype(object)
+            data[col["name"]] = pd.Categorical.from_codes(np.asarray(values), categories=categories)
+    return pd.DataFrame(data, copy=False)
+
+
+def _read_records(meta: Dict[str, Any], dataset_dir: str) -> list:
+    df = _read_frame(meta, dataset_dir)
+    json_columns = {c["name"] for c in meta["columns"] if c["kind"] == "json"}
+    records = []
+    for row in df.to_dict(orient="records"):
+        record = {}
+        for key, value in row.items():
+            if isinstance(value, float) and np.isnan(value):
+                continue
+            record[key] = json.loads(value) if key in json_columns else value
+        records.append(record)
+    return records
+
+
+def load_compiled(name: str, source: str, compiled_dir: str = COMPILED_DIR) -> Optional[Any]:
+    """
+    Memory-map dataset `name` from the compiled snapshot, or return None if
+    there is no snapshot or it was built from a different version of `source`.
+    """
+    manifest = _read_manifest(compiled_dir)
+    meta = (manifest or {}).get("datasets", {}).get(name)
+    if not meta or os.path.normpath(meta["source"]) != os.path.normpath(source):
+        return None
+    try:
+        stamp = _source_stamp(source)
+    except OSError:
+        return None
+    if (meta["mtime_ns"], meta["size"]) != (stamp["mtime_ns"], stamp["size"]):
+        logger.info("Compiled %s is stale; parsing %s", name, source)
+        return None
+
+    dataset_dir = os.path.join(compiled_dir, name)
+    try:
+        if meta["kind"] == "records":
+            return _read_records(meta, dataset_dir)
+        return _read_frame(meta, dataset_dir)
+    except (OSError, ValueError):
+        logger.exception("Compiled %s is unreadable; parsing %s", name, source)
+        return None
+
+
+if __name__ == "__main__":
+    compile_data()
@@ -9,11 +9,46 @@ DOCTORS_FILE = f"{DATA_DIR}/doctors.csv"
 INTERACTIONS_FILE = f"{DATA_DIR}/interactions.csv"
 INVENTORY_FILE = f"{DATA_DIR}/inventory.csv"
 ZIPCODES_FILE = f"{DATA_DIR}/zipcodes.csv"
+# Memory-mapped columnar build of the files above (python -m Utils.compiled_data)
+COMPILED_DIR = f"{DATA_DIR}/compiled"
 
 # Upload directories
 IMAGES_DIR = f"{UPLOADS_DIR}/images"
 PDFS_DIR = f"{UPLOADS_DIR}/pdfs"
 
+# Upload limits (bytes); uploads are streamed to disk this many bytes at a time
+MAX_IMAGE_BYTES = 50 * 1024 * 1024
+MAX_PDF_BYTES = 200 * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Upload garbage collection: files unused for longer than the max age are
+# removed, then the oldest until the total fits; nothing younger than the
+# grace period is touched (it may belong to a request in flight)
+UPLOAD_MAX_AGE_SECONDS = 7 * 24 * 3600
+UPLOAD_MAX_TOTAL_BYTES = 10 * 1024 ** 3
+UPLOAD_GC_GRACE_SECONDS = 15 * 60
+UPLOAD_GC_INTERVAL_SECONDS = 10 * 60
+
+# PDF text extraction: per-document budget, worker processes (0 = inline),
+# per-document time limit and cached documents
+PDF_MAX_PAGES = 50
+PDF_MAX_CHARS = 200_000
+PDF_WORKERS = 2
+PDF_TIMEOUT_SECONDS = 30
+PDF_CACHE_SIZE = 256
+PDF_PREVIEW_CHARS = 300
+
+# Imaging results kept in memory, keyed by x-ray content hash
+IMAGING_CACHE_SIZE = 4096
+
+# Imaging backend: "heuristic" (filename hints, for demos) or "numpy" (the
+# Utils.xray_model classifier; python -m Utils.xray_model writes its weights)
+IMAGING_BACKEND = "heuristic"
+IMAGING_MODEL_DIR = f"{DATA_DIR}/models/xray_mlp"
+IMAGING_INPUT_SIZE = 64
+# ImagingAgent.analyze_batch: images per inference batch (and per decode task)
+IMAGING_BATCH_SIZE = 32
+
 # Patient constraints
 MAX_AGE = 120
 MIN_AGE = 0
@@ -22,6 +57,7 @@ DEFAULT_AGE = 30
 # Business rules
 PHONE_DIGITS = 10
 PHARMACY_MAX_DISTANCE_KM = 50
+ORDER_QTY_PER_ITEM = 1
 UUID_SHORT_LENGTH = 6
 
 # Interaction severity levels
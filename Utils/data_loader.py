@@ -1,105 +1,189 @@
-"""Data loading utilities with caching for CSV/JSON files."""
+"""Data loading utilities for CSV/JSON files.
+
+`read_*` functions read one dataset from disk: from the memory-mapped
+compiled snapshot when it is fresh (see `Utils.compiled_data`), otherwise
+by parsing the source file. `load_*` functions return the
+dataset from the current data snapshot (see `Utils.snapshot`), which is
+parsed once and swapped atomically when the files change on disk.
+
+pandas is imported on first parse, not at import time, so importing
+`Utils` stays cheap for code paths that never touch a DataFrame.
+"""
 
 import json
 import csv
-from functools import lru_cache
-from typing import List, Dict, Any, Tuple
-import pandas as pd
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple
+
+from .constants import (
+    MEDICINES_FILE,
+    INTERACTIONS_FILE,
+    INVENTORY_FILE,
+    PHARMACIES_FILE,
+    ZIPCODES_FILE,
+    DOCTORS_FILE,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _parse_csv(path: str) -> "pd.DataFrame":
+    import pandas as pd
+    return pd.read_csv(path)
+
+
+def _parse_json(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _parse_doctors(path: str) -> List[Dict[str, Any]]:
+    """Parse the doctors CSV, splitting the comma-separated tele-consult slots."""
+    roster = []
+    with open(path, newline="", encoding="utf-8") as fh:
+        reader = csv.DictReader(fh)
+        for row in reader:
+            slots = [
+                slot.strip()
+                for slot in row["tele_slot_iso8601"].split(",")
+                if slot.strip()
+            ]
+            roster.append({
+                "doctor_id": row["doctor_id"],
+                "name": row["name"],
+                "specialty": row["specialty"],
+                "tele_slots": slots
+            })
+    return roster
+
+
+# dataset name -> parser for its source file (used by Utils.compiled_data too)
+SOURCE_PARSERS = {
+    "medicines": _parse_csv,
+    "interactions": _parse_csv,
+    "inventory": _parse_csv,
+    "pharmacies": _parse_json,
+    "zipcodes": _parse_csv,
+    "doctors": _parse_doctors,
+}
+
+
+def _read(name: str, path: str):
+    """Memory-map the compiled snapshot when fresh, else parse the source file."""
+    from .compiled_data import load_compiled
+    compiled = load_compiled(name, path)
+    if compiled is not None:
+        return compiled
+    return SOURCE_PARSERS[name](path)
+
+
+def read_medicines(path: str = MEDICINES_FILE) -> "pd.DataFrame":
+    return _read("medicines", path)
+
+
+def read_interactions(path: str = INTERACTIONS_FILE) -> "pd.DataFrame":
+    return _read("interactions", path)
+
+
+def read_inventory(path: str = INVENTORY_FILE) -> "pd.DataFrame":
+    return _read("inventory", path)
+
 
+def read_pharmacies(path: str = PHARMACIES_FILE) -> List[Dict[str, Any]]:
+    return _read("pharmacies", path)
 
-@lru_cache(maxsize=1)
-def load_medicines() -> pd.DataFrame:
+
+def read_zipcodes(path: str = ZIPCODES_FILE) -> "pd.DataFrame":
+    return _read("zipcodes", path)
+
+
+def read_doctors(path: str = DOCTORS_FILE) -> List[Dict[str, Any]]:
+    return _read("doctors", path)
+
+
+def _snapshot():
+    from .snapshot import current_snapshot
+    return current_snapshot()
+
+
+def load_medicines() -> "pd.DataFrame":
     """
-    Load medicines CSV with caching.
-    
+    Load medicines from the current data snapshot.
+
     Returns:
         DataFrame with columns: sku, drug_name, indication, age_min, contra_allergy_keywords
     """
-    return pd.read_csv("Data/medicines.csv")
+    return _snapshot().medicines
 
 
-@lru_cache(maxsize=1)
-def load_interactions() -> pd.DataFrame:
+def load_interactions() -> "pd.DataFrame":
     """
-    Load drug interactions CSV with caching.
-    
+    Load drug interactions from the current data snapshot.
+
     Returns:
         DataFrame with columns: drug_a, drug_b, level, note
     """
-    return pd.read_csv("Data/interactions.csv")
+    return _snapshot().interactions
 
 
-@lru_cache(maxsize=1)
-def load_inventory() -> pd.DataFrame:
+def load_inventory() -> "pd.DataFrame":
     """
-    Load pharmacy inventory CSV with caching.
-    
+    Load pharmacy inventory from the current data snapshot.
+
     Returns:
         DataFrame with columns: pharmacy_id, sku, qty, etc.
     """
-    return pd.read_csv("Data/inventory.csv")
+    return _snapshot().inventory
 
 
-@lru_cache(maxsize=1)
 def load_pharmacies() -> List[Dict[str, Any]]:
     """
-    Load pharmacies JSON with caching.
-    
+    Load pharmacies from the current data snapshot.
+
     Returns:
         List of pharmacy dictionaries with id, Name, lat, lon, services, delivery_km
     """
-    with open("Data/pharmacies.json", encoding="utf-8") as f:
-        return json.load(f)
+    return _snapshot().pharmacies
 
 
-@lru_cache(maxsize=1)
-def load_zipcodes() -> pd.DataFrame:
+def load_zipcodes() -> "pd.DataFrame":
     """
-    Load zipcodes CSV with caching.
-    
+    Load zipcodes from the current data snapshot.
+
     Returns:
         DataFrame with columns: zipcode, lat, lon, city, etc.
     """
-    return pd.read_csv("Data/zipcodes.csv")
+    return _snapshot().zipcodes
 
 
-@lru_cache(maxsize=1)
-def load_pincode_map() -> Dict[str, Tuple[float, float]]:
+def build_pincode_map(snapshot) -> Dict[str, Tuple[float, float]]:
     """
-    Builds a lookup from pincode → (lat, lon).
+    Builds a lookup from pincode → (lat, lon) for one snapshot.
     """
-    df = load_zipcodes()
+    df = snapshot.zipcodes
     mapping: Dict[str, Tuple[float, float]] = {}
-    for _, row in df.iterrows():
-        pincode = str(row["pincode"]).strip()
+    for pincode, lat, lon in zip(
+        df["pincode"].astype(str).tolist(), df["lat"].tolist(), df["lon"].tolist()
+    ):
+        pincode = pincode.strip()
         if not pincode:
             continue
-        mapping[pincode] = (float(row["lat"]), float(row["lon"]))
+        mapping[pincode] = (float(lat), float(lon))
     return mapping
 
 
-@lru_cache(maxsize=1)
+def load_pincode_map() -> Dict[str, Tuple[float, float]]:
+    """
+    Lookup from pincode → (lat, lon), built once per zipcodes.csv version.
+    """
+    return _snapshot().derive("pincode_map", ("zipcodes",), build_pincode_map)
+
+
 def load_doctors() -> List[Dict[str, Any]]:
     """
-    Load doctors CSV and parse tele-consult slots.
-    
+    Load doctors (with parsed tele-consult slots) from the current data snapshot.
+
     Returns:
         List of doctor dictionaries with doctor_id, name, specialty, tele_slots
     """
-    roster = []
-    with open("Data/doctors.csv", newline="", encoding="utf-8") as fh:
-        reader = csv.DictReader(fh)
-        for row in reader:
-            slots = [
-                slot.strip() 
-                for slot in row["tele_slot_iso8601"].split(",") 
-                if slot.strip()
-            ]
-            roster.append({
-                "doctor_id": row["doctor_id"],
-                "name": row["name"],
-                "specialty": row["specialty"],
-                "tele_slots": slots
-            })
-    return roster
-
+    return _snapshot().doctors
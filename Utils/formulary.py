@@ -0,0 +1,140 @@
+"""Precompiled medicines table for symptom matching in TherapyAgent."""
+
+from collections import defaultdict
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, NamedTuple, Sequence, Union
+
+from .snapshot import current_snapshot
+from .text_match import SubstringMatcher
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Up to this many distinct indication tokens, batch matching scans all notes
+# once per token (vectorized) instead of running the automaton per note
+TOKEN_SCAN_MAX = 64
+
+
+class Medicine(NamedTuple):
+    """One formulary row."""
+    sku: str
+    drug_name: str
+    indication: str
+    age_min: Any
+    contra_allergy_keywords: Any  # raw cell: str, or NaN/None when empty
+
+
+def indication_tokens(indication: Any) -> List[str]:
+    """Lowercased words of an indication ("Fever & Pain" -> ["fever", "pain"])."""
+    if not isinstance(indication, str):
+        return []
+    return indication.lower().replace("&", " ").split()
+
+
+class Formulary:
+    """
+    Built once per medicines.csv version:
+      - every distinct indication token compiled into one SubstringMatcher
+      - token -> formulary rows it appears in
+
+    A medicine matches notes when any of its indication tokens occurs in
+    them as a substring, so matching costs one pass over the notes plus the
+    matched rows, whatever the formulary size.
+    """
+
+    def __init__(self, medicines: Iterable[Medicine]):
+        self.medicines: List[Medicine] = list(medicines)
+        rows_by_token: Dict[str, List[int]] = defaultdict(list)
+        for row, med in enumerate(self.medicines):
+            for token in dict.fromkeys(indication_tokens(med.indication)):
+                rows_by_token[token].append(row)
+        self._matcher = SubstringMatcher(rows_by_token)
+        self._rows = [rows_by_token[token] for token in self._matcher.patterns]
+
+    @classmethod
+    def from_frame(cls, medicines: "pd.DataFrame") -> "Formulary":
+        n = len(medicines)
+        columns = [
+            medicines[col].tolist() if col in medicines.columns else [None] * n
+            for col in Medicine._fields
+        ]
+        return cls(Medicine(*values) for values in zip(*columns))
+
+    def match(self, text: Union[str, Iterable[str]]) -> List[Medicine]:
+        """
+        Medicines with an indication token inside `text`, in formulary order.
+        `text` may also be an iterable of chunks, scanned as they come.
+        """
+        chunks = (text,) if isinstance(text, str) else text
+        rows = set()
+        for token_id in self._matcher.find_chunks(chunks):
+            rows.update(self._rows[token_id])
+        return [self.medicines[row] for row in sorted(rows)]
+
+    # Column views for batch evaluation (numpy is only imported when used)
+    @cached_property
+    def age_min(self) -> "np.ndarray":
+        import numpy as np
+        return np.array([med.age_min for med in self.medicines], dtype=float)
+
+    @cached_property
+    def contra_lower(self) -> List[str]:
+        return [
+            med.contra_allergy_keywords.lower() if isinstance(med.contra_allergy_keywords, str) else ""
+            for med in self.medicines
+        ]
+
+    @cached_property
+    def _token_rows(self) -> List["np.ndarray"]:
+        import numpy as np
+        return [np.array(rows, dtype=np.intp) for rows in self._rows]
+
+    @cached_property
+    def _incidence(self) -> "np.ndarray":
+        """(tokens, medicines) 0/1 matrix: which medicines each token matches."""
+        import numpy as np
+        incidence = np.zeros((len(self._rows), len(self.medicines)), dtype=np.float32)
+        for token_id, rows in enumerate(self._token_rows):
+            incidence[token_id, rows] = 1
+        return incidence
+
+    def match_matrix(self, texts: Sequence[str]) -> "np.ndarray":
+        """(texts, medicines) boolean matrix: True where match() would return the row."""
+        import numpy as np
+        if len(self._rows) <= TOKEN_SCAN_MAX:
+            # Few distinct tokens: one vectorized substring search per token
+            # over all texts, then (texts x tokens) @ (tokens x medicines)
+            array = np.array(texts, dtype=str)
+            found = np.zeros((len(texts), len(self._rows)), dtype=np.float32)
+            for token_id, token in enumerate(self._matcher.patterns):
+                found[:, token_id] = np.char.find(array, token) >= 0
+            return (found @ self._incidence) > 0
+
+        # Large vocabulary: one automaton pass per distinct text
+        hits = np.zeros((len(texts), len(self.medicines)), dtype=bool)
+        token_rows = self._token_rows
+        rows_of: Dict[str, Any] = {}
+        for i, text in enumerate(texts):
+            rows = rows_of.get(text)
+            if rows is None:
+                found = self._matcher.find(text)
+                rows = np.concatenate([token_rows[t] for t in found]) if found else ()
+                rows_of[text] = rows
+            if len(rows):
+                hits[i, rows] = True
+        return hits
+
+    def allergy_mask(self, allergy: str) -> "np.ndarray":
+        """Medicines whose contraindication keywords contain `allergy` (case-insensitive)."""
+        import numpy as np
+        allergy = allergy.lower()
+        return np.fromiter((allergy in c for c in self.contra_lower), dtype=bool, count=len(self.medicines))
+
+
+def get_formulary(snapshot=None) -> Formulary:
+    """Formulary for `snapshot` (default: current), built once per medicines.csv version."""
+    snapshot = snapshot or current_snapshot()
+    return snapshot.derive(
+        "formulary", ("medicines",), lambda snap: Formulary.from_frame(snap.medicines)
+    )
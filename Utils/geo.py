@@ -0,0 +1,74 @@
+"""Geospatial helpers: great-circle distances and a lat/lon grid index."""
+
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Length of one degree of latitude (and of longitude at the equator)
+KM_PER_DEGREE = 111.32
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distance in km from one point to many, in a single
+    vectorized pass over the coordinate arrays.
+    """
+    lat1 = np.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlon = np.radians(lons) - np.radians(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoGrid:
+    """
+    Buckets points into fixed-size lat/lon cells so that radius queries
+    only touch the cells overlapping the query box instead of every point.
+
+    Built once from a list of (lat, lon) pairs; query results are the
+    positional indices of the points, in ascending order.
+    """
+
+    def __init__(self, points: Iterable[Tuple[float, float]], cell_deg: float = 0.05):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for idx, (lat, lon) in enumerate(points):
+            self._cells[self._cell(lat, lon)].append(idx)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def query(self, lat: float, lon: float, radius_km: float) -> List[int]:
+        """
+        Return indices of points inside the bounding box of a circle of
+        `radius_km` around (lat, lon). The box is a superset of the circle,
+        so callers still compute exact distances on the candidates.
+        """
+        dlat = radius_km / KM_PER_DEGREE
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        dlon = radius_km / (KM_PER_DEGREE * cos_lat)
+
+        row_lo, col_lo = self._cell(lat - dlat, lon - dlon)
+        row_hi, col_hi = self._cell(lat + dlat, lon + dlon)
+
+        # Walk whichever is smaller: the cells in the box or the occupied cells
+        box_cells = (row_hi - row_lo + 1) * (col_hi - col_lo + 1)
+        hits: List[int] = []
+        if box_cells <= len(self._cells):
+            for row in range(row_lo, row_hi + 1):
+                for col in range(col_lo, col_hi + 1):
+                    hits.extend(self._cells.get((row, col), ()))
+        else:
+            for (row, col), members in self._cells.items():
+                if row_lo <= row <= row_hi and col_lo <= col <= col_hi:
+                    hits.extend(members)
+
+        hits.sort()
+        return hits
+
+    def __len__(self) -> int:
+        return sum(len(members) for members in self._cells.values())
@@ -0,0 +1,83 @@
+"""Symmetric drug-pair index over the interactions table."""
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .snapshot import current_snapshot
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class Interaction(NamedTuple):
+    """One interactions.csv row."""
+    drug_a: str
+    drug_b: str
+    level: str
+    note: str
+
+
+def canonical_drug(name) -> str:
+    """Key a drug name is indexed under: trimmed and case-folded."""
+    return str(name).strip().casefold()
+
+
+class InteractionIndex:
+    """
+    drug -> {other drug: interaction}, filled in both directions, so checking
+    a pair is two dict lookups whatever the size of the interactions table.
+    When a pair is listed more than once the first row wins.
+    """
+
+    def __init__(self, interactions: Iterable[Interaction]):
+        self._pairs: Dict[str, Dict[str, Interaction]] = {}
+        for row in interactions:
+            a, b = canonical_drug(row.drug_a), canonical_drug(row.drug_b)
+            self._pairs.setdefault(a, {}).setdefault(b, row)
+            self._pairs.setdefault(b, {}).setdefault(a, row)
+
+    @classmethod
+    def from_frame(cls, interactions: "pd.DataFrame") -> "InteractionIndex":
+        columns = [interactions[col].tolist() for col in Interaction._fields]
+        return cls(Interaction(*values) for values in zip(*columns))
+
+    def lookup(self, drug_a: str, drug_b: str) -> Optional[Interaction]:
+        return self._pairs.get(canonical_drug(drug_a), {}).get(canonical_drug(drug_b))
+
+    def screen(
+        self, drugs: List[str], current: Iterable[str] = ()
+    ) -> List[Tuple[str, str, Interaction]]:
+        """
+        Interacting (drug, other, interaction) triples. For each drug in
+        order: its pairs with the drugs after it in `drugs`, then with the
+        patient's `current` medications (skipping ones already in `drugs`).
+        """
+        pairs = self._pairs
+        keys = [canonical_drug(d) for d in drugs]
+        new = set(keys)
+        current_keys = [(c, canonical_drug(c)) for c in dict.fromkeys(current) if c]
+        found = []
+        for i, drug_a in enumerate(drugs):
+            partners = pairs.get(keys[i])
+            if not partners:
+                continue
+            for j in range(i + 1, len(drugs)):
+                hit = partners.get(keys[j])
+                if hit is not None:
+                    found.append((drug_a, drugs[j], hit))
+            for other, key in current_keys:
+                if key in new:
+                    continue
+                hit = partners.get(key)
+                if hit is not None:
+                    found.append((drug_a, other, hit))
+        return found
+
+
+def get_interaction_index(snapshot=None) -> InteractionIndex:
+    """InteractionIndex for `snapshot` (default: current), built once per interactions.csv version."""
+    snapshot = snapshot or current_snapshot()
+    return snapshot.derive(
+        "interaction_index",
+        ("interactions",),
+        lambda snap: InteractionIndex.from_frame(snap.interactions),
+    )
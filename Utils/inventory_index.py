@@ -0,0 +1,92 @@
+"""Inverted index over pharmacy inventory for SKU-driven stock lookups."""
+
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Callable, Collection, Dict, Iterable, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class Posting(NamedTuple):
+    """One stocked line: where a SKU is held, how many and at what price."""
+    row: int
+    pharmacy_id: str
+    sku: str
+    drug_name: str
+    qty: int
+    price: float
+
+
+class InventoryIndex:
+    """
+    Built once from the inventory table:
+      - sku -> postings (pharmacy, qty, price) in inventory row order
+      - pharmacy -> {sku: posting} for the SKUs it stocks
+
+    Matching a basket walks only the postings of the requested SKUs, so the
+    cost depends on the basket, not on the size of the inventory.
+    """
+
+    def __init__(self, postings: Iterable[Posting]):
+        self._by_sku: Dict[str, List[Posting]] = defaultdict(list)
+        self._by_pharmacy: Dict[str, Dict[str, Posting]] = defaultdict(dict)
+        for posting in postings:
+            self._by_sku[posting.sku].append(posting)
+            self._by_pharmacy[posting.pharmacy_id].setdefault(posting.sku, posting)
+
+    @classmethod
+    def from_frame(cls, inventory: "pd.DataFrame") -> "InventoryIndex":
+        columns = [
+            inventory[col].tolist()
+            for col in ("pharmacy_id", "sku", "drug_name", "qty", "price")
+        ]
+        return cls(
+            Posting(row, *values) for row, values in enumerate(zip(*columns))
+        )
+
+    def postings(self, sku: str) -> List[Posting]:
+        return self._by_sku.get(sku, [])
+
+    def skus_for(self, pharmacy_id: str) -> Dict[str, Posting]:
+        return self._by_pharmacy.get(pharmacy_id, {})
+
+    def pharmacy_ids(self) -> List[str]:
+        return list(self._by_pharmacy)
+
+    def stocks_any(
+        self,
+        skus: Iterable[str],
+        qty_of: Callable[[Posting], int] = lambda p: p.qty,
+    ) -> bool:
+        """True if at least one requested SKU is in stock somewhere."""
+        return any(qty_of(p) > 0 for sku in skus for p in self.postings(sku))
+
+    def match(
+        self,
+        skus: Iterable[str],
+        pharmacy_ids: Optional[Collection[str]] = None,
+        qty_of: Callable[[Posting], int] = lambda p: p.qty,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Return pharmacy_id -> in-stock items for the requested SKUs,
+        optionally restricted to `pharmacy_ids`.
+
+        Items keep inventory row order and carry sku, drug_name, qty, price.
+        `qty_of` overrides the loaded quantity (e.g. with live stock levels).
+        """
+        hits: Dict[str, List[tuple]] = defaultdict(list)
+        for sku in dict.fromkeys(skus):
+            for posting in self.postings(sku):
+                if pharmacy_ids is not None and posting.pharmacy_id not in pharmacy_ids:
+                    continue
+                qty = qty_of(posting)
+                if qty > 0:
+                    hits[posting.pharmacy_id].append((posting, qty))
+
+        return {
+            ph_id: [
+                {"sku": p.sku, "drug_name": p.drug_name, "qty": qty, "price": p.price}
+                for p, qty in sorted(lines, key=lambda line: line[0].row)
+            ]
+            for ph_id, lines in hits.items()
+        }
@@ -0,0 +1,222 @@
+"""Live, thread-safe stock levels with expiring reservations."""
+
+import heapq
+import threading
+import time
+import weakref
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from uuid import uuid4
+
+from .inventory_index import InventoryIndex, Posting
+from .snapshot import current_snapshot
+
+# How long an unconfirmed reservation holds stock before it is released
+RESERVATION_HOLD_SECONDS = 15 * 60
+
+StockKey = Tuple[str, str]  # (pharmacy_id, sku)
+
+# Every live store in this process by store_id; a store dropped after an
+# inventory reload disappears from here once nothing holds it
+_stores: "weakref.WeakValueDictionary[str, InventoryStore]" = weakref.WeakValueDictionary()
+
+
+class OutOfStockError(Exception):
+    """Raised when a reservation asks for more units than are available."""
+
+    def __init__(self, shortages: List[Tuple[str, str, int, int]]):
+        self.shortages = shortages
+        detail = ", ".join(
+            f"{sku}@{ph_id} (wanted {wanted}, available {available})"
+            for ph_id, sku, wanted, available in shortages
+        )
+        super().__init__(f"Insufficient stock: {detail}")
+
+
+class ReservationNotFoundError(Exception):
+    """Raised when committing a reservation that expired or was released."""
+
+
+class InvalidOrderError(ValueError):
+    """Raised for order lines that are malformed or don't match their reservation."""
+
+
+class Reservation(NamedTuple):
+    lines: Dict[StockKey, int]
+    expires_at: float
+
+
+class InventoryStore:
+    """
+    In-memory stock on top of a static InventoryIndex.
+
+    available = on hand - held by open reservations. Writes take only the
+    lock stripes of the pharmacies involved (acquired in stripe order), so
+    orders at unrelated pharmacies never wait on each other. Reads take no
+    stock locks; a stale read at worst fails the later reservation.
+    """
+
+    def __init__(
+        self,
+        index: InventoryIndex,
+        stripes: int = 64,
+        hold_seconds: float = RESERVATION_HOLD_SECONDS,
+        clock=time.monotonic,
+    ):
+        self.index = index
+        self.store_id = uuid4().hex
+        _stores[self.store_id] = self
+        self.hold_seconds = hold_seconds
+        self._clock = clock
+        self._on_hand: Dict[StockKey, int] = defaultdict(int)
+        for ph_id in index.pharmacy_ids():
+            for sku, posting in index.skus_for(ph_id).items():
+                self._on_hand[(ph_id, sku)] = int(posting.qty)
+        self._held: Dict[StockKey, int] = defaultdict(int)
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._reservations: Dict[str, Reservation] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self._registry_lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, inventory, **kwargs) -> "InventoryStore":
+        return cls(InventoryIndex.from_frame(inventory), **kwargs)
+
+    # Reads
+    def available(self, pharmacy_id: str, sku: str) -> int:
+        key = (pharmacy_id, sku)
+        return self._on_hand.get(key, 0) - self._held.get(key, 0)
+
+    def _available_posting(self, posting: Posting) -> int:
+        return self.available(posting.pharmacy_id, posting.sku)
+
+    def stocks_any(self, skus: Iterable[str]) -> bool:
+        self.release_expired()
+        return self.index.stocks_any(skus, qty_of=self._available_posting)
+
+    def match(self, skus, pharmacy_ids=None):
+        """InventoryIndex.match with live available quantities."""
+        return self.index.match(skus, pharmacy_ids, qty_of=self._available_posting)
+
+    # Writes
+    def _locks_for(self, lines: Dict[StockKey, int]):
+        stripes = sorted({hash(ph_id) % len(self._stripes) for ph_id, _ in lines})
+        return [self._stripes[s] for s in stripes]
+
+    def reserve(
+        self,
+        lines: Iterable[Tuple[str, str, int]],
+        hold_seconds: Optional[float] = None,
+    ) -> str:
+        """
+        Atomically hold (pharmacy_id, sku, qty) lines; all or nothing.
+
+        Returns a reservation id to commit() or release(). Unconfirmed
+        holds are released after `hold_seconds`.
+        """
+        self.release_expired()
+        wanted = _wanted(lines)
+        locks = self._locks_for(wanted)
+        for lock in locks:
+            lock.acquire()
+        try:
+            shortages = [
+                (ph_id, sku, qty, self.available(ph_id, sku))
+                for (ph_id, sku), qty in wanted.items()
+                if self.available(ph_id, sku) < qty
+            ]
+            if shortages:
+                raise OutOfStockError(shortages)
+            for key, qty in wanted.items():
+                self._held[key] += qty
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+        reservation_id = uuid4().hex
+        expires_at = self._clock() + (self.hold_seconds if hold_seconds is None else hold_seconds)
+        with self._registry_lock:
+            self._reservations[reservation_id] = Reservation(dict(wanted), expires_at)
+            heapq.heappush(self._expiry, (expires_at, reservation_id))
+        return reservation_id
+
+    def _pop(self, reservation_id: str) -> Optional[Reservation]:
+        with self._registry_lock:
+            return self._reservations.pop(reservation_id, None)
+
+    def _settle(self, reservation: Reservation, consume: bool):
+        locks = self._locks_for(reservation.lines)
+        for lock in locks:
+            lock.acquire()
+        try:
+            for key, qty in reservation.lines.items():
+                self._held[key] -= qty
+                if consume:
+                    self._on_hand[key] -= qty
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def commit(self, reservation_id: str, lines: Optional[Iterable[Tuple[str, str, int]]] = None):
+        """
+        Turn a hold into a sale: decrement on-hand stock. If `lines` is
+        given it must be what was reserved (InvalidOrderError otherwise,
+        and the hold is left as it was).
+        """
+        with self._registry_lock:
+            reservation = self._reservations.get(reservation_id)
+            if reservation is not None and lines is not None and _wanted(lines) != reservation.lines:
+                raise InvalidOrderError("Order lines don't match their reservation")
+            reservation = self._reservations.pop(reservation_id, None)
+        if reservation is None:
+            raise ReservationNotFoundError(reservation_id)
+        self._settle(reservation, consume=True)
+
+    def release(self, reservation_id: str) -> bool:
+        """Drop a hold without selling; False if it was already gone."""
+        reservation = self._pop(reservation_id)
+        if reservation is None:
+            return False
+        self._settle(reservation, consume=False)
+        return True
+
+    def release_expired(self) -> int:
+        """Release every hold past its expiry; returns how many were released."""
+        now = self._clock()
+        expired = []
+        # The heap is only read under the lock that guards pushes and pops
+        with self._registry_lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                _, reservation_id = heapq.heappop(self._expiry)
+                reservation = self._reservations.pop(reservation_id, None)
+                if reservation is not None:
+                    expired.append(reservation)
+        for reservation in expired:
+            self._settle(reservation, consume=False)
+        return len(expired)
+
+
+def _wanted(lines: Iterable[Tuple[str, str, int]]) -> Dict[StockKey, int]:
+    wanted: Dict[StockKey, int] = defaultdict(int)
+    for ph_id, sku, qty in lines:
+        if qty > 0:
+            wanted[(ph_id, sku)] += int(qty)
+    return dict(wanted)
+
+
+def inventory_store_by_id(store_id: Optional[str]) -> Optional[InventoryStore]:
+    """The store with this store_id, if it still exists in this process."""
+    return _stores.get(store_id) if store_id else None
+
+
+def get_inventory_store(snapshot=None) -> InventoryStore:
+    """
+    Process-wide live inventory shared by every PharmacyAgent/Orchestrator.
+
+    One store per inventory.csv version: reloading the file (a restock)
+    starts a fresh store; reloads of other files keep the current one.
+    """
+    snapshot = snapshot or current_snapshot()
+    return snapshot.derive(
+        "inventory_store", ("inventory",), lambda snap: InventoryStore.from_frame(snap.inventory)
+    )
@@ -50,3 +50,17 @@ def configure_root_logger():
     """
     get_logger("root")
 
+
+
+def log_to_stderr(level: int | None = None):
+    """
+    Send log records to stderr instead of stdout, e.g. when stdout carries
+    machine-readable output. Optionally change the root level too.
+    """
+    get_logger("root")
+    root = logging.getLogger()
+    for handler in root.handlers:
+        if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+            handler.setStream(sys.stderr)
+    if level is not None:
+        root.setLevel(level)
@@ -0,0 +1,769 @@
+"""
+Offline PDF text extraction in pure Python (zlib plus a small object parser).
+
+Covers what lab reports and "print to PDF" documents use: the page tree,
+Flate/ASCIIHex/ASCII85 content streams, the text-showing operators (Tj,
+TJ, ', "), Form XObjects, object streams and ToUnicode CMaps (including
+2-byte CID fonts). Pages that are only images yield no text; there is no
+OCR.
+
+    for page in iter_pdf_pages(path, max_pages=20):   # lazy, one page at a time
+        ...
+    extract_pdf_pages(path, sha256)   # all pages from a worker process, cached by content hash
+"""
+
+import base64
+import mmap
+import queue
+import re
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .constants import (
+    PDF_CACHE_SIZE,
+    PDF_MAX_CHARS,
+    PDF_MAX_PAGES,
+    PDF_TIMEOUT_SECONDS,
+    PDF_WORKERS,
+)
+from .logger import get_logger
+from .result_cache import ResultCache
+
+logger = get_logger(__name__)
+
+
+# -- object model -----------------------------------------------------------
+
+class Name(str):
+    """A PDF name (/Type -> Name("Type"))."""
+
+
+class Keyword(bytes):
+    """A bare word: an operator in content streams, `R`/`obj` etc. in files."""
+
+
+class Ref(NamedTuple):
+    num: int
+    gen: int
+
+
+class Stream(NamedTuple):
+    info: Dict[str, Any]
+    raw: bytes
+
+
+_WHITESPACE = b"\x00\t\n\x0c\r "
+_SKIP = re.compile(rb"(?:[\x00\t\n\x0c\r ]+|%[^\r\n]*)+")
+_REGULAR = re.compile(rb"[^\x00\t\n\x0c\r ()<>\[\]{}/%]+")
+_REF = re.compile(rb"(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+R(?![^\x00\t\n\x0c\r ()<>\[\]{}/%])")
+_NUMBER = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)$")
+_NAME_ESCAPE = re.compile(rb"#([0-9A-Fa-f]{2})")
+_HEX_STRING = re.compile(rb"<([0-9A-Fa-f\x00\t\n\x0c\r ]*)>")
+_LITERAL_SPECIAL = re.compile(rb"[\\()]")
+_OBJ_HEADER = re.compile(rb"(?<![0-9])(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+obj\b")
+_ROOT = re.compile(rb"/Root[\x00\t\n\x0c\r ]*(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+R")
+_ESCAPES = {ord("n"): 10, ord("r"): 13, ord("t"): 9, ord("b"): 8, ord("f"): 12}
+
+_END = object()  # end of input
+_CLOSE_ARRAY = object()
+_CLOSE_DICT = object()
+
+
+def _skip(buf, pos: int) -> int:
+    match = _SKIP.match(buf, pos)
+    return match.end() if match else pos
+
+
+def _literal_string(buf, pos: int) -> Tuple[bytes, int]:
+    """(...) string starting at `pos` (the opening parenthesis)."""
+    out = bytearray()
+    depth = 1
+    pos += 1
+    n = len(buf)
+    while pos < n:
+        match = _LITERAL_SPECIAL.search(buf, pos)
+        if match is None:
+            out += buf[pos:n]
+            return bytes(out), n
+        out += buf[pos:match.start()]
+        pos = match.start()
+        c = buf[pos]
+        if c == 0x5C:  # backslash
+            pos += 1
+            if pos >= n:
+                break
+            e = buf[pos]
+            if 0x30 <= e <= 0x37:
+                digits = bytes([e])
+                while len(digits) < 3 and pos + 1 < n and 0x30 <= buf[pos + 1] <= 0x37:
+                    pos += 1
+                    digits += bytes([buf[pos]])
+                out.append(int(digits, 8) & 0xFF)
+            elif e == 0x0D:  # line continuation
+                if pos + 1 < n and buf[pos + 1] == 0x0A:
+                    pos += 1
+            elif e != 0x0A:
+                out.append(_ESCAPES.get(e, e))
+        elif c == 0x28:
+            depth += 1
+            out.append(c)
+        else:
+            depth -= 1
+            if depth == 0:
+                return bytes(out), pos + 1
+            out.append(c)
+        pos += 1
+    return bytes(out), pos
+
+
+def _token(buf, pos: int) -> Tuple[Any, int]:
+    """Next value or keyword at `pos` (arrays and dicts parsed whole)."""
+    pos = _skip(buf, pos)
+    if pos >= len(buf):
+        return _END, pos
+    c = buf[pos]
+    if c == 0x2F:  # /Name
+        match = _REGULAR.match(buf, pos + 1)
+        raw = match.group() if match else b""
+        raw = _NAME_ESCAPE.sub(lambda m: bytes([int(m.group(1), 16)]), raw)
+        return Name(raw.decode("latin-1")), pos + 1 + (match.end() - match.start() if match else 0)
+    if c == 0x28:
+        return _literal_string(buf, pos)
+    if c == 0x3C:
+        if buf[pos + 1:pos + 2] == b"<":
+            return _dictionary(buf, pos + 2)
+        match = _HEX_STRING.match(buf, pos)
+        if match is None:
+            return b"", pos + 1
+        digits = re.sub(rb"[^0-9A-Fa-f]", b"", match.group(1))
+        if len(digits) % 2:
+            digits += b"0"
+        return bytes.fromhex(digits.decode("ascii")), match.end()
+    if c == 0x3E and buf[pos + 1:pos + 2] == b">":
+        return _CLOSE_DICT, pos + 2
+    if c == 0x5B:
+        return _array(buf, pos + 1)
+    if c == 0x5D:
+        return _CLOSE_ARRAY, pos + 1
+    if c in b"{}":
+        return Keyword(bytes([c])), pos + 1
+    if 0x30 <= c <= 0x39:
+        ref = _REF.match(buf, pos)
+        if ref:
+            return Ref(int(ref.group(1)), int(ref.group(2))), ref.end()
+    match = _REGULAR.match(buf, pos)
+    if match is None:
+        return Keyword(bytes([c])), pos + 1  # stray delimiter
+    word = match.group()
+    if _NUMBER.match(word):
+        try:
+            return (float(word) if b"." in word else int(word)), match.end()
+        except ValueError:
+            pass
+    if word == b"true":
+        return True, match.end()
+    if word == b"false":
+        return False, match.end()
+    if word == b"null":
+        return None, match.end()
+    return Keyword(word), match.end()
+
+
+def _array(buf, pos: int) -> Tuple[list, int]:
+    items = []
+    while True:
+        value, pos = _token(buf, pos)
+        if value is _CLOSE_ARRAY or value is _END:
+            return items, pos
+        if value is not _CLOSE_DICT:
+            items.append(value)
+
+
+def _dictionary(buf, pos: int) -> Tuple[dict, int]:
+    result = {}
+    while True:
+        key, pos = _token(buf, pos)
+        if key is _CLOSE_DICT or key is _END:
+            return result, pos
+        if not isinstance(key, Name):
+            continue  # malformed; resynchronize on the next name
+        value, pos = _token(buf, pos)
+        if value is _CLOSE_DICT or value is _END:
+            return result, pos
+        result[key] = value
+
+
+# -- stream filters ---------------------------------------------------------
+
+def _inflate(data: bytes) -> bytes:
+    try:
+        return zlib.decompress(data)
+    except zlib.error:
+        # Truncated or trailing garbage: keep whatever decompresses
+        try:
+            return zlib.decompressobj().decompress(data)
+        except zlib.error:
+            return b""
+
+
+def _ascii85(data: bytes) -> bytes:
+    data = data.strip()
+    if data.endswith(b"~>"):
+        data = data[:-2]
+    if data.startswith(b"<~"):
+        data = data[2:]
+    return base64.a85decode(re.sub(rb"\s", b"", data))
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+# -- CMaps and fonts --------------------------------------------------------
+
+class _Font:
+    """Maps a shown string's bytes to text."""
+
+    def __init__(self, to_unicode: Optional[Dict[bytes, str]] = None, code_lengths=(1,), decodable=True):
+        self.to_unicode = to_unicode or {}
+        self.code_lengths = tuple(sorted(set(code_lengths))) or (1,)
+        self.decodable = decodable
+
+    def decode(self, data: bytes) -> str:
+        if not self.to_unicode:
+            return data.decode("latin-1") if self.decodable else ""
+        mapping = self.to_unicode
+        lengths = self.code_lengths
+        out = []
+        i = 0
+        n = len(data)
+        if len(lengths) == 1:
+            step = lengths[0]
+            for i in range(0, n - step + 1, step):
+                out.append(mapping.get(data[i:i + step], ""))
+            return "".join(out)
+        while i < n:
+            for length in lengths:
+                text = mapping.get(data[i:i + length])
+                if text is not None:
+                    out.append(text)
+                    i += length
+                    break
+            else:
+                i += lengths[0]
+        return "".join(out)
+
+
+_PLAIN_FONT = _Font()
+
+
+# Symbol-encoded fonts (common from Windows "print to PDF") map their glyphs
+# to the private-use block U+F020-U+F0FF instead of the characters they show
+_SYMBOL_PUA = {0xF000 + code: code for code in range(0x20, 0x100)}
+
+
+def _utf16(data: bytes) -> str:
+    return data.decode("utf-16-be", errors="ignore").translate(_SYMBOL_PUA)
+
+
+def parse_to_unicode(data: bytes) -> Tuple[Dict[bytes, str], Tuple[int, ...]]:
+    """(code bytes -> text, code lengths) from a ToUnicode CMap stream."""
+    mapping: Dict[bytes, str] = {}
+    lengths = set()
+    tokens = []
+    pos = 0
+    while True:
+        value, pos = _token(data, pos)
+        if value is _END:
+            break
+        if isinstance(value, Keyword) and value.startswith(b"end"):
+            section = value[3:]
+            if section == b"codespacerange":
+                lengths.update(len(lo) for lo in tokens[0::2] if isinstance(lo, bytes))
+            elif section == b"bfchar":
+                for src, dst in zip(tokens[0::2], tokens[1::2]):
+                    if isinstance(src, bytes) and isinstance(dst, bytes):
+                        mapping[src] = _utf16(dst)
+            elif section == b"bfrange":
+                for lo, hi, dst in zip(tokens[0::3], tokens[1::3], tokens[2::3]):
+                    _add_range(mapping, lo, hi, dst)
+            tokens = []
+        elif isinstance(value, Keyword) and value.startswith(b"begin"):
+            tokens = []
+        else:
+            tokens.append(value)
+    if not lengths:
+        lengths = {len(code) for code in mapping} or {1}
+    return mapping, tuple(sorted(lengths))
+
+
+def _add_range(mapping: Dict[bytes, str], lo, hi, dst):
+    if not (isinstance(lo, bytes) and isinstance(hi, bytes)):
+        return
+    start, end = int.from_bytes(lo, "big"), int.from_bytes(hi, "big")
+    if end < start or end - start > 0xFFFF:
+        return
+    width = len(lo)
+    for offset, code in enumerate(range(start, end + 1)):
+        if isinstance(dst, list):
+            if offset >= len(dst):
+                break
+            target = dst[offset]
+            if isinstance(target, bytes):
+                mapping[code.to_bytes(width, "big")] = _utf16(target)
+        elif isinstance(dst, bytes) and dst:
+            # The last byte pair of the destination increments
+            value = int.from_bytes(dst, "big") + offset
+            mapping[code.to_bytes(width, "big")] = _utf16(value.to_bytes(len(dst), "big"))
+
+
+# -- documents --------------------------------------------------------------
+
+class PdfDocument:
+    """
+    Objects are located by scanning for "N G obj" headers once (which also
+    copes with broken xref tables and incremental updates: the last
+    definition wins) and parsed only when something refers to them.
+    """
+
+    MAX_FORM_DEPTH = 5
+
+    def __init__(self, data):
+        self.data = data
+        self._offsets: Dict[int, int] = {}
+        for match in _OBJ_HEADER.finditer(data):
+            self._offsets[int(match.group(1))] = match.end()
+        self._sorted_offsets = sorted((off, num) for num, off in self._offsets.items())
+        self._objects: Dict[int, Any] = {}
+        self._packed: Optional[Dict[int, Tuple[int, int]]] = None
+        self._fonts: Dict[Any, _Font] = {}
+
+    # objects
+    def resolve(self, value, _depth: int = 0):
+        while isinstance(value, Ref) and _depth < 32:
+            value = self.get(value.num)
+            _depth += 1
+        return value
+
+    def get(self, num: int):
+        if num in self._objects:
+            return self._objects[num]
+        self._objects[num] = None  # breaks reference cycles while parsing
+        offset = self._offsets.get(num)
+        value = self._parse_at(offset) if offset is not None else self._from_object_stream(num)
+        self._objects[num] = value
+        return value
+
+    def _parse_at(self, offset: int):
+        data = self.data
+        value, pos = _token(data, offset)
+        if not isinstance(value, dict):
+            return None if value is _END else value
+        pos = _skip(data, pos)
+        if data[pos:pos + 6] != b"stream":
+            return value
+        pos += 6
+        if data[pos:pos + 2] == b"\r\n":
+            pos += 2
+        elif data[pos:pos + 1] in (b"\n", b"\r"):
+            pos += 1
+        length = self.resolve(value.get("Length"))
+        end = pos + length if isinstance(length, int) and length >= 0 else -1
+        if end < 0 or data[end:end + 32].lstrip(_WHITESPACE)[:9] != b"endstream":
+            found = data.find(b"endstream", pos)
+            end = found if found >= 0 else len(data)
+        return Stream(value, bytes(data[pos:end]))
+
+    def _from_object_stream(self, num: int):
+        if self._packed is None:
+            self._packed = {}
+            for match in re.finditer(rb"/Type[\x00\t\n\x0c\r ]*/ObjStm", self.data):
+                i = bisect_right(self._sorted_offsets, (match.start(), float("inf"))) - 1
+                if i >= 0:
+                    self._index_object_stream(self._sorted_offsets[i][1])
+        location = self._packed.get(num)
+        if location is None:
+            return None
+        stream_num, start = location
+        data = self.decode(self.get(stream_num))
+        if data is None:
+            return None
+        value, _ = _token(data, start)
+        return None if value is _END else value
+
+    def _index_object_stream(self, stream_num: int):
+        stream = self.get(stream_num)
+        if not isinstance(stream, Stream):
+            return
+        data = self.decode(stream)
+        if not data:
+            return
+        count = stream.info.get("N", 0)
+        first = stream.info.get("First", 0)
+        header = data[:first].split()
+        for i in range(0, min(len(header), 2 * count) - 1, 2):
+            try:
+                packed_num, offset = int(header[i]), int(header[i + 1])
+            except ValueError:
+                break
+            # Objects defined directly in the file win over packed copies
+            if packed_num not in self._offsets:
+                self._packed[packed_num] = (stream_num, first + offset)
+
+    def decode(self, stream) -> Optional[bytes]:
+        """Decoded stream data, or None for filters without text (images etc.)."""
+        stream = self.resolve(stream)
+        if not isinstance(stream, Stream):
+            return None
+        data = stream.raw
+        for name in _as_list(self.resolve(stream.info.get("Filter"))):
+            name = self.resolve(name)
+            if name in ("FlateDecode", "Fl"):
+                data = _inflate(data)
+            elif name in ("ASCIIHexDecode", "AHx"):
+                digits = re.sub(rb"[^0-9A-Fa-f]", b"", data.split(b">")[0])
+                data = bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode("ascii"))
+            elif name in ("ASCII85Decode", "A85"):
+                try:
+                    data = _ascii85(data)
+                except ValueError:
+                    return None
+            else:
+                return None
+        return data
+
+    # pages
+    def _catalog(self) -> Optional[dict]:
+        roots = list(_ROOT.finditer(self.data))
+        for match in reversed(roots):
+            catalog = self.resolve(Ref(int(match.group(1)), int(match.group(2))))
+            if isinstance(catalog, dict):
+                return catalog
+        return None
+
+    def pages(self) -> Iterator[Tuple[dict, Any]]:
+        """(page dict, inherited resources) in reading order."""
+        catalog = self._catalog()
+        root = self.resolve(catalog.get("Pages")) if catalog else None
+        if not isinstance(root, dict):
+            yield from self._pages_by_scan()
+            return
+        seen = set()
+        stack = [(root, None)]
+        while stack:
+            node, resources = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            resources = node.get("Resources", resources)
+            kids = self.resolve(node.get("Kids"))
+            if node.get("Type") == "Pages" or isinstance(kids, list):
+                for kid in reversed(kids or []):
+                    kid = self.resolve(kid)
+                    if isinstance(kid, dict):
+                        stack.append((kid, resources))
+            else:
+                yield node, resources
+
+    def _pages_by_scan(self) -> Iterator[Tuple[dict, Any]]:
+        # No usable page tree: every /Type /Page object, in file order
+        for _, num in self._sorted_offsets:
+            value = self.get(num)
+            if isinstance(value, dict) and value.get("Type") == "Page":
+                yield value, value.get("Resources")
+
+    def _font(self, fonts: dict, name) -> _Font:
+        ref = fonts.get(name)
+        key = ref if isinstance(ref, Ref) else id(ref)
+        font = self._fonts.get(key)
+        if font is None:
+            font = self._load_font(self.resolve(ref))
+            self._fonts[key] = font
+        return font
+
+    def _load_font(self, info) -> _Font:
+        if not isinstance(info, dict):
+            return _PLAIN_FONT
+        cmap_data = self.decode(info.get("ToUnicode"))
+        if cmap_data:
+            mapping, lengths = parse_to_unicode(cmap_data)
+            if mapping:
+                return _Font(mapping, lengths)
+        # Composite fonts show glyph ids; without a ToUnicode map they aren't text
+        return _Font(decodable=info.get("Subtype") != "Type0")
+
+    def page_text(self, page: dict, resources=None) -> str:
+        contents = self.resolve(page.get("Contents"))
+        parts = [self.decode(part) for part in _as_list(contents)]
+        content = b"\n".join(part for part in parts if part)
+        pieces: List[str] = []
+        self._show_text(content, resources if resources is not None else page.get("Resources"), pieces, 0)
+        return _tidy("".join(pieces))
+
+    def _show_text(self, content: bytes, resources, out: List[str], depth: int):
+        resources = self.resolve(resources) or {}
+        fonts = self.resolve(resources.get("Font")) or {}
+        xobjects = self.resolve(resources.get("XObject")) or {}
+        font = _PLAIN_FONT
+        operands: list = []
+        line_y = None
+        pos = 0
+        while True:
+            value, pos = _token(content, pos)
+            if value is _END:
+                break
+            if not isinstance(value, Keyword):
+                if value is not _CLOSE_ARRAY and value is not _CLOSE_DICT:
+                    operands.append(value)
+                continue
+            op = bytes(value)
+            if op == b"Tf" and len(operands) >= 2 and isinstance(fonts, dict):
+                font = self._font(fonts, operands[-2])
+            elif op == b"Tj" and operands and isinstance(operands[-1], bytes):
+                out.append(font.decode(operands[-1]))
+            elif op in (b"'", b'"') and operands and isinstance(operands[-1], bytes):
+                out.append("\n")
+                out.append(font.decode(operands[-1]))
+            elif op == b"TJ" and operands and isinstance(operands[-1], list):
+                for item in operands[-1]:
+                    if isinstance(item, bytes):
+                        out.append(font.decode(item))
+                    elif isinstance(item, (int, float)) and item < -250:
+                        out.append(" ")  # a kerning gap wide enough to be a space
+            elif op in (b"Td", b"TD") and len(operands) >= 2:
+                tx, ty = operands[-2], operands[-1]
+                if isinstance(ty, (int, float)) and abs(ty) > 0.01:
+                    out.append("\n")
+                elif isinstance(tx, (int, float)) and tx > 0:
+                    out.append(" ")
+            elif op == b"T*":
+                out.append("\n")
+            elif op == b"Tm" and len(operands) >= 6:
+                y = operands[-1]
+                if isinstance(y, (int, float)):
+                    out.append("\n" if line_y is None or abs(y - line_y) > 0.01 else " ")
+                    line_y = y
+            elif op == b"ET":
+                out.append(" ")
+            elif op == b"Do" and operands and isinstance(xobjects, dict) and depth < self.MAX_FORM_DEPTH:
+                form = self.resolve(xobjects.get(operands[-1]))
+                if isinstance(form, Stream) and form.info.get("Subtype") == "Form":
+                    data = self.decode(form)
+                    if data:
+                        self._show_text(data, form.info.get("Resources", resources), out, depth + 1)
+            elif op == b"BI":
+                # Inline image: skip its binary data up to "EI"
+                end = re.compile(rb"[\x00\t\n\x0c\r ]EI(?![^\x00\t\n\x0c\r ])").search(content, pos)
+                pos = end.end() if end else len(content)
+            operands = []
+
+
+def _tidy(text: str) -> str:
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+# -- public API -------------------------------------------------------------
+
+def iter_pdf_pages(path: str, max_pages: int = PDF_MAX_PAGES, max_chars: int = PDF_MAX_CHARS) -> Iterator[str]:
+    """
+    Text of each page, parsed only when the generator gets there, until
+    `max_pages` pages or `max_chars` characters in total (the page that
+    crosses the budget is cut). A page that fails to parse yields "".
+    """
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            document = PdfDocument(data)
+            remaining = max_chars
+            for number, (page, resources) in enumerate(document.pages()):
+                if number >= max_pages or remaining <= 0:
+                    break
+                try:
+                    text = document.page_text(page, resources)
+                except Exception:
+                    logger.warning("Could not read text of page %d in %s", number + 1, path, exc_info=True)
+                    text = ""
+                text = text[:remaining]
+                remaining -= len(text)
+                yield text
+
+
+def _extract_pages(path: str, max_pages: int, max_chars: int) -> List[str]:
+    # Runs in a worker: the whole budgeted page list goes back in one result
+    return list(iter_pdf_pages(path, max_pages, max_chars))
+
+
+def _serve(conn):
+    # Worker loop: one (path, max_pages, max_chars) job at a time until the pipe closes
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, _extract_pages(*job)))
+        except Exception as exc:
+            conn.send((False, f"{type(exc).__name__}: {exc}"))
+
+
+class _JobFailed(Exception):
+    """The extraction raised in the worker (the worker itself is fine)."""
+
+
+class _Worker:
+    """One extraction process and the pipe it takes jobs on."""
+
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def run(self, job: tuple, timeout: float) -> List[str]:
+        self.conn.send(job)
+        if not self.conn.poll(timeout):
+            raise FutureTimeout
+        ok, result = self.conn.recv()
+        if not ok:
+            raise _JobFailed(result)
+        return result
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join(5)
+        self.conn.close()
+
+
+class _WorkerPool:
+    """
+    Up to `size` warm worker processes, each running one job at a time. A
+    job that overruns its timeout has its own worker killed (the slot
+    starts a new one when next used); jobs on other workers carry on.
+    """
+
+    def __init__(self, size: int, context):
+        self.size = size
+        self._context = context
+        self._idle: "queue.Queue[Optional[_Worker]]" = queue.Queue()
+        for _ in range(size):
+            self._idle.put(None)  # a worker is started on first use
+
+    def run(self, job: tuple, timeout: float) -> List[str]:
+        deadline = time.monotonic() + timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise FutureTimeout from None
+        try:
+            if worker is None or not worker.process.is_alive():
+                worker = _Worker(self._context)
+            result = worker.run(job, max(0.0, deadline - time.monotonic()))
+        except _JobFailed:
+            self._idle.put(worker)
+            raise
+        except BaseException:
+            # Timed out or crashed: this worker's state is unknown, kill it
+            if worker is not None:
+                worker.kill()
+            self._idle.put(None)
+            raise
+        self._idle.put(worker)
+        return result
+
+    def shutdown(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if worker is not None:
+                worker.kill()
+
+
+_pool: Optional[_WorkerPool] = None
+_cache: Optional[ResultCache] = None
+_lock = threading.Lock()
+
+
+def _executor(workers: int) -> Optional[_WorkerPool]:
+    """
+    Shared extraction workers, or None inside a child process (e.g. a
+    run_flow_many worker): that is already off the parent's GIL, and a pool
+    nested in a pool worker can stall the worker's exit.
+    """
+    global _pool
+    import multiprocessing
+    if multiprocessing.parent_process() is not None:
+        return None
+    with _lock:
+        if _pool is None:
+            # "spawn", as in Orchestrator.run_flow_many: forking a threaded
+            # server can leave the child holding a lock forever
+            _pool = _WorkerPool(workers, multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_executor(pool: _WorkerPool):
+    """Drop `pool` and stop its idle workers; the next call starts a fresh one."""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown()
+
+
+def pdf_text_cache() -> ResultCache:
+    """Process-wide extracted-text cache (content hash + budget -> pages)."""
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = ResultCache(PDF_CACHE_SIZE)
+        return _cache
+
+
+def extract_pdf_pages(
+    path: str,
+    sha256: Optional[str] = None,
+    max_pages: int = PDF_MAX_PAGES,
+    max_chars: int = PDF_MAX_CHARS,
+    timeout: float = PDF_TIMEOUT_SECONDS,
+    workers: int = PDF_WORKERS,
+) -> List[str]:
+    """
+    Page texts of the PDF within the budget, parsed in a worker process so
+    a large report doesn't hold this process's GIL (workers=0: in this
+    thread; the first call fixes the pool size). The worker returns all
+    pages at once; only pages past the budget are never parsed (use
+    iter_pdf_pages for one page at a time). Cached by `sha256` when given.
+    An unreadable PDF, or one that takes longer than `timeout` (waiting
+    for a free worker included), gives [] and a warning; on a timeout only
+    the worker running this PDF is killed, never other callers' jobs.
+    """
+    key = f"{sha256}-{max_pages}-{max_chars}" if sha256 else None
+    if key:
+        cached = pdf_text_cache().get(key)
+        if cached is not None:
+            return cached
+    try:
+        pool = _executor(workers) if workers else None
+        if pool is not None:
+            pages = pool.run((path, max_pages, max_chars), timeout)
+        else:
+            pages = _extract_pages(path, max_pages, max_chars)
+    except FutureTimeout:
+        logger.warning("PDF text extraction timed out after %ss: %s", timeout, path)
+        return []
+    except Exception:
+        logger.warning("PDF text extraction failed: %s", path, exc_info=True)
+        return []
+    if key:
+        pdf_text_cache().put(key, pages)
+    return pages
@@ -0,0 +1,89 @@
+"""Bounded in-memory LRU of JSON-able results, optionally backed by a directory on disk."""
+
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Any, Dict, Optional
+
+
+class ResultCache:
+    """
+    key -> result, keeping the `max_entries` most recently used in memory.
+    With `disk_dir`, every result is also written there as <key>.json, so
+    a restarted process (or another worker sharing the directory) finds
+    it; a memory miss that hits disk is promoted back into memory.
+    Callers get copies, so mutating a returned result can't corrupt it.
+    """
+
+    def __init__(self, max_entries: int = 4096, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _remember(self, key: str, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return deepcopy(self._entries[key])
+        value = self._load(key)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, value)
+        return deepcopy(value)
+
+    def put(self, key: str, value: Any):
+        value = deepcopy(value)
+        with self._lock:
+            self._remember(key, value)
+        if self.disk_dir:
+            self._store(key, value)
+
+    def _load(self, key: str) -> Optional[Any]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key: str, value: Any):
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, prefix=".cache-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, self._disk_path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        """hits, disk_hits, misses, evictions and current in-memory size."""
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,166 @@
+"""Weighted set cover over small item bitsets, used for split baskets."""
+
+import math
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Exact search is O(stores * 2^k + 3^k); past either limit (items, or
+# stores * 2^items) it falls back to greedy. Too many stores are first
+# pruned of dominated ones, which costs O(stores^2 * k) itself.
+MAX_EXACT_ITEMS = 10
+MAX_EXACT_WORK = 1 << 18
+MAX_PRUNE_WORK = 1 << 24
+
+
+def cheapest_cover(
+    masks: Sequence[int],
+    fees: np.ndarray,
+    prices: np.ndarray,
+    chunk_size: int = 1024,
+) -> List[Tuple[int, int]]:
+    """
+    Cover every item offered by at least one store using the fewest stores,
+    breaking ties by lowest total cost (fee per store used + item prices).
+
+    Args:
+        masks: (stores,) Python int bitset of the items each store can supply
+            (any number of items; only exact search packs them into int64)
+        fees: (stores,) per-store delivery fee
+        prices: (stores, items) unit price, ignored where the store lacks the item
+        chunk_size: stores scored per NumPy block, bounds peak memory
+
+    Returns:
+        List of (store index, bitset of items assigned to that store).
+        Ties between equally good stores go to the lower index.
+    """
+    n_stores, n_items = prices.shape
+    if n_stores == 0 or n_items == 0:
+        return []
+    masks = [int(mask) for mask in masks]
+    if n_items > MAX_EXACT_ITEMS:
+        return _greedy_cover(masks, fees, prices)
+
+    if n_stores << n_items <= MAX_EXACT_WORK:
+        keep = np.arange(n_stores)
+    elif n_stores * n_stores * n_items <= MAX_PRUNE_WORK:
+        keep = _undominated(np.array(masks, dtype=np.int64), np.asarray(fees, float), np.asarray(prices, float))
+    else:
+        keep = None
+    if keep is None or len(keep) << n_items > MAX_EXACT_WORK:
+        return _greedy_cover(masks, fees, prices)
+    plan = _exact_cover(
+        np.array(masks, dtype=np.int64)[keep], np.asarray(fees, float)[keep],
+        np.asarray(prices, float)[keep], chunk_size,
+    )
+    return [(int(keep[store]), part) for store, part in plan]
+
+
+def _undominated(masks: np.ndarray, fees: np.ndarray, prices: np.ndarray, chunk_size: int = 256) -> np.ndarray:
+    """
+    Indices of stores not dominated by another: store j is dropped when some
+    store i stocks every item j does, at no higher fee and no higher price
+    for each of them (so i is never worse for any subset j could supply),
+    and i is strictly better somewhere or has the lower index.
+    """
+    n_stores, n_items = prices.shape
+    stocked = ((masks[:, None] >> np.arange(n_items)) & 1).astype(bool)
+    index = np.arange(n_stores)
+    dominated = np.zeros(n_stores, dtype=bool)
+    for start in range(0, n_stores, chunk_size):
+        j = index[start:start + chunk_size]
+        # (block, stores) candidates i for each j, narrowed one item at a time
+        weak = (masks[j, None] & ~masks[None, :]) == 0
+        weak &= fees[None, :] <= fees[j, None]
+        strict = (fees[None, :] < fees[j, None]) | (index[None, :] < j[:, None])
+        for item in range(n_items):
+            needs = stocked[j, item][:, None]
+            theirs, mine = prices[None, :, item], prices[j, item][:, None]
+            weak &= ~needs | (theirs <= mine)
+            strict |= needs & (theirs < mine)
+        weak &= strict
+        weak[np.arange(len(j)), j] = False
+        dominated[j] = weak.any(axis=1)
+    return index[~dominated]
+
+
+def _exact_cover(masks: np.ndarray, fees: np.ndarray, prices: np.ndarray, chunk_size: int) -> List[Tuple[int, int]]:
+    """Cheapest single store per item subset, then a partition DP over subsets."""
+    n_stores, n_items = prices.shape
+    full = int(np.bitwise_or.reduce(masks))
+    n_sub = 1 << n_items
+    subs = np.arange(n_sub, dtype=np.int64)
+    bits = ((subs[:, None] >> np.arange(n_items)) & 1).astype(float)
+
+    stocked = ((masks[:, None] >> np.arange(n_items)) & 1).astype(bool)
+    prices = np.where(stocked, prices, 0.0)
+
+    # Cheapest single store able to supply each item subset
+    best_cost = np.full(n_sub, np.inf)
+    best_store = np.full(n_sub, -1, dtype=np.int64)
+    for start in range(0, n_stores, chunk_size):
+        block = slice(start, start + chunk_size)
+        cost = fees[block, None] + prices[block] @ bits.T
+        feasible = (masks[block, None] & subs[None, :]) == subs[None, :]
+        cost = np.where(feasible, cost, np.inf)
+        local = cost.argmin(axis=0)
+        local_cost = cost[local, subs]
+        better = local_cost < best_cost
+        best_cost[better] = local_cost[better]
+        best_store[better] = local[better] + start
+
+    # Partition DP over subsets of the coverable items: (stores used, cost)
+    sub_cost = best_cost.tolist()
+    dp: List[Tuple[float, float]] = [(math.inf, math.inf)] * n_sub
+    choice = [0] * n_sub
+    dp[0] = (0, 0.0)
+    for mask in range(1, n_sub):
+        if mask & ~full:
+            continue
+        low = mask & -mask
+        rest = mask ^ low
+        sub = rest
+        best, pick = (math.inf, math.inf), 0
+        while True:
+            part = sub | low
+            cost = sub_cost[part]
+            if cost != math.inf:
+                used, total = dp[mask ^ part]
+                candidate = (used + 1, total + cost)
+                if candidate < best:
+                    best, pick = candidate, part
+            if not sub:
+                break
+            sub = (sub - 1) & rest
+        dp[mask], choice[mask] = best, pick
+
+    plan = []
+    mask = full
+    while mask:
+        part = choice[mask]
+        plan.append((int(best_store[part]), part))
+        mask ^= part
+    return plan
+
+
+def _greedy_cover(masks: List[int], fees: np.ndarray, prices: np.ndarray) -> List[Tuple[int, int]]:
+    """Classic greedy: repeatedly take the store adding most uncovered items, cheapest first."""
+    n_items = prices.shape[1]
+    remaining = 0
+    for mask in masks:
+        remaining |= mask
+    plan = []
+    while remaining:
+        best = None
+        for store, mask in enumerate(masks):
+            gain = mask & remaining
+            if not gain:
+                continue
+            cost = fees[store] + sum(prices[store, i] for i in range(n_items) if gain >> i & 1)
+            key = (-bin(gain).count("1"), cost)
+            if best is None or key < best[0]:
+                best = (key, store, gain)
+        _, store, gain = best
+        plan.append((store, gain))
+        remaining &= ~gain
+    return plan
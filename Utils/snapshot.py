@@ -0,0 +1,271 @@
+"""Versioned, hot-reloadable snapshot of every file under Data/.
+
+Readers grab one snapshot per request and keep using it even if a newer one
+is published meanwhile; a background watcher rebuilds the snapshot when a
+file's mtime changes and swaps the reference in one assignment (RCU-style),
+so in-flight requests are never blocked or see a half-loaded mix.
+
+Datasets are parsed on first access, so a flow that never reaches pharmacy
+matching never pays for the inventory. Unchanged datasets are shared
+between snapshot versions, loaded or not.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, TypeVar
+
+from .constants import (
+    MEDICINES_FILE,
+    INTERACTIONS_FILE,
+    INVENTORY_FILE,
+    PHARMACIES_FILE,
+    ZIPCODES_FILE,
+    DOCTORS_FILE,
+)
+from .data_loader import (
+    read_medicines,
+    read_interactions,
+    read_inventory,
+    read_pharmacies,
+    read_zipcodes,
+    read_doctors,
+)
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# dataset name -> (source file, parser)
+DATASETS: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    "medicines": (MEDICINES_FILE, read_medicines),
+    "interactions": (INTERACTIONS_FILE, read_interactions),
+    "inventory": (INVENTORY_FILE, read_inventory),
+    "pharmacies": (PHARMACIES_FILE, read_pharmacies),
+    "zipcodes": (ZIPCODES_FILE, read_zipcodes),
+    "doctors": (DOCTORS_FILE, read_doctors),
+}
+
+Stamp = Tuple[int, int]  # (mtime_ns, size)
+# derived key -> (source stamps, value, source dataset names)
+Derived = Dict[str, Tuple[Tuple[Stamp, ...], Any, Tuple[str, ...]]]
+
+
+def _stamp(path: str) -> Stamp:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+_UNLOADED = object()
+
+
+class _Dataset:
+    """One version of one source file, parsed on first access."""
+
+    __slots__ = ("stamp", "_path", "_reader", "_value", "_lock")
+
+    def __init__(self, stamp: Stamp, path: str, reader: Callable[[str], Any]):
+        self.stamp = stamp
+        self._path = path
+        self._reader = reader
+        self._value: Any = _UNLOADED
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not _UNLOADED
+
+    def value(self) -> Any:
+        if self._value is _UNLOADED:
+            with self._lock:
+                if self._value is _UNLOADED:
+                    self._value = self._reader(self._path)
+        return self._value
+
+
+class DataSnapshot:
+    """
+    One consistent version of all datasets. Treat every value as read-only.
+
+    `derive()` memoizes structures built from the data (lookup maps, search
+    indexes...). When a new snapshot is built, derived values whose source
+    datasets did not change are carried over instead of rebuilt.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        datasets: Dict[str, _Dataset],
+        derived: Optional[Derived] = None,
+    ):
+        self.version = version
+        self._datasets = datasets
+        self._derived = dict(derived or {})
+        self._derive_lock = threading.RLock()
+
+    def stamp(self, name: str) -> Stamp:
+        return self._datasets[name].stamp
+
+    def get(self, name: str) -> Any:
+        return self._datasets[name].value()
+
+    def loaded(self) -> Tuple[str, ...]:
+        """Names of the datasets parsed so far."""
+        return tuple(name for name, ds in self._datasets.items() if ds.loaded)
+
+    @property
+    def medicines(self):
+        return self.get("medicines")
+
+    @property
+    def interactions(self):
+        return self.get("interactions")
+
+    @property
+    def inventory(self):
+        return self.get("inventory")
+
+    @property
+    def pharmacies(self):
+        return self.get("pharmacies")
+
+    @property
+    def zipcodes(self):
+        return self.get("zipcodes")
+
+    @property
+    def doctors(self):
+        return self.get("doctors")
+
+    def derive(
+        self,
+        key: str,
+        depends_on: Iterable[str],
+        factory: Callable[["DataSnapshot"], T],
+    ) -> T:
+        """Return factory(self), built at most once per version of `depends_on`."""
+        depends_on = tuple(depends_on)
+        stamps = tuple(self.stamp(name) for name in depends_on)
+        cached = self._derived.get(key)
+        if cached is not None and cached[0] == stamps:
+            return cached[1]
+        with self._derive_lock:
+            cached = self._derived.get(key)
+            if cached is not None and cached[0] == stamps:
+                return cached[1]
+            value = factory(self)
+            self._derived[key] = (stamps, value, depends_on)
+            return value
+
+    def carry_over(self) -> Derived:
+        with self._derive_lock:
+            return dict(self._derived)
+
+
+class SnapshotManager:
+    """Owns the current snapshot and the optional background file watcher."""
+
+    def __init__(self, datasets: Dict[str, Tuple[str, Callable[[str], Any]]] = DATASETS):
+        self._datasets = datasets
+        self._current: Optional[DataSnapshot] = None
+        self._build_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def _stamps(self) -> Dict[str, Stamp]:
+        return {name: _stamp(path) for name, (path, _) in self._datasets.items()}
+
+    def _build(self, previous: Optional[DataSnapshot], stamps: Dict[str, Stamp]) -> DataSnapshot:
+        datasets = {}
+        for name, (path, reader) in self._datasets.items():
+            if previous is not None and previous.stamp(name) == stamps[name]:
+                datasets[name] = previous._datasets[name]
+            else:
+                datasets[name] = _Dataset(stamps[name], path, reader)
+                if previous is not None:
+                    # Parse changed files now so a bad file never gets published
+                    datasets[name].value()
+
+        derived = {}
+        if previous is not None:
+            for key, (dep_stamps, value, deps) in previous.carry_over().items():
+                if dep_stamps == tuple(datasets[name].stamp for name in deps):
+                    derived[key] = (dep_stamps, value, deps)
+
+        version = previous.version + 1 if previous is not None else 1
+        return DataSnapshot(version, datasets, derived)
+
+    def current(self) -> DataSnapshot:
+        snapshot = self._current
+        if snapshot is None:
+            with self._build_lock:
+                if self._current is None:
+                    self._current = self._build(None, self._stamps())
+                snapshot = self._current
+        return snapshot
+
+    def refresh(self) -> bool:
+        """
+        Rebuild and publish a new snapshot if any file changed on disk.
+        Returns True when a new snapshot was swapped in. On a parse error
+        (e.g. a file caught mid-write) the current snapshot stays live.
+        """
+        previous = self.current()
+        with self._build_lock:
+            previous = self._current or previous
+            stamps = self._stamps()
+            changed = [name for name in stamps if previous.stamp(name) != stamps[name]]
+            if not changed:
+                return False
+            try:
+                snapshot = self._build(previous, stamps)
+            except Exception:
+                logger.exception("Data reload failed; keeping snapshot v%d", previous.version)
+                return False
+            self._current = snapshot
+        logger.info("Data snapshot v%d published (changed: %s)", snapshot.version, ", ".join(changed))
+        return True
+
+    def start_watcher(self, poll_seconds: float = 2.0) -> None:
+        """Poll file mtimes in a daemon thread; no-op if already running."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+
+        def _watch():
+            while not self._stop.wait(poll_seconds):
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("Data watcher iteration failed")
+
+        self._watcher = threading.Thread(target=_watch, name="data-snapshot-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+
+_manager = SnapshotManager()
+
+
+def current_snapshot() -> DataSnapshot:
+    """The snapshot new requests should use."""
+    return _manager.current()
+
+
+def refresh_snapshot() -> bool:
+    """Synchronously check Data/ for changes and publish a new snapshot."""
+    return _manager.refresh()
+
+
+def start_data_watcher(poll_seconds: float = 2.0) -> None:
+    """Start hot-reloading Data/ in the background."""
+    _manager.start_watcher(poll_seconds)
+
+
+def stop_data_watcher() -> None:
+    _manager.stop_watcher()
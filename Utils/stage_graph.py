@@ -0,0 +1,222 @@
+"""Small dependency-graph runner for the coordinator's pipeline stages.
+
+Each Stage names the values it reads (`inputs`) and writes (`outputs`).
+A stage becomes ready once every stage producing one of its inputs has
+finished; ready stages run concurrently on an executor. A stage with a
+required input that ended up absent (never produced, or produced as None)
+is skipped and contributes its `defaults` instead, e.g. imaging without an
+x-ray.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+STAGE_WORKERS = 8
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _default_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by every graph run in the process, created on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(STAGE_WORKERS, thread_name_prefix="stage")
+    return _pool
+
+
+def _timestamp() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+class Stage(NamedTuple):
+    """
+    name: unique stage name
+    fn: called with the inputs as keyword arguments; returns {output: value}
+    inputs: values that must be present for the stage to run
+    outputs: values the stage writes (None means "absent")
+    optional: inputs passed as None instead of skipping the stage
+    step: timeline entry recorded when the stage produced something
+    skipped_step: timeline entry recorded when the stage is skipped
+    defaults: outputs used when the stage is skipped
+    """
+    name: str
+    fn: Callable[..., Dict[str, Any]]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    optional: Tuple[str, ...] = ()
+    step: Optional[str] = None
+    skipped_step: Optional[str] = None
+    defaults: Optional[Dict[str, Any]] = None
+
+
+# on_stage(stage name, "ok" | "skipped" | "error", seconds)
+StageObserver = Callable[[str, str, float], None]
+
+
+class GraphRun(NamedTuple):
+    values: Dict[str, Any]
+    timeline: List[Dict[str, Any]]
+
+
+class StageGraph:
+    """Validated stage DAG; `run()` / `run_async()` execute it for one request."""
+
+    def __init__(self, stages: List[Stage], on_stage: Optional[StageObserver] = None):
+        self.stages = list(stages)
+        self.on_stage = on_stage
+        self._producer: Dict[str, str] = {}
+        names = set()
+        for stage in self.stages:
+            if stage.name in names:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            names.add(stage.name)
+            for output in stage.outputs:
+                if output in self._producer:
+                    raise ValueError(
+                        f"{output!r} is produced by both {self._producer[output]} and {stage.name}"
+                    )
+                self._producer[output] = stage.name
+        self._upstream = {
+            stage.name: {
+                self._producer[value]
+                for value in stage.inputs + stage.optional
+                if value in self._producer
+            }
+            for stage in self.stages
+        }
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        done = set()
+        remaining = {stage.name for stage in self.stages}
+        while remaining:
+            ready = {name for name in remaining if self._upstream[name] <= done}
+            if not ready:
+                raise ValueError(f"Stage graph has a cycle among: {', '.join(sorted(remaining))}")
+            done |= ready
+            remaining -= ready
+
+    def _ready(self, pending: List[Stage], finished: set) -> List[Stage]:
+        return [stage for stage in pending if self._upstream[stage.name] <= finished]
+
+    def _prepare(self, stage: Stage, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Keyword arguments for `stage`, or None if it must be skipped."""
+        if any(values.get(name) is None for name in stage.inputs):
+            return None
+        return {name: values.get(name) for name in stage.inputs + stage.optional}
+
+    def _execute(self, stage: Stage, kwargs: Dict[str, Any]):
+        started_at = _timestamp()
+        start = time.perf_counter()
+        try:
+            outputs = stage.fn(**kwargs) or {}
+        except Exception:
+            if self.on_stage:
+                self.on_stage(stage.name, "error", time.perf_counter() - start)
+            raise
+        seconds = time.perf_counter() - start
+        if self.on_stage:
+            self.on_stage(stage.name, "ok", seconds)
+        return started_at, outputs, _timestamp(), seconds
+
+    def _skip(self, stage: Stage, values: Dict[str, Any], entries: Dict[str, Dict[str, Any]]):
+        values.update(stage.defaults or {})
+        if self.on_stage:
+            self.on_stage(stage.name, "skipped", 0.0)
+        if stage.skipped_step:
+            now = _timestamp()
+            entries[stage.name] = {"step": stage.skipped_step, "started_at": now, "at": now, "duration_ms": 0.0}
+
+    def _finish(self, stage: Stage, result, values: Dict[str, Any], entries: Dict[str, Dict[str, Any]]):
+        started_at, outputs, ended_at, seconds = result
+        values.update(outputs)
+        produced = any(outputs.get(name) is not None for name in stage.outputs)
+        if stage.step and (produced or not stage.outputs):
+            entries[stage.name] = {
+                "step": stage.step,
+                "started_at": started_at,
+                "at": ended_at,
+                "duration_ms": round(seconds * 1000, 3),
+            }
+
+    def _timeline(self, entries: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Declaration order, whatever order concurrent stages finished in
+        return [entries[stage.name] for stage in self.stages if stage.name in entries]
+
+    def run(self, initial: Dict[str, Any], executor: Optional[Executor] = None) -> GraphRun:
+        """Run every stage, parallelizing independent ones on `executor` (default: shared threads)."""
+        executor = executor or _default_executor()
+        values = dict(initial)
+        entries: Dict[str, Dict[str, Any]] = {}
+        pending = list(self.stages)
+        finished: set = set()
+        running = {}
+        try:
+            while pending or running:
+                to_run = []
+                for stage in self._ready(pending, finished):
+                    pending.remove(stage)
+                    kwargs = self._prepare(stage, values)
+                    if kwargs is None:
+                        self._skip(stage, values, entries)
+                        finished.add(stage.name)
+                    else:
+                        to_run.append((stage, kwargs))
+                if not to_run and not running:
+                    continue
+                # The calling thread takes one stage itself instead of idling
+                inline = to_run.pop() if to_run else None
+                for stage, kwargs in to_run:
+                    running[executor.submit(self._execute, stage, kwargs)] = stage
+                if inline is not None:
+                    stage, kwargs = inline
+                    self._finish(stage, self._execute(stage, kwargs), values, entries)
+                    finished.add(stage.name)
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    self._finish(stage, future.result(), values, entries)
+                    finished.add(stage.name)
+        finally:
+            for future in running:
+                future.cancel()
+        return GraphRun(values, self._timeline(entries))
+
+    async def run_async(self, initial: Dict[str, Any], executor: Optional[Executor] = None) -> GraphRun:
+        """Like run(), awaiting stages on `executor` (default: the loop's) so the loop stays free."""
+        loop = asyncio.get_running_loop()
+        values = dict(initial)
+        entries: Dict[str, Dict[str, Any]] = {}
+        pending = list(self.stages)
+        finished: set = set()
+        running = {}
+        try:
+            while pending or running:
+                for stage in self._ready(pending, finished):
+                    pending.remove(stage)
+                    kwargs = self._prepare(stage, values)
+                    if kwargs is None:
+                        self._skip(stage, values, entries)
+                        finished.add(stage.name)
+                    else:
+                        future = loop.run_in_executor(executor, self._execute, stage, kwargs)
+                        running[future] = stage
+                if not running:
+                    continue
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    self._finish(stage, future.result(), values, entries)
+                    finished.add(stage.name)
+        finally:
+            for future in running:
+                future.cancel()
+        return GraphRun(values, self._timeline(entries))
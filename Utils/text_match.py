@@ -0,0 +1,80 @@
+"""Multi-pattern substring search (Aho-Corasick) for scanning free-text notes."""
+
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+
+class SubstringMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of patterns.
+
+    `find(text)` reports which patterns occur anywhere in `text` (overlapping
+    and nested occurrences included, same as `pattern in text` for each one)
+    in a single pass over the text, independent of how many patterns there are.
+    `find_chunks(chunks)` does the same for text that arrives in pieces,
+    matching across piece boundaries without joining them.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        ids: Dict[str, int] = {}
+        for pattern in patterns:
+            if not pattern or pattern in ids:
+                continue
+            ids[pattern] = len(self.patterns)
+            self.patterns.append(pattern)
+            self._insert(pattern, ids[pattern])
+        self._alphabet = frozenset(ch for edges in self._goto for ch in edges)
+        self._link()
+
+    def _insert(self, pattern: str, pattern_id: int):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(pattern_id)
+
+    def _link(self):
+        # Breadth-first so every failure target is finished before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def find(self, text: str) -> Set[int]:
+        """Ids (indexes into `patterns`) of every pattern found in `text`."""
+        return self.find_chunks((text,))
+
+    def find_chunks(self, chunks: Iterable[str]) -> Set[int]:
+        """find() over the concatenation of `chunks`, consuming them one at a time."""
+        goto, fail, out, alphabet = self._goto, self._fail, self._out, self._alphabet
+        found: Set[int] = set()
+        state = 0
+        for text in chunks:
+            # The automaton state carries over, so a match may span chunks
+            for ch in text:
+                if ch not in alphabet:
+                    state = 0
+                    continue
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+                if out[state]:
+                    found.update(out[state])
+        return found
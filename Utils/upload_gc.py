@@ -0,0 +1,197 @@
+"""
+Background garbage collection for the upload directories.
+
+A pass walks the (sharded) upload tree once, then removes:
+  1. files not uploaded again for longer than `max_age_seconds`,
+  2. the least recently uploaded files until the total is within
+     `max_total_bytes`,
+  3. abandoned in-progress copies (TEMP_PREFIX) left by a crash.
+Anything modified within `grace_seconds` is never removed, so a file a
+request is still working on stays put. Passes run on a daemon thread, so
+uploads never wait for them.
+"""
+
+import os
+import threading
+import time
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from .constants import (
+    IMAGES_DIR,
+    PDFS_DIR,
+    UPLOAD_GC_GRACE_SECONDS,
+    UPLOAD_GC_INTERVAL_SECONDS,
+    UPLOAD_MAX_AGE_SECONDS,
+    UPLOAD_MAX_TOTAL_BYTES,
+)
+from .logger import get_logger
+from .metrics import REGISTRY
+from .uploads import TEMP_PREFIX
+
+logger = get_logger(__name__)
+
+REMOVED_FILES = REGISTRY.counter(
+    "upload_gc_removed_files_total", "Upload files removed by the collector, by reason", ("reason",)
+)
+RECLAIMED_BYTES = REGISTRY.counter(
+    "upload_gc_reclaimed_bytes_total", "Bytes of upload storage reclaimed by the collector"
+)
+SCAN_SECONDS = REGISTRY.histogram(
+    "upload_gc_scan_seconds", "Duration of one upload collection pass (walk + removals)",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+
+
+class CollectionReport(NamedTuple):
+    scanned: int
+    removed: int
+    reclaimed_bytes: int
+    remaining_bytes: int
+    seconds: float
+
+
+def _walk_files(root: str) -> Iterable[Tuple[str, str, float, int]]:
+    """(path, name, mtime, size) of every regular file under root."""
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        yield entry.path, entry.name, stat.st_mtime, stat.st_size
+                except FileNotFoundError:
+                    continue  # removed while we were looking
+
+
+class UploadCollector:
+    """Age/size quotas over one or more upload directories."""
+
+    def __init__(
+        self,
+        roots: Iterable[str] = (IMAGES_DIR, PDFS_DIR),
+        max_age_seconds: float = UPLOAD_MAX_AGE_SECONDS,
+        max_total_bytes: int = UPLOAD_MAX_TOTAL_BYTES,
+        grace_seconds: float = UPLOAD_GC_GRACE_SECONDS,
+    ):
+        self.roots = list(roots)
+        self.max_age_seconds = max_age_seconds
+        self.max_total_bytes = max_total_bytes
+        self.grace_seconds = grace_seconds
+        self.last_report: Optional[CollectionReport] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _remove(self, path: str, size: int, reason: str, cutoff: float) -> Optional[int]:
+        """
+        Bytes freed (0 if the file was already gone), or None if it was
+        modified after `cutoff` since the walk saw it: a re-upload refreshes
+        a content-addressed file, and the request that did it uses the path.
+        """
+        try:
+            if os.stat(path).st_mtime > cutoff:
+                return None
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        REMOVED_FILES.inc(reason=reason)
+        RECLAIMED_BYTES.inc(size)
+        return size
+
+    def collect(self, now: Optional[float] = None) -> CollectionReport:
+        """Run one pass synchronously."""
+        start = time.perf_counter()
+        now = time.time() if now is None else now
+        protected_after = now - self.grace_seconds
+        expired_before = now - self.max_age_seconds
+        scanned = removed = reclaimed = 0
+        kept: List[Tuple[float, int, str]] = []
+        kept_bytes = 0
+
+        for root in self.roots:
+            for path, name, mtime, size in _walk_files(root):
+                scanned += 1
+                if mtime > protected_after:
+                    kept_bytes += size  # counts toward the quota, but untouchable
+                    continue
+                reason, cutoff = (
+                    ("abandoned", protected_after) if name.startswith(TEMP_PREFIX)
+                    else ("expired", expired_before) if mtime < expired_before
+                    else (None, None)
+                )
+                if reason:
+                    freed = self._remove(path, size, reason, cutoff)
+                    if freed is None:
+                        kept_bytes += size  # uploaded again during the pass
+                    else:
+                        reclaimed += freed
+                        removed += bool(freed)
+                else:
+                    kept.append((mtime, size, path))
+                    kept_bytes += size
+
+        if kept_bytes > self.max_total_bytes:
+            kept.sort()  # least recently uploaded first
+            for mtime, size, path in kept:
+                if kept_bytes <= self.max_total_bytes:
+                    break
+                freed = self._remove(path, size, "quota", protected_after)
+                if freed is None:
+                    continue  # uploaded again during the pass: now the most recent
+                kept_bytes -= size
+                reclaimed += freed
+                removed += bool(freed)
+
+        seconds = time.perf_counter() - start
+        SCAN_SECONDS.observe(seconds)
+        report = CollectionReport(scanned, removed, reclaimed, kept_bytes, seconds)
+        self.last_report = report
+        if removed:
+            logger.info(
+                "Upload GC removed %d of %d files (%d bytes) in %.2fs; %d bytes remain",
+                removed, scanned, reclaimed, seconds, kept_bytes,
+            )
+        return report
+
+    def start(self, interval_seconds: float = UPLOAD_GC_INTERVAL_SECONDS) -> None:
+        """Collect every `interval_seconds` in a daemon thread; no-op if already running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            while True:
+                try:
+                    self.collect()
+                except Exception:
+                    logger.exception("Upload GC pass failed")
+                if self._stop.wait(interval_seconds):
+                    return
+
+        self._thread = threading.Thread(target=_run, name="upload-gc", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_collector = UploadCollector()
+
+
+def start_upload_gc(interval_seconds: float = UPLOAD_GC_INTERVAL_SECONDS) -> UploadCollector:
+    """Start collecting the default upload directories in the background."""
+    _collector.start(interval_seconds)
+    return _collector
+
+
+def stop_upload_gc() -> None:
+    _collector.stop()
@@ -0,0 +1,118 @@
+"""Streaming upload persistence: type sniffing, size caps and hashing in one pass."""
+
+import hashlib
+import os
+import tempfile
+from typing import Iterable, NamedTuple, Optional
+
+from .constants import UPLOAD_CHUNK_BYTES
+
+# The PDF header may follow a little junk; the spec allows it anywhere
+# in the first 1024 bytes
+SNIFF_BYTES = 1024
+
+EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "pdf": ".pdf"}
+
+# Prefix for in-progress copies; the collector removes abandoned ones
+TEMP_PREFIX = ".upload-"
+
+
+class UploadRejected(Exception):
+    """Upload has a disallowed type or exceeds its size cap."""
+
+
+class SavedUpload(NamedTuple):
+    path: str
+    kind: str  # "png" | "jpeg" | "pdf"
+    size: int
+    sha256: str
+    reused: bool  # identical content was already stored; nothing new written
+
+
+def sniff_type(head: bytes) -> Optional[str]:
+    """File kind from its leading bytes, or None if it isn't one we accept."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if b"%PDF-" in head[:SNIFF_BYTES]:
+        return "pdf"
+    return None
+
+
+def shard_dir(target_dir: str, sha256: str) -> str:
+    """<target_dir>/ab/cd for hash abcd...: 65,536 leaf directories, so none grows huge."""
+    return os.path.join(target_dir, sha256[:2], sha256[2:4])
+
+
+def _read_head(stream, size: int) -> bytes:
+    """Up to `size` bytes; streams may return short reads before EOF."""
+    parts = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        parts.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(parts)
+
+
+def save_upload_stream(
+    upload_file,
+    target_dir: str,
+    prefix: str,
+    allowed: Iterable[str],
+    max_bytes: int,
+    label: str = "file",
+    chunk_size: int = UPLOAD_CHUNK_BYTES,
+) -> SavedUpload:
+    """
+    Copy `upload_file` to `shard_dir(target_dir, sha256)` as
+    `<prefix>_<sha256><extension>` chunk by chunk, so memory use is one chunk whatever the file size. The
+    type is checked from the first bytes before anything is written, the
+    size cap is enforced while copying, and the SHA-256 is computed on the
+    way. The name is content-addressed: uploading the same bytes again
+    keeps the existing file and drops the new copy. A rejected or failed
+    upload leaves no file behind.
+    """
+    head = _read_head(upload_file, SNIFF_BYTES)
+    kind = sniff_type(head)
+    if kind not in allowed:
+        raise UploadRejected(f"Invalid {label} file type")
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, prefix=TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(f"{label[0].upper() + label[1:]} file is larger than the {max_bytes:,} byte limit")
+                digest.update(chunk)
+                out.write(chunk)
+                chunk = upload_file.read(chunk_size)
+        sha256 = digest.hexdigest()
+        directory = shard_dir(target_dir, sha256)
+        path = os.path.join(directory, f"{prefix}_{sha256}{EXTENSIONS[kind]}")
+        reused = False
+        if os.path.exists(path):
+            try:
+                # Fresh mtime: the collector ages files by last upload, not first
+                os.utime(path)
+                reused = True
+            except FileNotFoundError:
+                pass  # collected just now; store this copy instead
+        if reused:
+            os.remove(tmp_path)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            # Atomic: a concurrent upload of the same bytes renames identical content
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return SavedUpload(path.replace("\\", "/"), kind, size, sha256, reused)
@@ -0,0 +1,189 @@
+"""CPU-only x-ray classifier: decode, downsample, NumPy features, small MLP.
+
+    images = np.stack([load_image(path) for path in paths])   # (N, S, S)
+    probs = get_xray_model().predict(images)                  # (N, labels)
+
+`ImagingAgent.analyze_batch` runs the same steps as a pipeline: worker
+processes read and decode, the caller runs inference in fixed-size batches.
+
+Decoding uses Pillow (optional; `pip install Pillow`). JPEGs are decoded
+with `draft()`, which scales down inside the DCT, so a full-size x-ray is
+never materialized. Features are computed for the whole batch at once, and
+the model is a one-hidden-layer MLP whose weights are .npy files
+memory-mapped from `IMAGING_MODEL_DIR`, so every process shares one copy
+through the OS page cache.
+
+`python -m Utils.xray_model` writes *demo* weights drawn from a seeded RNG.
+They exercise the pipeline end to end but are NOT clinically trained; a
+trained model only has to ship the same files (see `write_demo_weights`).
+"""
+
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .constants import IMAGING_INPUT_SIZE, IMAGING_MODEL_DIR
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+LABELS = ("pneumonia", "normal", "covid_suspect")
+GRID = 8  # feature grid: GRID x GRID regional means
+HIST_BINS = 16
+# regional means + intensity histogram + (mean, std, grad x, grad y, asymmetry)
+FEATURE_COUNT = GRID * GRID + HIST_BINS + 5
+TENSORS = ("feature_mean", "feature_scale", "w1", "b1", "w2", "b2")
+
+
+def decode_image(source, size: int = IMAGING_INPUT_SIZE) -> np.ndarray:
+    """
+    Grayscale (size, size) uint8 array from a path or binary file object.
+    Raises OSError/ValueError for anything it can't decode, including an
+    image whose header claims more pixels than Pillow's decompression-bomb
+    limit (Image.MAX_IMAGE_PIXELS).
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("Pillow is required to decode images (pip install Pillow)") from None
+    try:
+        with Image.open(source) as img:
+            # JPEG: decode at the smallest 1/2, 1/4 or 1/8 scale still >= size
+            img.draft("L", (size, size))
+            img = img.convert("L").resize((size, size), Image.Resampling.BILINEAR, reducing_gap=2.0)
+            return np.asarray(img, dtype=np.uint8)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as exc:
+        # Neither is an OSError/ValueError (the warning is raised when warnings are errors)
+        raise ValueError(f"Image too large to decode: {exc}") from exc
+
+
+def load_image(path: str, size: int = IMAGING_INPUT_SIZE) -> np.ndarray:
+    """Grayscale (size, size) float32 array in [0, 1]."""
+    return decode_image(path, size).astype(np.float32) / 255.0
+
+
+def extract_features(images: np.ndarray) -> np.ndarray:
+    """(N, S, S) images in [0, 1] -> (N, FEATURE_COUNT) float32, vectorized over the batch."""
+    images = np.asarray(images, dtype=np.float32)
+    n, size = images.shape[0], images.shape[1]
+    if images.shape[1:] != (size, size) or size % GRID:
+        raise ValueError(f"Expected (N, S, S) images with S a multiple of {GRID}, got {images.shape}")
+    flat = images.reshape(n, -1)
+    mean = flat.mean(axis=1)
+    std = flat.std(axis=1)
+    standardized = (images - mean[:, None, None]) / (std[:, None, None] + 1e-6)
+
+    cell = size // GRID
+    regions = standardized.reshape(n, GRID, cell, GRID, cell).mean(axis=(2, 4)).reshape(n, -1)
+
+    # One bincount for the whole batch: image i's bins are offset by i * HIST_BINS
+    bins = np.minimum((flat * HIST_BINS).astype(np.intp), HIST_BINS - 1)
+    bins += np.arange(n, dtype=np.intp)[:, None] * HIST_BINS
+    hist = np.bincount(bins.ravel(), minlength=n * HIST_BINS).reshape(n, HIST_BINS) / flat.shape[1]
+
+    grad_x = np.abs(np.diff(standardized, axis=2)).mean(axis=(1, 2))
+    grad_y = np.abs(np.diff(standardized, axis=1)).mean(axis=(1, 2))
+    asymmetry = np.abs(standardized - standardized[:, :, ::-1]).mean(axis=(1, 2))
+
+    scalars = np.stack([mean, std, grad_x, grad_y, asymmetry], axis=1)
+    return np.concatenate([regions, hist, scalars], axis=1).astype(np.float32)
+
+
+class XrayModel:
+    """MLP over extract_features(); tensors are memory-mapped, read-only."""
+
+    def __init__(self, model_dir: str = IMAGING_MODEL_DIR):
+        try:
+            with open(os.path.join(model_dir, MANIFEST_FILE), encoding="utf-8") as fh:
+                manifest = json.load(fh)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"No x-ray model in {model_dir} (python -m Utils.xray_model writes demo weights)"
+            ) from None
+        if manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported x-ray model format in {model_dir}: {manifest.get('format')}")
+        self.model_dir = model_dir
+        self.version = manifest["version"]
+        self.labels = tuple(manifest["labels"])
+        self.input_size = manifest["input_size"]
+        self.trained = manifest.get("trained", False)
+        for name in TENSORS:
+            setattr(self, name, np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode="r"))
+        if self.w1.shape[0] != FEATURE_COUNT or self.w2.shape[1] != len(self.labels):
+            raise ValueError(f"x-ray model in {model_dir} does not match {FEATURE_COUNT} features")
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        """(N, S, S) images -> (N, labels) probabilities."""
+        x = (extract_features(images) - self.feature_mean) / self.feature_scale
+        hidden = np.maximum(x @ self.w1 + self.b1, 0.0)
+        logits = hidden @ self.w2 + self.b2
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def write_demo_weights(
+    model_dir: str = IMAGING_MODEL_DIR,
+    seed: int = 0,
+    hidden: int = 32,
+    input_size: int = IMAGING_INPUT_SIZE,
+    labels: Sequence[str] = LABELS,
+) -> Dict[str, object]:
+    """
+    Write seeded random weights (NOT clinically trained) and return the
+    manifest. The directory is replaced as a whole, so a process loading
+    the model never sees half a set of files.
+    """
+    rng = np.random.default_rng(seed)
+    tensors = {
+        "feature_mean": np.zeros(FEATURE_COUNT, dtype=np.float32),
+        "feature_scale": np.ones(FEATURE_COUNT, dtype=np.float32),
+        "w1": (rng.standard_normal((FEATURE_COUNT, hidden)) / np.sqrt(FEATURE_COUNT)).astype(np.float32),
+        "b1": np.zeros(hidden, dtype=np.float32),
+        "w2": (rng.standard_normal((hidden, len(labels))) / np.sqrt(hidden)).astype(np.float32),
+        "b2": np.zeros(len(labels), dtype=np.float32),
+    }
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": f"demo-seed{seed}",
+        "labels": list(labels),
+        "input_size": input_size,
+        "trained": False,
+    }
+    tmp_dir = f"{model_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in tensors.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+    shutil.rmtree(model_dir, ignore_errors=True)
+    os.replace(tmp_dir, model_dir)
+    return manifest
+
+
+_models: Dict[str, XrayModel] = {}
+_models_lock = threading.Lock()
+
+
+def get_xray_model(model_dir: Optional[str] = None) -> XrayModel:
+    """Model loaded once per directory per process."""
+    model_dir = os.path.abspath(model_dir or IMAGING_MODEL_DIR)
+    model = _models.get(model_dir)
+    if model is None:
+        with _models_lock:
+            model = _models.get(model_dir)
+            if model is None:
+                model = _models[model_dir] = XrayModel(model_dir)
+    return model
+
+
+if __name__ == "__main__":
+    manifest = write_demo_weights()
+    logger.info("Wrote %s x-ray model weights to %s", manifest["version"], IMAGING_MODEL_DIR)
@@ -7,6 +7,9 @@ import streamlit as st
 from Agents.coordinator import Orchestrator
 from Utils.logger import get_logger
 from Utils.lookups import get_sku_to_drug_name_map, get_pharmacy_id_to_name_map
+from Utils.inventory_store import OutOfStockError
+from Utils.snapshot import start_data_watcher
+from Utils.upload_gc import start_upload_gc
 
 logger = get_logger(__name__)
 
@@ -41,7 +44,29 @@ st.markdown("### 🩺 Healthcare Assistant")
 st.warning("⚠️ **This is an educational demo, NOT medical advice. Always consult a healthcare professional for medical concerns.**")
 
 
-coordinator = Orchestrator()
+# Bump to rebuild the shared agents on the next rerun of every session
+# (e.g. after changing agent configuration on a running server)
+AGENTS_VERSION = 1
+
+
+@st.cache_resource(show_spinner="Loading agents and data...")
+def get_coordinator(version: int = AGENTS_VERSION) -> Orchestrator:
+    """
+    One warm Orchestrator per server process, shared by every session and
+    rerun. The first script run builds it (agents, datasets, indexes);
+    later reruns only render the UI. get_coordinator.clear() drops it.
+    """
+    # Pick up edits to Data/ without restarting the server
+    start_data_watcher()
+    # Keep tmp/images and tmp/pdfs within their age/size quotas
+    start_upload_gc()
+    logger.info("Warming agents (version %s)", version)
+    return Orchestrator().warm_up()
+
+
+coordinator = get_coordinator()
+# Memoized per data snapshot, so these are dict lookups after the first run
+# and follow hot-reloaded CSVs without touching the cached agents
 sku_to_name = get_sku_to_drug_name_map()
 pharmacy_id_to_name = get_pharmacy_id_to_name_map()
 
@@ -55,6 +80,10 @@ with st.sidebar:
         "Known Allergies (Optional)",
         placeholder="e.g., penicillin, aspirin"
     )
+    current_medications = st.text_input(
+        "Current Medications (Optional)",
+        placeholder="e.g., aspirin, metformin"
+    )
 
     st.markdown("#### Symptoms & Reports")
     symptoms = st.text_area(
@@ -94,6 +123,7 @@ if st.button("Get Recommendations", type="primary"):
             pdf_file=uploaded_pdf,
             allergies=allergies,
             pincode=pincode,
+            current_medications=current_medications,
         )
         st.session_state["latest_result"] = final_result
         st.session_state["order_confirmation"] = None
@@ -153,14 +183,28 @@ else:
                 st.warning(flag)
 
         st.markdown("#### 🏥 Pharmacy & Delivery")
-        if "pharmacy_id" in pharmacy_result:
-            pharmacy_name = pharmacy_id_to_name.get(
-                pharmacy_result["pharmacy_id"],
-                pharmacy_result["pharmacy_id"]
-            )
-            st.write(f"**Pharmacy:** {pharmacy_name}")
-            st.write(f"**Estimated Delivery:** {pharmacy_result['eta_min']} minutes")
-            st.write(f"**Delivery Fee:** ₹{pharmacy_result['delivery_fee']}")
+        if "pharmacy_id" in pharmacy_result or "shipments" in pharmacy_result:
+            # Split baskets list one shipment per pharmacy
+            for shipment in pharmacy_result.get("shipments") or [pharmacy_result]:
+                pharmacy_name = pharmacy_id_to_name.get(
+                    shipment["pharmacy_id"],
+                    shipment["pharmacy_id"]
+                )
+                st.write(f"**Pharmacy:** {pharmacy_name}")
+                if "shipments" in pharmacy_result:
+                    st.write(
+                        "  • " + ", ".join(
+                            sku_to_name.get(i["sku"], i["drug_name"]) for i in shipment["items"]
+                        )
+                    )
+                st.write(f"**Estimated Delivery:** {shipment['eta_min']} minutes")
+                st.write(f"**Delivery Fee:** ₹{shipment['delivery_fee']}")
+            if pharmacy_result.get("unfulfilled_skus"):
+                st.warning(
+                    "Not available for delivery nearby: " + ", ".join(
+                        sku_to_name.get(sku, sku) for sku in pharmacy_result["unfulfilled_skus"]
+                    )
+                )
             if order_preview:
                 st.markdown("##### Order Preview")
                 subtotal = order_preview.get("subtotal", 0)
@@ -169,14 +213,17 @@ else:
                 st.write(f"• Delivery fee: ₹{delivery_fee:.2f}")
                 st.write(f"• Estimated total: ₹{subtotal + delivery_fee:.2f}")
                 if st.button("Place mock order", key="place_mock_order"):
-                    st.session_state["order_confirmation"] = coordinator.finalize_order(order_preview)
+                    try:
+                        st.session_state["order_confirmation"] = coordinator.finalize_order(order_preview)
+                    except OutOfStockError as e:
+                        st.error(f"Could not place order: {e}")
                 order_confirmation = st.session_state.get("order_confirmation")
                 if order_confirmation:
                     st.markdown("#### 🧾 Order Confirmation")
                     conf = order_confirmation
-                    conf_pharmacy_name = pharmacy_id_to_name.get(
-                        conf.get("pharmacy_id", ""),
-                        conf.get("pharmacy_id", ""),
+                    conf_pharmacy_name = ", ".join(
+                        pharmacy_id_to_name.get(ship.get("pharmacy_id", ""), ship.get("pharmacy_id", ""))
+                        for ship in conf.get("shipments") or [conf]
                     )
 
                     st.write(f"**Order ID:** {conf.get('order_id', '-')}")
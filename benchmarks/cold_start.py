@@ -0,0 +1,87 @@
+"""
+Benchmark: cold-start cost of the agents package.
+
+Each measurement runs in a fresh interpreter so nothing is already imported
+or loaded:
+  - import time per target, with the slowest modules from `-X importtime`
+  - Orchestrator() construction and the first run_flow() call, for notes
+    that match no OTC medicine (pharmacy matching never runs) and for notes
+    that produce an OTC basket
+
+Usage:
+    python benchmarks/cold_start.py [top_n]
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+IMPORT_TARGETS = ["Utils", "Agents.coordinator", "Agents.therapy", "Agents.pharmacy_match"]
+
+FIRST_REQUEST = r"""
+import json, sys, time
+start = time.perf_counter()
+from Agents.coordinator import Orchestrator
+from Utils.snapshot import current_snapshot
+imported = time.perf_counter()
+orchestrator = Orchestrator()
+built = time.perf_counter()
+orchestrator.run_flow(name="Cold Start", phone="9876543210", age=30, notes=sys.argv[1])
+first = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "construct_ms": (built - imported) * 1000,
+    "first_run_flow_ms": (first - built) * 1000,
+    "datasets_loaded": current_snapshot().loaded(),
+    "pandas_imported": "pandas" in sys.modules,
+    "numpy_imported": "numpy" in sys.modules,
+}))
+"""
+
+CASES = {
+    "no otc match": "mild rash on the arm",
+    "otc basket": "fever and headache",
+}
+
+
+def _run(args):
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, cwd=os.getcwd(), check=True
+    )
+
+
+def import_breakdown(target: str):
+    """Parse `-X importtime` into (total_us, [(cumulative_us, self_us, module)])."""
+    stderr = _run(["-X", "importtime", "-c", f"import {target}"]).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.strip()))
+    total = next((cum for cum, _, mod in rows if mod == target), 0)
+    return total, rows
+
+
+def main(top_n: int = 8):
+    for target in IMPORT_TARGETS:
+        total, rows = import_breakdown(target)
+        print(f"import {target}: {total / 1000:.1f} ms")
+        for cumulative, self_us, module in sorted(rows, reverse=True)[1:top_n + 1]:
+            print(f"    {cumulative / 1000:8.1f} ms cumulative {self_us / 1000:8.1f} ms self  {module}")
+        print()
+
+    for label, notes in CASES.items():
+        result = json.loads(_run(["-c", FIRST_REQUEST, notes]).stdout.strip().splitlines()[-1])
+        print(f"first request ({label}):")
+        print(f"    import Agents.coordinator {result['import_ms']:9.1f} ms")
+        print(f"    Orchestrator()            {result['construct_ms']:9.1f} ms")
+        print(f"    first run_flow()          {result['first_run_flow_ms']:9.1f} ms")
+        print(f"    datasets loaded:          {', '.join(result['datasets_loaded']) or '-'}")
+        print(f"    pandas / numpy imported:  {result['pandas_imported']} / {result['numpy_imported']}")
+        print()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
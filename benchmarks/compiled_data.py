@@ -0,0 +1,59 @@
+"""
+Benchmark: CSV parsing vs the memory-mapped compiled snapshot for a large
+synthetic inventory.
+
+Usage:
+    python benchmarks/compiled_data.py [rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.getcwd())
+
+from Utils import compiled_data
+
+
+def main(rows: int = 2_000_000):
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "inventory.csv")
+        pd.DataFrame({
+            "pharmacy_id": [f"ph{i:05d}" for i in rng.integers(0, 20_000, rows)],
+            "sku": [f"SKU{i:04d}" for i in rng.integers(0, 5_000, rows)],
+            "drug_name": [f"Drug {i}" for i in rng.integers(0, 5_000, rows)],
+            "form": rng.choice(["Tablet", "Capsule", "Syrup", "Gel"], rows),
+            "strength": rng.choice(["10mg", "250mg", "500mg"], rows),
+            "price": rng.integers(5, 500, rows),
+            "qty": rng.integers(0, 200, rows),
+        }).to_csv(source, index=False)
+
+        compiled_data.SOURCES = {"inventory": (source, "frame")}
+        out = os.path.join(tmp, "compiled")
+
+        start = time.perf_counter()
+        csv_df = pd.read_csv(source)
+        csv_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compiled_data.compile_data(out)
+        compile_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mmap_df = compiled_data.load_compiled("inventory", source, out)
+        mmap_s = time.perf_counter() - start
+
+        assert len(mmap_df) == len(csv_df)
+        print(f"rows:             {rows:,}")
+        print(f"pd.read_csv:      {csv_s * 1000:9.1f} ms")
+        print(f"compile (once):   {compile_s * 1000:9.1f} ms")
+        print(f"mmap load:        {mmap_s * 1000:9.1f} ms  ({csv_s / mmap_s:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
@@ -0,0 +1,101 @@
+"""
+Benchmark: NumPy x-ray classifier (Utils.xray_model) on synthetic images.
+
+Writes demo weights and 1024x1024 synthetic "x-rays" (JPEG and PNG) to a
+temporary directory, then reports per-image latency of the ImagingAgent
+numpy backend (decode + features + MLP, cache disabled), the inference
+cost per image at a few batch sizes, and analyze_batch throughput against
+an analyze() loop at 1..cpu_count workers. Needs Pillow.
+
+Usage:
+    python benchmarks/imaging_infer.py [images] [max workers]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from Agents.imaging import ImagingAgent, NumpyBackend
+from Utils.result_cache import ResultCache
+from Utils.xray_model import get_xray_model, write_demo_weights
+
+
+def _synthetic_xray(rng, size: int = 1024) -> np.ndarray:
+    """Dark lung fields in a bright chest outline, plus a few opacities and noise."""
+    y, x = np.mgrid[-1:1:size * 1j, -1:1:size * 1j]
+    chest = np.exp(-(x ** 2 / 0.8 + y ** 2 / 1.2) ** 4)
+    lungs = sum(np.exp(-(((x - cx) / 0.28) ** 2 + ((y + 0.05) / 0.55) ** 2) ** 2) for cx in (-0.4, 0.4))
+    image = 0.75 * chest - 0.5 * lungs
+    for _ in range(rng.integers(0, 4)):
+        cx, cy, r = rng.uniform(-0.6, 0.6), rng.uniform(-0.5, 0.5), rng.uniform(0.05, 0.2)
+        image += 0.3 * np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / r ** 2)
+    image += rng.normal(0, 0.03, image.shape)
+    return (np.clip(image, 0, 1) * 255).astype(np.uint8)
+
+
+def _percentile_ms(samples, q):
+    return np.percentile(samples, q) * 1000
+
+
+def main(n: int = 200, max_workers: int = 0):
+    from PIL import Image
+
+    logging.getLogger().setLevel(logging.WARNING)
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = os.path.join(tmp, "model")
+        write_demo_weights(model_dir)
+        backend = NumpyBackend(model_dir)
+        model = get_xray_model(model_dir)
+
+        paths = []
+        for i in range(n):
+            ext = "jpeg" if i % 2 == 0 else "png"
+            path = os.path.join(tmp, f"xray_{i}.{ext}")
+            Image.fromarray(_synthetic_xray(rng)).save(path)
+            paths.append(path)
+
+        backend.classify(paths[0], None)  # page in the weights
+        for ext in ("jpeg", "png"):
+            latencies = []
+            for path in paths:
+                if path.endswith(ext):
+                    start = time.perf_counter()
+                    backend.classify(path, None)
+                    latencies.append(time.perf_counter() - start)
+            print(f"{ext:5} 1024x1024 per image: p50 {_percentile_ms(latencies, 50):6.2f} ms"
+                  f"  p95 {_percentile_ms(latencies, 95):6.2f} ms  ({len(latencies)} images)")
+
+        images = np.stack([backend.load(path) for path in paths])
+        for batch in (1, 8, 32, 128):
+            start = time.perf_counter()
+            for i in range(0, n, batch):
+                model.predict(images[i:i + batch])
+            per_image = (time.perf_counter() - start) / n
+            print(f"inference only, batch {batch:4}: {per_image * 1e6:8.1f} us/image")
+
+        # Fresh caches each run, so every image is decoded and classified
+        start = time.perf_counter()
+        agent = ImagingAgent(cache=ResultCache(n), backend=backend)
+        expected = {path: agent.analyze(path) for path in paths}
+        loop_s = time.perf_counter() - start
+        print(f"analyze() loop:             {n / loop_s:8.1f} images/s")
+        workers = 1
+        while workers <= (max_workers or os.cpu_count() or 1):
+            agent = ImagingAgent(cache=ResultCache(n), backend=backend)
+            start = time.perf_counter()
+            results = dict(agent.analyze_batch(paths, workers=workers))
+            batch_s = time.perf_counter() - start
+            assert results == expected
+            print(f"analyze_batch(workers={workers:2}):  {n / batch_s:8.1f} images/s  (incl. pool start-up)")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,68 @@
+"""
+Benchmark: screening k recommended drugs against each other and against m
+current medications, over a large synthetic interactions table.
+
+Usage:
+    python benchmarks/interaction_screen.py [pairs] [k] [m]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.getcwd())
+
+from Utils.interaction_index import InteractionIndex
+
+
+def _dataframe_screen(interactions: pd.DataFrame, drugs: list, current: list) -> int:
+    hits = 0
+    pairs = [(a, b) for i, a in enumerate(drugs) for b in drugs[i + 1:]]
+    pairs += [(a, b) for a in drugs for b in current]
+    for drug_a, drug_b in pairs:
+        match = interactions[((interactions.drug_a == drug_a) & (interactions.drug_b == drug_b)) |
+                             ((interactions.drug_a == drug_b) & (interactions.drug_b == drug_a))]
+        hits += not match.empty
+    return hits
+
+
+def main(n_pairs: int = 500_000, k: int = 5, m: int = 10, repeats: int = 10_000):
+    rng = np.random.default_rng(0)
+    names = np.array([f"Drug{i:05d}" for i in range(50_000)])
+    interactions = pd.DataFrame({
+        "drug_a": names[rng.integers(0, len(names), n_pairs)],
+        "drug_b": names[rng.integers(0, len(names), n_pairs)],
+        "level": rng.choice(["High", "Moderate", "Low"], n_pairs),
+        "note": "synthetic",
+    })
+    # Make sure the screened drugs actually interact with something
+    drugs = interactions.drug_a[:k].tolist()
+    current = interactions.drug_b[:m].tolist()
+
+    start = time.perf_counter()
+    expected = _dataframe_screen(interactions, drugs, current)
+    frame_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = InteractionIndex.from_frame(interactions)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        found = index.screen(drugs, current)
+    screen_s = (time.perf_counter() - start) / repeats
+
+    assert len(found) == expected
+    print(f"interaction pairs:  {n_pairs:,}")
+    print(f"screened:           {k} new x {k} new + {k} new x {m} current, {expected} hits")
+    print(f"DataFrame filters:  {frame_s * 1000:9.1f} ms per screen")
+    print(f"index build:        {build_s * 1000:9.1f} ms (once per interactions.csv version)")
+    print(f"index screen:       {screen_s * 1e6:9.1f} us per screen  ({frame_s / screen_s:,.0f}x faster)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    main(*args)
@@ -0,0 +1,90 @@
+"""
+Benchmark: PharmacyAgent.find_matches in a loop vs find_matches_batch, over
+a synthetic network of pharmacies around Mumbai. Results are asserted equal.
+
+Usage:
+    python benchmarks/pharmacy_batch.py [pharmacies] [skus per pharmacy] [requests]
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.getcwd())
+
+from Agents.pharmacy_match import PharmacyAgent
+from Utils.data_loader import read_inventory, read_pharmacies
+from Utils.snapshot import SnapshotManager
+
+
+def _write_network(tmp: str, n_pharmacies: int, per_pharmacy: int, n_skus: int, rng) -> SnapshotManager:
+    pharmacies = [
+        {
+            "id": f"ph{i:06d}",
+            "Name": f"Pharmacy {i}",
+            "lat": float(19.0 + rng.random() * 0.3),
+            "lon": float(72.75 + rng.random() * 0.2),
+            "delivery_km": int(rng.integers(2, 8)),
+        }
+        for i in range(n_pharmacies)
+    ]
+    pharmacies_path = os.path.join(tmp, "pharmacies.json")
+    with open(pharmacies_path, "w", encoding="utf-8") as fh:
+        json.dump(pharmacies, fh)
+
+    skus = np.array([f"SKU{i:04d}" for i in range(n_skus)])
+    stocked = np.concatenate([rng.choice(n_skus, per_pharmacy, replace=False) for _ in range(n_pharmacies)])
+    inventory = pd.DataFrame({
+        "pharmacy_id": np.repeat([ph["id"] for ph in pharmacies], per_pharmacy),
+        "sku": skus[stocked],
+        "drug_name": "Drug",
+        "form": "Tablet",
+        "strength": "10mg",
+        "price": rng.integers(10, 200, len(stocked)),
+        "qty": rng.integers(0, 50, len(stocked)),
+    })
+    inventory_path = os.path.join(tmp, "inventory.csv")
+    inventory.to_csv(inventory_path, index=False)
+    return SnapshotManager({
+        "pharmacies": (pharmacies_path, read_pharmacies),
+        "inventory": (inventory_path, read_inventory),
+    })
+
+
+def main(n_pharmacies: int = 20_000, per_pharmacy: int = 50, n_requests: int = 500):
+    logging.getLogger().setLevel(logging.WARNING)
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = _write_network(tmp, n_pharmacies, per_pharmacy, 500, rng).current()
+        skus = [f"SKU{i:04d}" for i in range(500)]
+        requests = [
+            (list(rng.choice(skus, rng.integers(1, 5), replace=False)),
+             float(19.0 + rng.random() * 0.3), float(72.75 + rng.random() * 0.2))
+            for _ in range(n_requests)
+        ]
+        agent = PharmacyAgent()
+        agent.find_matches_batch(requests[:5], snapshot=snapshot)  # build the network and store once
+
+        for mode in ("single", "split"):
+            start = time.perf_counter()
+            expected = [agent.find_matches(s, lat, lon, fulfilment=mode, snapshot=snapshot) for s, lat, lon in requests]
+            loop_s = time.perf_counter() - start
+            print(f"{mode:6} find_matches() loop:          {loop_s * 1000:8.1f} ms")
+
+            # The first batch also builds the per-SKU posting arrays, which
+            # later batches against the same data snapshot reuse
+            for label in ("first", "repeat"):
+                start = time.perf_counter()
+                batch = agent.find_matches_batch(requests, fulfilment=mode, snapshot=snapshot)
+                batch_s = time.perf_counter() - start
+                assert batch == expected
+                print(f"{mode:6} find_matches_batch() {label:6}: {batch_s * 1000:8.1f} ms  ({loop_s / batch_s:.1f}x faster)")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,49 @@
+"""
+Benchmark: Orchestrator.run_flow_many throughput (cases/s) as workers grow,
+on synthetic symptom-only cases against the datasets in Data/.
+
+Usage:
+    python benchmarks/run_flow_many.py [cases] [max_workers]
+"""
+
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+from Agents.coordinator import Orchestrator
+
+NOTES = ["fever and headache", "dry cough", "acid reflux after meals", "itching rashes", "diarrhea"]
+
+
+def _cases(n: int):
+    for i in range(n):
+        yield {
+            "name": f"Bench {i}",
+            "phone": "9998887776",
+            "age": 20 + i % 60,
+            "notes": NOTES[i % len(NOTES)],
+            "pincode": "400050",
+        }
+
+
+def main(n: int = 2000, max_workers: int = os.cpu_count() or 1):
+    logging.getLogger().setLevel(logging.WARNING)
+    workers = 1
+    baseline = None
+    while workers <= max_workers:
+        start = time.perf_counter()
+        results = list(Orchestrator.run_flow_many(_cases(n), workers=workers, chunk_size=32))
+        elapsed = time.perf_counter() - start
+        assert all(r["ok"] for r in results)
+        rate = n / elapsed
+        baseline = baseline or rate
+        print(f"workers={workers:<3} {rate:8.1f} cases/s  ({rate / baseline:.1f}x)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
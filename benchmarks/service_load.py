@@ -0,0 +1,109 @@
+"""
+Load test for Agents.service: concurrent clients hitting POST /run_flow,
+reporting requests/s and latency percentiles.
+
+Starts an in-process service unless --url points at a running one.
+
+Usage:
+    python benchmarks/service_load.py [--requests 500] [--concurrency 8]
+                                      [--pool-size 4] [--image Testcases/XRAY.jpeg]
+                                      [--url http://127.0.0.1:8080]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.getcwd())
+
+from Agents.coordinator import Orchestrator
+from Agents.ingestion import IngestionAgent
+from Agents.service import OrchestratorPool, TriageHTTPServer, encode_multipart
+
+NOTES = ["fever and headache", "dry cough", "acid reflux after meals", "itching rashes", "diarrhea"]
+
+
+def _request(url: str, i: int, image: bytes | None) -> urllib.request.Request:
+    fields = {"name": f"Load {i}", "phone": "9998887776", "age": 20 + i % 60, "notes": NOTES[i % len(NOTES)]}
+    if image is None:
+        return urllib.request.Request(
+            f"{url}/run_flow", data=json.dumps(fields).encode(), headers={"Content-Type": "application/json"}
+        )
+    content_type, body = encode_multipart(fields, {"image_file": ("xray.jpeg", image)})
+    return urllib.request.Request(f"{url}/run_flow", data=body, headers={"Content-Type": content_type})
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--image", default=None, help="send this x-ray with every request (multipart)")
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    server = None
+    url = args.url
+    if url is None:
+        # Keep the benchmark's uploads out of the app's upload directory
+        upload_dir = tempfile.mkdtemp(prefix="service_load_")
+
+        def factory():
+            orchestrator = Orchestrator()
+            orchestrator.ingestion = IngestionAgent(upload_dir=upload_dir)
+            return orchestrator
+
+        server = TriageHTTPServer(("127.0.0.1", 0), OrchestratorPool(args.pool_size, factory=factory))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+    image = open(args.image, "rb").read() if args.image else None
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(_request(url, i, image)) as response:
+                response.read()
+            ok = True
+        except urllib.error.URLError:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += not ok
+
+    one(0)  # first request outside the timing
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as clients:
+        list(clients.map(one, range(1, args.requests + 1)))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(latencies[1:])
+    print(f"requests: {args.requests}  concurrency: {args.concurrency}  errors: {errors}")
+    print(f"throughput: {args.requests / wall:8.1f} req/s")
+    for q in (0.5, 0.95, 0.99):
+        print(f"p{int(q * 100):<3} {_percentile(latencies, q) * 1000:8.1f} ms")
+    print(f"max  {latencies[-1] * 1000:8.1f} ms")
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: TherapyAgent.recommend in a loop vs recommend_batch over many
+synthetic patients, on the formulary in Data/.
+
+Usage:
+    python benchmarks/therapy_batch.py [patients] [repeat]
+"""
+
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from Agents.therapy import TherapyAgent
+
+SYMPTOMS = ["fever", "pain", "cough", "itching", "diarrhea", "acid reflux",
+            "nasal congestion", "rashes", "dehydration", "headache", "fatigue"]
+
+
+def _patients(n: int, rng) -> list:
+    patients = []
+    for _ in range(n):
+        words = rng.choice(SYMPTOMS, rng.integers(0, 4), replace=False)
+        patients.append({
+            "notes": " and ".join(words),
+            "age": int(rng.integers(0, 90)),
+            "allergies": list(rng.choice(["ibuprofen", "paracetamol", "penicillin"], rng.integers(0, 2))),
+            "severity_hint": str(rng.choice(["mild", "moderate", "severe"])),
+            "condition_probs": {"pneumonia": float(rng.random()), "normal": 0.1},
+            "current_medications": ["Aspirin"] if rng.random() < 0.2 else None,
+        })
+    return patients
+
+
+def _best_of(repeat: int, fn):
+    """(fastest wall time in seconds, last result) over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(n: int = 100_000, repeat: int = 3):
+    agent = TherapyAgent()
+    # Per-recommendation INFO logs would otherwise dominate the scalar loop
+    logging.getLogger().setLevel(logging.WARNING)
+    patients = _patients(n, np.random.default_rng(0))
+    agent.recommend_batch(patients[:10])  # build the formulary/interaction indexes once
+
+    loop_s, expected = _best_of(repeat, lambda: [agent.recommend(**patient) for patient in patients])
+    batch_s, batch = _best_of(repeat, lambda: agent.recommend_batch(patients))
+
+    assert batch == expected
+    print(f"patients:           {n:,}  (best of {repeat})")
+    print(f"recommend() loop:   {loop_s * 1000:9.1f} ms")
+    print(f"recommend_batch():  {batch_s * 1000:9.1f} ms  ({loop_s / batch_s:.1f}x faster)")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
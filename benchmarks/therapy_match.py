@@ -0,0 +1,75 @@
+"""
+Benchmark: symptom matching against a large synthetic formulary, row-by-row
+iterrows scan vs the precompiled Formulary (Aho-Corasick over indications).
+
+Usage:
+    python benchmarks/therapy_match.py [medicines] [pages]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.getcwd())
+
+from Utils.formulary import Formulary
+
+CHARS_PER_PAGE = 3000
+
+
+def _words(rng, n):
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    return ["".join(rng.choice(letters, rng.integers(4, 10))) for _ in range(n)]
+
+
+def _scan_rows(medicines: pd.DataFrame, notes: str) -> list:
+    matched = []
+    for _, row in medicines.iterrows():
+        tokens = row["indication"].lower().replace("&", " ").split()
+        if any(t in notes for t in tokens):
+            matched.append(row["sku"])
+    return matched
+
+
+def main(n_medicines: int = 50_000, pages: int = 5):
+    rng = np.random.default_rng(0)
+    vocabulary = _words(rng, 20_000)
+    medicines = pd.DataFrame({
+        "sku": [f"SKU{i:06d}" for i in range(n_medicines)],
+        "drug_name": [f"Drug {i}" for i in range(n_medicines)],
+        "indication": [
+            " & ".join(rng.choice(vocabulary, rng.integers(1, 4)))
+            for _ in range(n_medicines)
+        ],
+        "age_min": rng.integers(0, 18, n_medicines),
+        "contra_allergy_keywords": "None",
+    })
+    filler = _words(rng, 5_000)
+    notes = " ".join(rng.choice(filler + vocabulary[:50], CHARS_PER_PAGE * pages // 7))
+
+    start = time.perf_counter()
+    expected = _scan_rows(medicines, notes)
+    scan_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    formulary = Formulary.from_frame(medicines)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matched = [med.sku for med in formulary.match(notes)]
+    match_s = time.perf_counter() - start
+
+    assert matched == expected
+    print(f"medicines:          {n_medicines:,}")
+    print(f"notes:              {len(notes):,} chars ({pages} pages), {len(matched)} matches")
+    print(f"iterrows scan:      {scan_s * 1000:9.1f} ms per call")
+    print(f"formulary build:    {build_s * 1000:9.1f} ms (once per medicines.csv version)")
+    print(f"formulary match:    {match_s * 1000:9.1f} ms per call  ({scan_s / match_s:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
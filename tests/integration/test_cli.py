@@ -0,0 +1,26 @@
+import json
+
+from Agents import cli
+
+
+def test_cli_streams_jsonl_results_and_reports_bad_lines(tmp_path, capsys):
+    cases = tmp_path / "cases.jsonl"
+    cases.write_text(
+        json.dumps({"name": "A", "phone": "9998887776", "age": 30, "notes": "fever"}) + "\n"
+        "not json\n"
+        "\n"
+        + json.dumps({"name": "B", "phone": "9998887776", "age": 40, "notes": "cough",
+                      "image_path": "Testcases/XRAY.jpeg"}) + "\n"
+        + json.dumps({"name": "C", "phone": "9998887776", "notes": "rashes"}) + "\n"
+    )
+
+    code = cli.main([str(cases), "--limit", "3", "--upload-dir", str(tmp_path / "uploads")])
+    out, err = capsys.readouterr()
+    results = [json.loads(line) for line in out.splitlines()]
+
+    assert code == 1  # one case failed
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert results[0]["ok"] and results[0]["result"]["therapy_plan"]["otc_options"]
+    assert not results[1]["ok"] and "line 2" in results[1]["error"]
+    assert results[2]["result"]["diagnosis"]["confidence_source"] == "xray"
+    assert "[done] 3 cases (2 ok, 1 failed)" in err
@@ -1,16 +1,32 @@
+import asyncio
 import io
 
 from Agents.coordinator import Orchestrator
 from Agents.ingestion import IngestionAgent
+from Agents.pharmacy_match import PharmacyAgent
 
 
 def _fake_image(name: str = "demo_pneumonia.jpg"):
-    buffer = io.BytesIO(b"xray-bytes")
+    buffer = io.BytesIO(b"\xff\xd8\xff\xe0xray-bytes")
     buffer.name = name
     buffer.seek(0)
     return buffer
 
 
+def _fresh_store():
+    from Utils.data_loader import load_inventory
+    from Utils.inventory_store import InventoryStore
+
+    return InventoryStore.from_frame(load_inventory())
+
+
+def _orchestrator_on(store):
+    """An Orchestrator whose orders go to `store`, not the process-wide live inventory."""
+    orchestrator = Orchestrator()
+    orchestrator.pharmacy = PharmacyAgent(store=store)
+    return orchestrator
+
+
 def test_orchestrator_runs_end_to_end(tmp_path):
     orchestrator = Orchestrator()
     orchestrator.ingestion = IngestionAgent(upload_dir=str(tmp_path / ".coordinator_ingest"))
@@ -31,3 +47,162 @@ def test_orchestrator_runs_end_to_end(tmp_path):
     assert final["order_preview"]
     assert "subtotal" in final["order_preview"]
 
+
+
+def test_order_preview_supports_multi_pharmacy_baskets():
+    orchestrator = _orchestrator_on(_fresh_store())
+    match = orchestrator.pharmacy.find_matches(
+        ["SKU001", "SKU004"], user_lat=19.12, user_lon=72.84, fulfilment="split"
+    )
+
+    preview = orchestrator._build_order_preview(match)
+    order = orchestrator.finalize_order(preview)
+
+    assert len(preview["shipments"]) == 2
+    assert preview["subtotal"] == sum(s["subtotal"] for s in preview["shipments"])
+    assert order["total_cost"] == round(preview["subtotal"] + preview["delivery_fee"], 2)
+
+
+def test_finalize_order_decrements_live_inventory():
+    store = _fresh_store()
+    orchestrator = _orchestrator_on(store)
+    preview = orchestrator._build_order_preview(
+        orchestrator.pharmacy.find_matches(["SKU001"], user_lat=19.12, user_lon=72.84)
+    )
+    before = store.available("ph001", "SKU001")
+
+    held = orchestrator.hold_order(preview)
+    assert store.available("ph001", "SKU001") == before - 1
+
+    order = orchestrator.finalize_order(held)
+    assert "reservation_id" not in order
+    assert store.available("ph001", "SKU001") == before - 1
+
+
+def test_held_order_is_finalized_on_the_store_that_holds_it():
+    before_reload = _fresh_store()
+    orchestrator = _orchestrator_on(before_reload)
+    preview = orchestrator._build_order_preview(
+        orchestrator.pharmacy.find_matches(["SKU001"], user_lat=19.12, user_lon=72.84)
+    )
+    stock = before_reload.available("ph001", "SKU001")
+    held = orchestrator.hold_order(preview)
+
+    # inventory.csv reloaded between hold and checkout: a fresh store
+    after_reload = _fresh_store()
+    orchestrator.pharmacy = PharmacyAgent(store=after_reload)
+    order = orchestrator.finalize_order(held)
+
+    assert "store_id" not in order and "reservation_id" not in order
+    assert before_reload.available("ph001", "SKU001") == stock - 1
+    assert before_reload._held[("ph001", "SKU001")] == 0  # the hold was committed, not left to expire
+    assert after_reload.available("ph001", "SKU001") == stock  # not sold twice
+
+
+def test_finalize_order_prices_from_inventory_and_rejects_bad_previews():
+    import pytest
+    from Utils.inventory_store import InvalidOrderError
+
+    store = _fresh_store()
+    orchestrator = _orchestrator_on(store)
+    preview = orchestrator._build_order_preview(
+        orchestrator.pharmacy.find_matches(["SKU001"], user_lat=19.12, user_lon=72.84)
+    )
+    stock = store.available("ph001", "SKU001")
+
+    tampered = {**preview, "subtotal": 1, "items": [{**preview["items"][0], "unit_price": 0.01, "subtotal": 0.01}]}
+    order = orchestrator.finalize_order(tampered)
+    assert order["items"] == preview["items"] and order["subtotal"] == preview["subtotal"]
+    assert store.available("ph001", "SKU001") == stock - 1
+
+    line = preview["items"][0]
+    for bad in (
+        {"subtotal": 1},
+        {**preview, "items": []},
+        {**preview, "items": [{**line, "qty": -3}]},
+        {**preview, "items": [{**line, "qty": 1.5}]},
+        {**preview, "items": [{**line, "sku": "NOPE"}]},
+        {**preview, "delivery_fee": -15},
+    ):
+        with pytest.raises(InvalidOrderError):
+            orchestrator.finalize_order(bad)
+
+    # A held order can't be swapped for other items at checkout
+    held = orchestrator.hold_order(preview)
+    with pytest.raises(InvalidOrderError):
+        orchestrator.finalize_order({**held, "items": [{**line, "qty": 2}]})
+    orchestrator.finalize_order(held)
+    assert store.available("ph001", "SKU001") == stock - 2
+
+
+def test_run_flow_async_matches_run_flow_for_many_concurrent_flows():
+    orchestrator = Orchestrator()
+    cases = [
+        {"notes": "fever and headache", "pincode": "400050"},
+        {"notes": "acid reflux", "allergies": "ibuprofen"},
+        {"notes": "itching and rashes", "user_lat": 19.17, "user_lon": 72.85},
+        {"notes": "nothing relevant"},
+    ] * 5
+
+    async def run_all():
+        return await asyncio.gather(*(
+            orchestrator.run_flow_async(name="Async Patient", phone="9998887776", age=34, **case)
+            for case in cases
+        ))
+
+    results = asyncio.run(run_all())
+
+    for case, result in zip(cases, results):
+        expected = orchestrator.run_flow(name="Async Patient", phone="9998887776", age=34, **case)
+        assert result.keys() == expected.keys()
+        for key in ("diagnosis", "therapy_plan", "pharmacy_match", "doctor_escalation_needed"):
+            assert result[key] == expected[key]
+        assert [e["step"] for e in result["timeline"]] == [e["step"] for e in expected["timeline"]]
+
+
+def test_run_flow_skips_imaging_without_xray_and_times_each_stage():
+    final = Orchestrator().run_flow(name="Panel Patient", phone="9998887776", age=34, notes="fever")
+
+    steps = [entry["step"] for entry in final["timeline"]]
+    assert steps[:3] == ["ingestion_completed", "imaging_skipped", "therapy_completed"]
+    assert final["diagnosis"]["condition"] == "symptom_based"
+    assert all(entry["started_at"] <= entry["at"] for entry in final["timeline"])
+
+
+def test_run_flow_records_stage_latency_and_outcomes():
+    from Agents.coordinator import FLOW_OUTCOMES, STAGE_RUNS, STAGE_SECONDS
+
+    skipped = FLOW_OUTCOMES.value(outcome="imaging_skipped")
+    therapy_runs = STAGE_SECONDS.labels(stage="therapy").count
+
+    final = Orchestrator().run_flow(name="Panel Patient", phone="9998887776", age=34, notes="fever")
+
+    assert FLOW_OUTCOMES.value(outcome="imaging_skipped") == skipped + 1
+    assert STAGE_SECONDS.labels(stage="therapy").count == therapy_runs + 1
+    assert STAGE_RUNS.value(stage="imaging", status="skipped") >= 1
+    assert all(entry["duration_ms"] >= 0 for entry in final["timeline"])
+
+
+def test_run_flow_many_streams_per_case_results(tmp_path):
+    cases = [
+        {"name": f"Patient {i}", "phone": "9998887776", "age": 30 + i, "notes": "fever and cough"}
+        for i in range(6)
+    ]
+    cases[2] = {"phone": "9998887776", "notes": "fever"}  # no name: fails on its own
+    cases[4]["image_path"] = "Testcases/XRAY.jpeg"
+    upload_dir = str(tmp_path / "uploads")
+
+    results = list(Orchestrator.run_flow_many(cases, workers=2, chunk_size=2, upload_dir=upload_dir))
+
+    assert [r["index"] for r in results] == list(range(6))
+    assert not results[2]["ok"] and "Name is required" in results[2]["error"]
+    assert all(r["ok"] for i, r in enumerate(results) if i != 2)
+    assert results[4]["result"]["diagnosis"]["confidence_source"] == "xray"
+    assert results[5]["result"]["patient"]["age"] == 35
+
+    inline = list(Orchestrator.run_flow_many(cases[:3], workers=1, upload_dir=upload_dir))
+    assert [r["ok"] for r in inline] == [True, True, False]
+    assert inline[1]["result"]["therapy_plan"] == results[1]["result"]["therapy_plan"]
+
+    unordered = Orchestrator.run_flow_many(cases, workers=2, ordered=False, chunk_size=1, upload_dir=upload_dir)
+    assert sorted(r["index"] for r in unordered) == list(range(6))
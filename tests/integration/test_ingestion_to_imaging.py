@@ -5,7 +5,7 @@ from Agents.imaging import ImagingAgent
 
 
 def _fake_image(name: str = "demo_pneumonia.jpg"):
-    buffer = io.BytesIO(b"xray-bytes")
+    buffer = io.BytesIO(b"\xff\xd8\xff\xe0xray-bytes")
     buffer.name = name
     buffer.seek(0)
     return buffer
@@ -0,0 +1,152 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from Agents.coordinator import Orchestrator
+from Agents.ingestion import IngestionAgent
+from Agents.service import OrchestratorPool, TriageHTTPServer, encode_multipart
+
+
+@pytest.fixture
+def service(tmp_path):
+    def factory():
+        orchestrator = Orchestrator()
+        orchestrator.ingestion = IngestionAgent(upload_dir=str(tmp_path / "uploads"))
+        return orchestrator
+
+    pool = OrchestratorPool(2, factory=factory)
+    server = TriageHTTPServer(("127.0.0.1", 0), pool, acquire_timeout=5)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _call(url, body=None, content_type="application/json"):
+    data = json.dumps(body).encode() if isinstance(body, dict) else body
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": content_type})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.read()
+
+
+def test_service_runs_flows_and_finalizes_orders(service):
+    status, body = _call(f"{service}/healthz")
+    assert status == 200 and json.loads(body)["pool_size"] == 2
+
+    status, body = _call(f"{service}/run_flow", {
+        "name": "Panel Patient", "phone": "9998887776", "age": 34, "notes": "fever and headache",
+    })
+    assert status == 200
+    preview = json.loads(body)["order_preview"]
+    assert preview
+
+    status, body = _call(f"{service}/finalize_order", {"order_preview": preview})
+    assert status == 200 and json.loads(body)["order_id"].startswith("ORDER-")
+    # The server prices the order; a client preview can't set it or sell negative stock
+    status, body = _call(f"{service}/finalize_order", {"order_preview": {**preview, "subtotal": 1}})
+    assert status == 200 and json.loads(body)["subtotal"] == preview["subtotal"]
+    assert _call(f"{service}/finalize_order", {"order_preview": {"subtotal": 1}})[0] == 422
+    negative = {"pharmacy_id": "ph001", "items": [{"sku": "SKU001", "qty": -1}]}
+    assert _call(f"{service}/finalize_order", {"order_preview": negative})[0] == 422
+
+    with open("Testcases/XRAY.jpeg", "rb") as f:
+        content_type, form = encode_multipart(
+            {"name": "Panel Patient", "phone": "9998887776", "age": "40", "notes": "cough"},
+            {"image_file": ("XRAY.jpeg", f.read())},
+        )
+    status, body = _call(f"{service}/run_flow", form, content_type)
+    assert status == 200
+    result = json.loads(body)
+    assert result["diagnosis"]["confidence_source"] == "xray"
+    assert result["patient"]["age"] == 40
+
+    assert _call(f"{service}/run_flow", {"notes": "fever", "phone": "9998887776"})[0] == 422
+    # JSON arguments are checked like form fields: client mistakes are 422s, not 500s
+    patient = {"name": "Panel Patient", "phone": "9998887776", "notes": "fever"}
+    for bad in ({}, {"age": "forty"}, {"age": 40.5}, {"age": True}, {"phone": 9998887776}, {"user_lat": [1]}):
+        assert _call(f"{service}/run_flow", {**patient, **bad})[0] == 422, bad
+    status, body = _call(f"{service}/run_flow", {**patient, "age": "41", "user_lat": 19.1, "user_lon": "72.8"})
+    assert status == 200 and json.loads(body)["patient"]["age"] == 41
+    assert _call(f"{service}/run_flow", {"name": "X", "bogus": 1})[0] == 400
+    assert _call(f"{service}/run_flow", b"not json")[0] == 400
+    assert _call(f"{service}/nope")[0] == 404
+
+    status, body = _call(f"{service}/metrics")
+    assert status == 200
+    assert 'http_requests_total{endpoint="/run_flow",status="200"} ' in body.decode()
+
+
+class _BrokenOrchestrator:
+    def run_flow(self, **kwargs):
+        raise RuntimeError("stage crashed")
+
+
+def _serve(pool, **kwargs):
+    server = TriageHTTPServer(("127.0.0.1", 0), pool, acquire_timeout=5, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_multipart_is_parsed_as_a_stream_with_split_boundaries():
+    import io
+    from Agents.service import UploadedFile, parse_multipart
+
+    pdf = b"%PDF-1.4 " + bytes(range(256)) * 40
+    content_type, body = encode_multipart(
+        {"name": "Panel Patient", "age": "40"}, {"pdf_file": ("report.pdf", pdf)}
+    )
+    # 7-byte reads split every delimiter and header block across chunks
+    fields = parse_multipart(content_type, io.BytesIO(body + b"next request"), len(body), chunk_size=7)
+    try:
+        assert fields["name"] == "Panel Patient" and fields["age"] == "40"
+        assert isinstance(fields["pdf_file"], UploadedFile) and fields["pdf_file"].name == "report.pdf"
+        assert fields["pdf_file"].read() == pdf
+    finally:
+        fields["pdf_file"].close()
+
+    with pytest.raises(Exception, match="Malformed multipart"):
+        parse_multipart(content_type, io.BytesIO(body[:-10]), len(body) - 10)
+
+
+def test_service_status_codes_for_bad_lengths_large_uploads_and_crashes(tmp_path):
+    import http.client
+
+    def factory():
+        orchestrator = Orchestrator()
+        orchestrator.ingestion = IngestionAgent(upload_dir=str(tmp_path / "uploads"))
+        return orchestrator
+
+    # JSON bodies are capped at 1 KB here; multipart uploads are streamed past it
+    server = _serve(OrchestratorPool(1, factory=factory), max_body_bytes=1024)
+    broken = _serve(OrchestratorPool(1, factory=_BrokenOrchestrator, warm=False))
+    try:
+        port = server.server_address[1]
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        connection.request("POST", "/run_flow", body=b"{}", headers={
+            "Content-Type": "application/json", "Content-Length": "-5",
+        })
+        assert connection.getresponse().status == 400
+        connection.close()
+
+        with open("Testcases/XRAY.jpeg", "rb") as f:
+            content_type, form = encode_multipart(
+                {"name": "Panel Patient", "phone": "9998887776", "age": "40", "notes": "cough"},
+                {"image_file": ("XRAY.jpeg", f.read())},
+            )
+        assert len(form) > 1024
+        status, body = _call(f"http://127.0.0.1:{port}/run_flow", form, content_type)
+        assert status == 200 and json.loads(body)["diagnosis"]["confidence_source"] == "xray"
+        assert _call(f"http://127.0.0.1:{port}/run_flow", {"notes": "x" * 2000})[0] == 413
+
+        status, body = _call(f"http://127.0.0.1:{broken.server_address[1]}/run_flow", {"name": "X"})
+        assert status == 500 and json.loads(body) == {"error": "Internal server error"}
+    finally:
+        for s in (server, broken):
+            s.shutdown()
+            s.server_close()
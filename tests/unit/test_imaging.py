@@ -1,4 +1,8 @@
+import numpy as np
+import pytest
+
 from Agents.imaging import ImagingAgent
+from Utils.result_cache import ResultCache
 
 
 def test_demo_cheat_code_for_pneumonia():
@@ -14,3 +18,139 @@ def test_no_image_returns_safe_output():
     assert result["severity_hint"] == "no-image"
     assert result["condition_probs"] is None
 
+
+
+def test_results_are_cached_by_content_and_seeded_from_hash(tmp_path):
+    xray = tmp_path / "xray_upload.png"
+    xray.write_bytes(b"\x89PNG\r\n\x1a\nsame-scan")
+    cache = ResultCache(max_entries=8, disk_dir=str(tmp_path / "cache"))
+    agent = ImagingAgent(cache=cache)
+
+    first = agent.analyze(str(xray))
+    again = agent.analyze(str(xray))
+    assert again == first
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    # Fresh process-like state: no memory, no disk -> same seeded answer
+    uncached = ImagingAgent(cache=ResultCache(max_entries=8)).analyze(str(xray))
+    assert uncached == first
+
+    # A new in-memory cache over the same directory is served from disk
+    from_disk = ResultCache(max_entries=8, disk_dir=str(tmp_path / "cache"))
+    assert ImagingAgent(cache=from_disk).analyze(str(xray)) == first
+    assert from_disk.stats()["disk_hits"] == 1
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    cache.get("a")
+    cache.put("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+def _numpy_backend(tmp_path):
+    pytest.importorskip("PIL")
+    from Agents.imaging import NumpyBackend
+    from Utils.xray_model import write_demo_weights
+
+    write_demo_weights(str(tmp_path / "model"))
+    return NumpyBackend(str(tmp_path / "model"))
+
+
+def _write_xray(path, seed):
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    Image.fromarray(rng.integers(0, 256, (300, 200), dtype=np.uint8)).save(path)
+    return str(path)
+
+
+def test_numpy_backend_keeps_the_result_contract_and_batches_consistently(tmp_path):
+    backend = _numpy_backend(tmp_path)
+    agent = ImagingAgent(cache=ResultCache(max_entries=8), backend=backend)
+    paths = [_write_xray(tmp_path / f"pneumonia_{i}.{ext}", i) for i, ext in enumerate(["png", "jpeg", "png"])]
+
+    result = agent.analyze(paths[0])
+    assert set(result["condition_probs"]) == {"pneumonia", "normal", "covid_suspect"}
+    assert sum(result["condition_probs"].values()) == pytest.approx(1.0, abs=0.02)
+    assert result["severity_hint"] in {"mild", "moderate", "severe"}
+    assert result["backend"] == backend.name
+    assert agent.analyze(paths[0]) == result
+    assert agent.cache.stats()["hits"] == 1
+
+    images = np.stack([backend.load(path) for path in paths])
+    assert images.shape == (3, 64, 64)
+    batched = backend.model.predict(images)
+    singles = np.concatenate([backend.model.predict(image[None]) for image in images])
+    assert np.allclose(batched, singles, atol=1e-6)
+
+
+def test_numpy_backend_reports_unreadable_images_instead_of_guessing(tmp_path):
+    backend = _numpy_backend(tmp_path)
+    agent = ImagingAgent(cache=ResultCache(max_entries=8), backend=backend)
+    broken = tmp_path / "pneumonia_severe.png"
+    broken.write_bytes(b"\x89PNG\r\n\x1a\ntruncated")
+
+    # Not the heuristic's filename answer (pneumonia 0.85), and not cached
+    result = agent.analyze(str(broken))
+    assert result["condition_probs"] is None
+    assert result["severity_hint"] == "unreadable"
+    assert result["backend"] == backend.name and result["error"]
+    assert agent.cache.stats()["size"] == 0
+    assert ImagingAgent(cache=ResultCache(max_entries=8)).analyze(str(broken))["backend"] == "heuristic"
+
+    with pytest.raises(ValueError, match="Unknown imaging backend"):
+        ImagingAgent(backend="resnet")
+
+
+def _png_header(width, height):
+    import struct
+    import zlib
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    # Only the header: Pillow's bomb check reads the size before any pixels
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", b"")
+
+
+def test_oversized_images_are_unreadable_not_errors(tmp_path):
+    import warnings
+
+    backend = _numpy_backend(tmp_path)
+    bomb = tmp_path / "bomb.png"
+    bomb.write_bytes(_png_header(30_000, 30_000))  # over twice MAX_IMAGE_PIXELS: DecompressionBombError
+    large = tmp_path / "large.png"
+    large.write_bytes(_png_header(10_000, 10_000))  # over MAX_IMAGE_PIXELS: DecompressionBombWarning
+
+    agent = ImagingAgent(cache=ResultCache(max_entries=8), backend=backend)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        for path in (str(bomb), str(large)):
+            assert agent.analyze(path)["severity_hint"] == "unreadable"
+            assert dict(agent.analyze_batch([path], workers=1))[path]["severity_hint"] == "unreadable"
+
+
+def test_analyze_batch_streams_the_same_results_as_analyze(tmp_path):
+    backend = _numpy_backend(tmp_path)
+    paths = [_write_xray(tmp_path / f"xray_{i}.{'png' if i % 2 else 'jpeg'}", i) for i in range(7)]
+    broken = tmp_path / "normal_broken.png"
+    broken.write_bytes(b"\x89PNG\r\n\x1a\ntruncated")
+    paths.append(str(broken))
+
+    expected = {path: ImagingAgent(cache=ResultCache(max_entries=16), backend=backend).analyze(path) for path in paths}
+    for workers in (1, 2):
+        agent = ImagingAgent(cache=ResultCache(max_entries=16), backend=backend)
+        streamed = agent.analyze_batch(iter(paths), workers=workers, batch_size=3, max_in_flight=1)
+        assert dict(streamed) == expected
+        assert agent.cache.stats()["size"] == 7  # the unreadable image is not cached
+
+    # A second pass is served from the cache, without inference
+    again = list(agent.analyze_batch(paths[:3], workers=1, batch_size=3))
+    assert [result for _, result in again] == [expected[path] for path in paths[:3]]
+    assert agent.cache.stats()["hits"] == 3
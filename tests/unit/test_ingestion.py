@@ -1,3 +1,4 @@
+import hashlib
 import io
 from pathlib import Path
 
@@ -6,6 +7,27 @@ import pytest
 from Agents.ingestion import IngestionAgent
 
 
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+def _minimal_pdf(*page_texts: str) -> bytes:
+    """One-font PDF with an uncompressed content stream per page."""
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(page_texts)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(page_texts)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(page_texts):
+        content = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+    body = b"".join(b"%d 0 obj\n%s\nendobj\n" % (n, obj) for n, obj in enumerate(objects, 1))
+    return b"%PDF-1.4\n" + body + b"trailer\n<< /Root 1 0 R >>\n%%EOF\n"
+
+
 def _fake_upload(name: str, content: bytes = b"data"):
     buffer = io.BytesIO(content)
     buffer.name = name
@@ -23,8 +45,8 @@ def test_mask_methods_raise_for_missing_values(tmp_path):
 
 def test_process_saves_image_and_pdf(tmp_path):
     agent = IngestionAgent(upload_dir=str(tmp_path / "ingestion"))
-    image = _fake_upload("scan.png", b"xraybytes")
-    pdf = _fake_upload("report.pdf", b"pdfcontent")
+    image = _fake_upload("scan.png", PNG_HEADER + b"xraybytes")
+    pdf = _fake_upload("report.pdf", _minimal_pdf("Persistent cough and fever", "Temperature 101F"))
 
     payload = agent.process(
         image_file=image,
@@ -39,7 +61,22 @@ def test_process_saves_image_and_pdf(tmp_path):
     assert payload["notes"] == "fever and cough"
     assert payload["xray_path"]
     assert Path(payload["xray_path"]).exists()
-    assert payload["pdf_text"]
+    assert payload["pdf_pages"] == ["Persistent cough and fever", "Temperature 101F"]
+    assert payload["pdf_text"] == "Persistent cough and fever Temperature 101F"
+
+
+def test_pdf_text_is_masked_and_never_logged(tmp_path, caplog):
+    agent = IngestionAgent(upload_dir=str(tmp_path / "ingestion"))
+    pdf = _fake_upload("report.pdf", _minimal_pdf("Patient: Vibhu Sharma, Mobile 98765 43210", "Fever 101F"))
+
+    with caplog.at_level("INFO"):
+        payload = agent.process(pdf_file=pdf, name="Vibhu Sharma", phone="9876543210", age=30)
+
+    assert payload["pdf_pages"] == ["Patient: V***u S****a, Mobile ########10", "Fever 101F"]
+    assert payload["pdf_text"] == "Patient: V***u S****a, Mobile ########10 Fever 101F"
+    assert "2 pages, 50 characters of text" in caplog.text
+    for secret in ("Vibhu", "Sharma", "43210", "Fever"):
+        assert secret not in caplog.text
 
 
 def test_process_rejects_invalid_image_extension(tmp_path):
@@ -66,3 +103,56 @@ def test_process_requires_clinical_input(tmp_path):
             notes=None
         )
 
+
+
+class _ChunkCountingUpload(io.BytesIO):
+    """Upload that records the largest read() it was asked for."""
+    largest_read = 0
+
+    def read(self, size=-1):
+        self.largest_read = max(self.largest_read, size if size >= 0 else len(self.getvalue()))
+        return super().read(size)
+
+
+def test_uploads_are_streamed_sniffed_and_hashed(tmp_path):
+    agent = IngestionAgent(upload_dir=str(tmp_path / "ingestion"))
+    content = PNG_HEADER + bytes(range(256)) * 20_000  # ~5 MB
+    upload = _ChunkCountingUpload(content)
+    upload.name = "pneumonia_scan.jpeg"  # the content decides the type, not the name
+
+    payload = agent.process(image_file=upload, name="Vibhu", phone="9999999999", age=30)
+
+    saved = Path(payload["xray_path"])
+    assert saved.read_bytes() == content
+    assert saved.suffix == ".png" and saved.name.startswith("pneumonia_")
+    assert payload["xray_sha256"] == hashlib.sha256(content).hexdigest()
+    assert upload.largest_read <= 1024 * 1024
+
+
+def test_uploads_enforce_magic_bytes_and_size_caps(tmp_path):
+    agent = IngestionAgent(upload_dir=str(tmp_path / "ingestion"), max_image_bytes=1000)
+    images_dir = Path(agent.images_dir)
+
+    with pytest.raises(Exception, match="Invalid image file type"):
+        agent.process(image_file=_fake_upload("scan.png", b"%PDF-1.4 not an image"),
+                      name="Vibhu", phone="9999999999", age=30)
+    with pytest.raises(Exception, match="Invalid PDF file type"):
+        agent.process(pdf_file=_fake_upload("report.pdf", PNG_HEADER),
+                      name="Vibhu", phone="9999999999", age=30)
+    with pytest.raises(Exception, match="larger than"):
+        agent.process(image_file=_fake_upload("scan.png", PNG_HEADER + b"x" * 2000),
+                      name="Vibhu", phone="9999999999", age=30)
+
+    assert list(images_dir.iterdir()) == []  # nothing partial left behind
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    agent = IngestionAgent(upload_dir=str(tmp_path / "ingestion"))
+    content = PNG_HEADER + b"same scan"
+
+    first = agent.process(image_file=_fake_upload("scan.png", content), name="Vibhu", phone="9999999999", age=30)
+    second = agent.process(image_file=_fake_upload("retry.png", content), name="Vibhu", phone="9999999999", age=30)
+
+    assert first["xray_path"] == second["xray_path"]
+    assert hashlib.sha256(content).hexdigest() in first["xray_path"]
+    assert len(list(Path(agent.images_dir).iterdir())) == 1
@@ -0,0 +1,38 @@
+import urllib.request
+
+from Utils.metrics import MetricsRegistry, render_prometheus, start_metrics_server
+
+
+def test_histogram_quantiles_and_prometheus_text():
+    registry = MetricsRegistry()
+    latency = registry.histogram("stage_seconds", "Stage latency", ("stage",), buckets=(0.01, 0.1, 1.0))
+    for _ in range(90):
+        latency.labels(stage="therapy").observe(0.005)
+    for _ in range(10):
+        latency.labels(stage="therapy").observe(0.5)
+    registry.counter("outcomes_total", "Outcomes", ("outcome",)).inc(outcome="imaging_skipped")
+
+    assert latency.quantile(0.5, stage="therapy") < 0.01
+    assert 0.1 < latency.quantile(0.95, stage="therapy") <= 1.0
+
+    text = render_prometheus(registry)
+    assert '# TYPE stage_seconds histogram' in text
+    assert 'stage_seconds_bucket{stage="therapy",le="0.01"} 90' in text
+    assert 'stage_seconds_bucket{stage="therapy",le="+Inf"} 100' in text
+    assert 'stage_seconds_count{stage="therapy"} 100' in text
+    assert 'stage_seconds_quantile{stage="therapy",quantile="0.99"}' in text
+    assert 'outcomes_total{outcome="imaging_skipped"} 1.0' in text
+
+
+def test_metrics_server_serves_text_format():
+    registry = MetricsRegistry()
+    registry.counter("flows_total", "Flows").inc()
+    server = start_metrics_server(port=0, registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode()
+        assert "flows_total 1.0" in body
+    finally:
+        server.shutdown()
+        server.server_close()
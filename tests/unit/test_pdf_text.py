@@ -0,0 +1,62 @@
+from pathlib import Path
+
+from Utils.pdf_text import extract_pdf_pages, iter_pdf_pages, pdf_text_cache
+
+REPORT = Path(__file__).resolve().parents[2] / "Testcases" / "Blood_Report.pdf"
+
+
+def test_pages_are_read_lazily_within_the_budget():
+    pages = iter_pdf_pages(str(REPORT))
+    first = next(pages)
+    assert "LPL-NATIONAL REFERENCE LAB" in first
+    pages.close()
+
+    assert len(list(iter_pdf_pages(str(REPORT), max_pages=2))) == 2
+    capped = list(iter_pdf_pages(str(REPORT), max_chars=3000))
+    assert sum(map(len, capped)) == 3000
+    assert len(capped) == 2
+
+
+def test_extracted_pages_are_cached_by_content_hash(tmp_path):
+    copy = tmp_path / "report.pdf"
+    copy.write_bytes(REPORT.read_bytes())
+    pages = extract_pdf_pages(str(copy), sha256="report-sha", max_pages=1, workers=0)
+    assert pages and "Reported" in pages[0]
+
+    copy.unlink()  # a cache hit never touches the file again
+    assert extract_pdf_pages(str(copy), sha256="report-sha", max_pages=1, workers=0) == pages
+    assert pdf_text_cache().stats()["hits"] >= 1
+
+
+def test_unreadable_pdf_gives_no_pages(tmp_path):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.4 not really a pdf")
+    assert extract_pdf_pages(str(broken), workers=0) == []
+
+
+def test_timed_out_extraction_kills_only_its_own_worker():
+    import threading
+    import time
+    from Utils import pdf_text
+
+    pdf_text._reset_executor(pdf_text._executor(2))
+    pool = pdf_text._executor(2)
+    try:
+        other = {}
+        thread = threading.Thread(target=lambda: other.update(
+            pages=extract_pdf_pages(str(REPORT), max_pages=1, timeout=60, workers=2)
+        ))
+        thread.start()
+        while pool._idle.qsize() == 2:  # until the other extraction holds a worker
+            time.sleep(0.001)
+        # A spawned worker can't even start within a millisecond
+        assert extract_pdf_pages(str(REPORT), max_pages=1, timeout=0.001, workers=2) == []
+        thread.join(60)
+
+        # The extraction running alongside wasn't killed with it
+        assert other["pages"] and "Reported" in other["pages"][0]
+        workers = [w for w in pool._idle.queue if w is not None]
+        assert len(workers) == 1 and workers[0].process.is_alive()
+        assert extract_pdf_pages(str(REPORT), max_pages=1, timeout=60, workers=2)
+    finally:
+        pdf_text._reset_executor(pool)
@@ -10,3 +10,184 @@ def test_find_matches_returns_pharmacy():
     assert "price" in result["items"][0]
     assert "drug_name" in result["items"][0]
 
+
+def test_find_matches_ignores_pharmacies_outside_search_radius():
+    agent = PharmacyAgent()
+    # Delhi is far outside the Mumbai partner network
+    result = agent.find_matches(["SKU001"], user_lat=28.61, user_lon=77.21)
+
+    assert "pharmacy_id" not in result
+    assert "message" in result
+
+
+def test_geo_index_returns_only_nearby_candidates():
+    from Utils.geo import GeoGrid
+
+    grid = GeoGrid([(19.12, 72.84), (19.06, 72.83), (28.61, 77.21)])
+
+    assert grid.query(19.12, 72.84, 20) == [0, 1]
+    assert grid.query(28.60, 77.20, 5) == [2]
+
+
+def test_inventory_index_matches_dataframe_filter():
+    agent = PharmacyAgent()
+    skus = ["SKU001", "SKU002", "SKU004", "SKU999"]
+
+    stock = agent.inventory[agent.inventory["sku"].isin(skus) & (agent.inventory["qty"] > 0)]
+    expected = {
+        ph_id: group[["sku", "drug_name", "qty", "price"]].to_dict(orient="records")
+        for ph_id, group in stock.groupby("pharmacy_id")
+    }
+
+    assert agent.inventory_index.match(skus) == expected
+
+
+def test_find_matches_enforces_pharmacy_delivery_radius():
+    agent = PharmacyAgent()
+    # ~14 km north of ph001 (delivery_km=12), the only pharmacy stocking SKU001
+    result = agent.find_matches(["SKU001"], user_lat=19.245, user_lon=72.84)
+
+    assert "pharmacy_id" not in result
+
+    nearby = agent.find_matches(["SKU001"], user_lat=19.20, user_lon=72.84)
+    assert nearby["pharmacy_id"] == "ph001"
+    assert nearby["eta_min"] == 60
+
+
+def test_split_fulfilment_covers_basket_across_pharmacies():
+    agent = PharmacyAgent()
+    result = agent.find_matches(
+        ["SKU001", "SKU004", "SKU999"], user_lat=19.12, user_lon=72.84, fulfilment="split"
+    )
+
+    assert [s["pharmacy_id"] for s in result["shipments"]] == ["ph001", "ph002"]
+    assert {i["sku"] for i in result["items"]} == {"SKU001", "SKU004"}
+    assert result["delivery_fee"] == sum(s["delivery_fee"] for s in result["shipments"])
+    assert result["unfulfilled_skus"] == ["SKU999"]
+
+
+def test_cheapest_cover_prefers_fewest_stores_then_lowest_cost():
+    import numpy as np
+    from Utils.set_cover import cheapest_cover
+
+    # Items a, b: store 0 has a, store 1 has b, stores 2 and 3 have both
+    masks = np.array([0b01, 0b10, 0b11, 0b11])
+    fees = np.array([1.0, 1.0, 40.0, 25.0])
+    prices = np.array([[5.0, 0], [0, 5.0], [10.0, 10.0], [20.0, 20.0]])
+
+    assert cheapest_cover(masks, fees, prices) == [(2, 0b11)]
+
+
+def test_cheapest_cover_handles_wide_baskets_and_many_stores():
+    import numpy as np
+    from Utils.set_cover import cheapest_cover
+
+    # 70 SKUs don't fit an int64 bitset; one store has them all
+    assert cheapest_cover([(1 << 70) - 1, 1], np.array([5.0, 1.0]), np.ones((2, 70))) == [(0, (1 << 70) - 1)]
+
+    # Many stores: pruning/greedy still cover every item, each from a store stocking it
+    rng = np.random.default_rng(0)
+    masks = rng.integers(1, 1 << 10, 2000).tolist()
+    plan = cheapest_cover(masks, rng.uniform(20, 60, 2000), rng.uniform(5, 50, (2000, 10)))
+    covered = 0
+    for store, part in plan:
+        assert masks[store] & part == part and not covered & part
+        covered |= part
+    assert covered == (1 << 10) - 1
+
+
+def test_find_matches_batch_equals_per_call_results():
+    import random
+
+    agent = PharmacyAgent()
+    rng = random.Random(7)
+    skus = [f"SKU{i:03d}" for i in range(1, 12)]
+    requests = [
+        (rng.sample(skus, rng.randint(0, 4)), 19.0 + rng.random() * 0.3, 72.75 + rng.random() * 0.2)
+        for _ in range(200)
+    ]
+    requests.append((["SKU001"], 28.61, 77.21))
+
+    for mode in ("single", "split"):
+        expected = [agent.find_matches(s, lat, lon, fulfilment=mode) for s, lat, lon in requests]
+        assert agent.find_matches_batch(requests, fulfilment=mode, chunk_size=64) == expected
+
+    # Held stock is read live: emptying a shelf changes both paths alike
+    store = _fresh_store()
+    agent = PharmacyAgent(store=store)
+    agent.find_matches_batch(requests[:8])
+    store.reserve([("ph003", "SKU006", store.available("ph003", "SKU006"))])
+    for mode in ("single", "split"):
+        expected = [agent.find_matches(s, lat, lon, fulfilment=mode) for s, lat, lon in requests]
+        assert agent.find_matches_batch(requests, fulfilment=mode, chunk_size=64) == expected
+
+
+def _fresh_store(**kwargs):
+    from Utils.data_loader import load_inventory
+    from Utils.inventory_store import InventoryStore
+
+    return InventoryStore.from_frame(load_inventory(), **kwargs)
+
+
+def test_inventory_store_reservations_are_all_or_nothing_under_contention():
+    import threading
+    import pytest
+    from Utils.inventory_store import OutOfStockError
+
+    store = _fresh_store()
+    # ph003 holds 60 units of SKU006; 100 buyers race for 1 unit each
+    wins, losses = [], []
+
+    def buy():
+        try:
+            store.commit(store.reserve([("ph003", "SKU006", 1)]))
+            wins.append(1)
+        except OutOfStockError:
+            losses.append(1)
+
+    threads = [threading.Thread(target=buy) for _ in range(100)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(wins) == 60 and len(losses) == 40
+    assert store.available("ph003", "SKU006") == 0
+    with pytest.raises(OutOfStockError):
+        store.reserve([("ph001", "SKU001", 1), ("ph003", "SKU006", 1)])
+    assert store.available("ph001", "SKU001") == 100
+
+
+def test_inventory_store_releases_expired_holds():
+    now = [0.0]
+    store = _fresh_store(hold_seconds=30, clock=lambda: now[0])
+
+    store.reserve([("ph001", "SKU002", 50)])
+    assert store.available("ph001", "SKU002") == 0
+    assert "pharmacy_id" not in PharmacyAgent(store=store).find_matches(["SKU002"])
+
+    now[0] = 31.0
+    assert store.release_expired() == 1
+    assert store.available("ph001", "SKU002") == 50
+
+    # Expiry runs while other threads reserve: every hold is released exactly once
+    import threading
+
+    now[0] = 0.0
+    errors = []
+
+    def churn():
+        try:
+            for _ in range(200):
+                store.reserve([("ph001", "SKU002", 1)], hold_seconds=-1)
+                store.release_expired()
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=churn) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.release_expired()
+    assert not errors and store.available("ph001", "SKU002") == 50
@@ -0,0 +1,114 @@
+import os
+import shutil
+import subprocess
+import sys
+
+from Utils.snapshot import DATASETS, SnapshotManager
+
+
+def _manager_over_copy(tmp_path):
+    datasets = {}
+    for name, (path, reader) in DATASETS.items():
+        target = tmp_path / os.path.basename(path)
+        shutil.copy(path, target)
+        datasets[name] = (str(target), reader)
+    return SnapshotManager(datasets), tmp_path
+
+
+def test_refresh_swaps_snapshot_and_keeps_old_one_intact(tmp_path):
+    manager, data_dir = _manager_over_copy(tmp_path)
+    old = manager.current()
+    names = old.derive("sku_names", ("medicines",), lambda s: set(s.medicines["sku"]))
+    stock_rows = old.derive("stock_rows", ("inventory",), lambda s: len(s.inventory))
+
+    assert manager.refresh() is False
+
+    inventory = data_dir / "inventory.csv"
+    with open(inventory, "a", encoding="utf-8") as fh:
+        fh.write("ph001,SKU011,Zinc,Tablet,50mg,10,5\n")
+    os.utime(inventory, ns=(0, os.stat(inventory).st_mtime_ns + 1_000_000))
+
+    assert manager.refresh() is True
+    new = manager.current()
+
+    assert new.version == old.version + 1
+    assert len(old.inventory) == stock_rows
+    assert len(new.inventory) == stock_rows + 1
+    # Unchanged datasets and their derived structures are shared, not rebuilt
+    assert new.medicines is old.medicines
+    assert new.derive("sku_names", ("medicines",), lambda s: None) is names
+    assert new.derive("stock_rows", ("inventory",), lambda s: len(s.inventory)) == stock_rows + 1
+
+
+def test_refresh_keeps_current_snapshot_when_file_is_unreadable(tmp_path):
+    manager, data_dir = _manager_over_copy(tmp_path)
+    before = manager.current()
+
+    (data_dir / "pharmacies.json").write_text("[{broken", encoding="utf-8")
+
+    assert manager.refresh() is False
+    assert manager.current() is before
+
+
+def test_datasets_load_on_first_access_and_are_shared_across_versions(tmp_path):
+    manager, data_dir = _manager_over_copy(tmp_path)
+    old = manager.current()
+    assert old.loaded() == ()
+
+    doctors = old.doctors
+    assert old.loaded() == ("doctors",)
+
+    inventory = data_dir / "inventory.csv"
+    os.utime(inventory, ns=(0, os.stat(inventory).st_mtime_ns + 1_000_000))
+    assert manager.refresh() is True
+    new = manager.current()
+
+    # Changed files are parsed before publishing; untouched ones stay lazy
+    assert set(new.loaded()) == {"doctors", "inventory"}
+    assert new.doctors is doctors
+    new.medicines
+    assert "medicines" in old.loaded()
+
+
+def test_importing_the_agents_package_does_not_import_pandas_or_numpy():
+    code = (
+        "import sys, Utils\n"
+        "from Agents.coordinator import Orchestrator\n"
+        "Orchestrator()\n"
+        "print(sorted(m for m in ('pandas', 'numpy') if m in sys.modules))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert out.strip().splitlines()[-1] == "[]"
+
+
+def test_compiled_data_round_trips_and_falls_back_when_stale(tmp_path, monkeypatch):
+    import pandas as pd
+    from Utils import compiled_data
+    from Utils.data_loader import SOURCE_PARSERS
+
+    sources = {}
+    for name, (path, kind) in compiled_data.SOURCES.items():
+        target = tmp_path / os.path.basename(path)
+        shutil.copy(path, target)
+        sources[name] = (str(target), kind)
+    monkeypatch.setattr(compiled_data, "SOURCES", sources)
+    out = str(tmp_path / "compiled")
+
+    compiled_data.compile_data(out)
+
+    for name, (path, kind) in sources.items():
+        loaded = compiled_data.load_compiled(name, path, out)
+        parsed = SOURCE_PARSERS[name](path)
+        if kind == "records":
+            assert loaded == parsed
+        else:
+            pd.testing.assert_frame_equal(
+                loaded.astype(object), parsed.astype(object), check_dtype=False
+            )
+
+    inventory_path = sources["inventory"][0]
+    with open(inventory_path, "a", encoding="utf-8") as fh:
+        fh.write("ph001,SKU011,Zinc,Tablet,50mg,10,5\n")
+    assert compiled_data.load_compiled("inventory", inventory_path, out) is None
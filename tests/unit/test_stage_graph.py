@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from Utils.stage_graph import Stage, StageGraph
+
+
+def test_independent_stages_run_concurrently_and_timeline_keeps_declaration_order():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet(value):
+        barrier.wait()  # deadlocks unless both branches run at the same time
+        return value
+
+    graph = StageGraph([
+        Stage("root", lambda x: {"a": x + 1, "b": x + 2}, inputs=("x",), outputs=("a", "b"), step="root_done"),
+        Stage("left", lambda a: {"left": meet(a * 10)}, inputs=("a",), outputs=("left",), step="left_done"),
+        Stage("right", lambda b: {"right": meet(b * 10)}, inputs=("b",), outputs=("right",), step="right_done"),
+        Stage("join", lambda left, right: {"total": left + right}, inputs=("left", "right"), outputs=("total",)),
+    ])
+
+    run = graph.run({"x": 1})
+
+    assert run.values["total"] == 50
+    assert [entry["step"] for entry in run.timeline] == ["root_done", "left_done", "right_done"]
+    assert all(entry["started_at"] <= entry["at"] for entry in run.timeline)
+
+
+def test_stage_with_absent_input_is_skipped_with_defaults():
+    calls = []
+    graph = StageGraph([
+        Stage("scan", lambda path: calls.append(path) or {"finding": "x"}, inputs=("path",),
+              outputs=("finding",), step="scanned", skipped_step="scan_skipped",
+              defaults={"finding": "none"}),
+        Stage("report", lambda finding, extra: {"report": (finding, extra)}, inputs=("finding",),
+              optional=("extra",), outputs=("report",), step="reported"),
+        Stage("empty", lambda report: {"nothing": None}, inputs=("report",), outputs=("nothing",),
+              step="never_recorded"),
+    ])
+
+    run = graph.run({"path": None})
+
+    assert calls == []
+    assert run.values["report"] == ("none", None)
+    assert [entry["step"] for entry in run.timeline] == ["scan_skipped", "reported"]
+
+
+def test_graph_rejects_cycles_and_duplicate_outputs():
+    with pytest.raises(ValueError):
+        StageGraph([
+            Stage("a", lambda y: {"x": y}, inputs=("y",), outputs=("x",)),
+            Stage("b", lambda x: {"y": x}, inputs=("x",), outputs=("y",)),
+        ])
+    with pytest.raises(ValueError):
+        StageGraph([
+            Stage("a", lambda: {"x": 1}, outputs=("x",)),
+            Stage("b", lambda: {"x": 2}, outputs=("x",)),
+        ])
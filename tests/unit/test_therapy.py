@@ -27,3 +27,125 @@ def test_recommend_flags_allergy():
 
     assert any("Avoid Ibuprofen" in flag for flag in result["red_flags"])
 
+
+
+def test_substring_matcher_finds_overlapping_and_nested_patterns():
+    from Utils.text_match import SubstringMatcher
+
+    patterns = ["he", "she", "his", "hers", "ache", "headache", "a", "xyz"]
+    matcher = SubstringMatcher(patterns)
+
+    for text in ["ushers", "headache and fever", "this", "", "ahishers headaches"]:
+        found = {matcher.patterns[i] for i in matcher.find(text)}
+        assert found == {p for p in patterns if p in text}
+
+
+def test_substring_matches_span_chunks_and_recommend_accepts_them():
+    from Utils.text_match import SubstringMatcher
+
+    matcher = SubstringMatcher(["fever", "cough"])
+    assert matcher.find_chunks(["persistent fe", "ver and co", "ugh"]) == {0, 1}
+    assert matcher.find_chunks([]) == set()
+
+    agent = TherapyAgent()
+    kwargs = dict(age=30, allergies=[], severity_hint="moderate", condition_probs={"pneumonia": 0.85})
+    whole = agent.recommend(notes="Fever and chest pain", **kwargs)
+    chunked = agent.recommend(notes=iter(["Fe", "ver and ch", "", "est pain"]), **kwargs)
+    assert chunked == whole
+    assert agent.recommend(notes=iter(["", ""]), **kwargs)["red_flags"] == ["No symptoms provided"]
+
+
+def test_formulary_match_agrees_with_row_by_row_scan():
+    from Utils.formulary import get_formulary
+
+    meds = TherapyAgent().meds
+    formulary = get_formulary()
+
+    for notes in ["fever and chest pain", "loose motion, acid reflux", "sneezing", "nothing relevant"]:
+        expected = [
+            row["sku"]
+            for _, row in meds.iterrows()
+            if any(t in notes for t in row["indication"].lower().replace("&", " ").split())
+        ]
+        assert [med.sku for med in formulary.match(notes)] == expected
+
+
+def test_interaction_index_agrees_with_dataframe_filter_in_both_directions():
+    from Utils.interaction_index import get_interaction_index
+
+    interactions = TherapyAgent().interactions
+    index = get_interaction_index()
+    drugs = sorted(set(interactions.drug_a) | set(interactions.drug_b) | {"Zinc"})
+
+    for drug_a in drugs:
+        for drug_b in drugs:
+            match = interactions[((interactions.drug_a == drug_a) & (interactions.drug_b == drug_b)) |
+                                 ((interactions.drug_a == drug_b) & (interactions.drug_b == drug_a))]
+            hit = index.lookup(drug_a, drug_b)
+            if match.empty:
+                assert hit is None
+            else:
+                assert (hit.level, hit.note) == (match.iloc[0]["level"], match.iloc[0]["note"])
+
+
+def test_recommend_screens_against_current_medications():
+    agent = TherapyAgent()
+    result = agent.recommend(
+        notes="Pain and inflammation",
+        age=30,
+        allergies=[],
+        severity_hint="mild",
+        current_medications="aspirin, Metformin",
+    )
+
+    assert any(
+        flag.startswith("Drug interaction (High): Ibuprofen & aspirin")
+        for flag in result["red_flags"]
+    )
+
+
+def test_recommend_batch_matches_scalar_recommend():
+    agent = TherapyAgent()
+    notes = [
+        "Fever and chest pain after mild activity",
+        "pain & inflammation, some diarrhea",
+        "runny nose, nasal congestion and itching",
+        "acid reflux after meals",
+        "nothing relevant here",
+        "",
+        None,
+    ]
+    patients = []
+    for i in range(70):
+        patients.append({
+            "notes": notes[i % len(notes)],
+            "age": [1, 4, 10, 30, 70][i % 5],
+            "allergies": [[], ["ibuprofen"], ["Paracetamol", "aluminium"]][i % 3],
+            "severity_hint": ["mild", "moderate", "severe"][i % 3],
+            "condition_probs": [None, {"pneumonia": 0.8, "normal": 0.2}, {"covid_suspect": 0.3}][i % 3],
+            "current_medications": [None, "aspirin", ["SKU005"]][(i // 3) % 3],
+        })
+
+    batch = agent.recommend_batch(patients, chunk_size=16)
+
+    assert batch == [agent.recommend(**patient) for patient in patients]
+
+    # Patients with the same outcome don't share result objects: editing one leaves the rest alone
+    first, same = next(
+        (a, b) for i, a in enumerate(batch) for b in batch[i + 1:] if a == b and a["otc_options"]
+    )
+    first["red_flags"].append("reviewed")
+    first["otc_options"][0]["warnings"].append("checked")
+    assert "reviewed" not in same["red_flags"] and "checked" not in same["otc_options"][0]["warnings"]
+
+
+def test_group_rows_matches_numpy_unique_for_narrow_and_wide_rows():
+    import numpy as np
+    from Agents.therapy import _group_rows
+
+    keys = np.random.default_rng(1).integers(0, 4, (500, 12))
+    _, first, group_of = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    for radices in ([4] * 12, [2 ** 20] * 12):  # folded into one int64 / too wide for it
+        got_first, got_group_of = _group_rows(keys, radices)
+        assert np.array_equal(keys[got_first][got_group_of], keys)
+        assert sorted(got_first.tolist()) == sorted(first.tolist())
@@ -0,0 +1,65 @@
+import io
+import os
+from pathlib import Path
+
+from Agents.ingestion import IngestionAgent
+from Utils.upload_gc import UploadCollector
+
+NOW = 1_000_000.0
+
+
+def _file(root: Path, rel: str, size: int, age: float) -> Path:
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    os.utime(path, (NOW - age, NOW - age))
+    return path
+
+
+def test_uploads_land_in_hash_prefix_shards(tmp_path):
+    agent = IngestionAgent(upload_dir=str(tmp_path))
+    upload = io.BytesIO(b"\x89PNG\r\n\x1a\nscan")
+    upload.name = "scan.png"
+
+    path = Path(agent.process(image_file=upload, name="Vibhu", phone="9999999999", age=30)["xray_path"])
+    sha = path.stem.split("_")[-1]
+
+    assert path.parent == tmp_path / "images" / sha[:2] / sha[2:4]
+
+
+def test_collector_applies_age_and_size_quotas_outside_grace(tmp_path):
+    expired = _file(tmp_path, "ab/cd/old.png", 100, age=10_000)
+    oldest = _file(tmp_path, "ab/ef/a.png", 400, age=500)
+    older = _file(tmp_path, "12/34/b.png", 400, age=400)
+    fresh = _file(tmp_path, "12/34/c.png", 400, age=10)  # inside grace: never removed
+    abandoned = _file(tmp_path, ".upload-tmp123", 50, age=200)
+
+    collector = UploadCollector([str(tmp_path)], max_age_seconds=5_000, max_total_bytes=900, grace_seconds=60)
+    report = collector.collect(now=NOW)
+
+    assert not expired.exists() and not abandoned.exists()
+    assert not oldest.exists()  # least recently uploaded goes first to meet the quota
+    assert older.exists() and fresh.exists()
+    assert report.scanned == 5 and report.removed == 3
+    assert report.reclaimed_bytes == 550 and report.remaining_bytes == 800
+
+
+def test_collector_keeps_files_uploaded_again_during_the_pass(tmp_path, monkeypatch):
+    from Utils import upload_gc
+
+    expired = _file(tmp_path, "ab/cd/old.png", 100, age=10_000)
+    over_quota = _file(tmp_path, "ab/ef/a.png", 400, age=500)
+    walk = upload_gc._walk_files
+
+    def walk_then_reupload(root):
+        entries = list(walk(root))
+        for path in (expired, over_quota):
+            os.utime(path, (NOW, NOW))  # re-uploading the same content refreshes its mtime
+        return entries
+
+    monkeypatch.setattr(upload_gc, "_walk_files", walk_then_reupload)
+    collector = UploadCollector([str(tmp_path)], max_age_seconds=5_000, max_total_bytes=100, grace_seconds=60)
+    report = collector.collect(now=NOW)
+
+    assert expired.exists() and over_quota.exists()
+    assert report.removed == 0 and report.remaining_bytes == 500